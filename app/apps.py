@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class ProjectConfig(AppConfig):
+    """Project-wide hooks that belong to no single app."""
+    name = 'app'
+
+    def ready(self):
+        from . import sqlite
+
+        connection_created.connect(sqlite.tune_connection, dispatch_uid='app.sqlite.tune_connection')
@@ -0,0 +1,158 @@
+"""
+Native async GET paths for the busiest read endpoints.
+
+Under ASGI a sync view (every DRF view) runs in a worker thread, with the
+request handed over from the event loop and the response handed back. The
+views built here serve ``GET``/``HEAD`` as coroutines instead: the session
+and user come from ``request.auser()``, rows from the async ORM and the
+response is rendered on the event loop.
+
+Each one wraps the existing sync view with ``async_get(sync_view)``. The
+coroutine returns None for anything it doesn't handle itself (anonymous
+users, which get DRF's 401/403 body, missing objects, browsable API
+requests, full-text searches, files missing from storage) and the
+request then goes to the sync view, as do all other methods. Behaviour is
+therefore exactly that of the sync view; only the common case is faster.
+The sync view's attributes (``cls``, ``csrf_exempt``, ...) are copied onto
+the wrapper so CSRF handling and the OpenAPI schema see the same view.
+
+``async_list_view(view_class)`` does this for generic list views built from
+``CachedListMixin``, ``ConditionalListMixin`` and ``CompiledListMixin``,
+whose ``alist()`` methods mirror ``list()`` with async queries.
+"""
+
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from app.delivery import deliver_file
+
+# Attributes Django, DRF and drf-spectacular read from a view callable.
+VIEW_ATTRIBUTES = ('cls', 'initkwargs', 'view_class', 'view_initkwargs', 'actions', 'csrf_exempt')
+
+# Columns deliver_or_none() reads besides the file itself.
+DOWNLOAD_FIELDS = ('id', 'file_checksum', 'file_name')
+
+# Query parameters whose filter backends query the database while filtering
+# (the full-text search); lists asked for them go to the sync view.
+SYNC_ONLY_PARAMS = (api_settings.SEARCH_PARAM,)
+
+
+def async_get(sync_view):
+    """
+    Decorator: serve GET and HEAD with the decorated coroutine, falling back
+    to ``sync_view`` when it returns None, and every other method with
+    ``sync_view``.
+    """
+    def decorator(handler):
+        async def view(request, *args, **kwargs):
+            if request.method in ('GET', 'HEAD'):
+                response = await handler(request, *args, **kwargs)
+                if response is not None:
+                    return response
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+        functools.update_wrapper(view, handler, assigned=('__module__', '__name__', '__qualname__', '__doc__'))
+        for name in VIEW_ATTRIBUTES:
+            if hasattr(sync_view, name):
+                setattr(view, name, getattr(sync_view, name))
+        view.sync_view = sync_view
+        return view
+    return decorator
+
+
+async def aget_user(request, fields=()):
+    """
+    The session's user, loaded without blocking the event loop. It is also
+    set as ``request.user`` so DRF's SessionAuthentication doesn't load it
+    again synchronously. ``fields`` names the columns the caller reads
+    beyond those of the session snapshot (see ``custom.sessions``); they
+    are loaded here rather than by a blocking query on first access.
+    """
+    user = await request.auser()
+    request.user = user
+    if fields and user.is_authenticated:
+        deferred = user.get_deferred_fields().intersection(fields)
+        if deferred:
+            await user.arefresh_from_db(fields=sorted(deferred))
+    return user
+
+
+def accepts_json(request):
+    """Whether DRF would answer ``request`` with its JSON renderer (not the browsable API)."""
+    return (
+        api_settings.URL_FORMAT_OVERRIDE not in request.GET
+        and 'text/html' not in request.headers.get('Accept', '')
+    )
+
+
+def json_response(data, status=200):
+    """An HttpResponse with the body DRF's JSONRenderer would send for ``data``."""
+    response = HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+    response['Vary'] = 'Accept'
+    return response
+
+
+def rendered(response):
+    """
+    A plain HttpResponse carrying a DRF Response's rendered content. Django
+    calls ``render()`` on response objects that have one through a thread
+    hop, even when they are already rendered.
+    """
+    if not hasattr(response, 'render'):
+        return response
+    response.render()
+    plain = HttpResponse(response.content, status=response.status_code)
+    for header, value in response.items():
+        plain[header] = value
+    return plain
+
+
+def async_list_view(view_class, **initkwargs):
+    """
+    ``view_class.as_view(**initkwargs)`` with an async GET path: the view is
+    set up and authorised as in ``APIView.dispatch()`` (which needs no
+    queries once the user is loaded) and the page is built by ``alist()``.
+    """
+    @async_get(view_class.as_view(**initkwargs))
+    async def list_view(request, *args, **kwargs):
+        if not accepts_json(request) or any(param in request.GET for param in SYNC_ONLY_PARAMS):
+            return None
+        if not (await aget_user(request)).is_authenticated:
+            return None
+        view = view_class(**initkwargs)
+        view.setup(request, *args, **kwargs)
+        drf_request = view.initialize_request(request, *args, **kwargs)
+        view.request = drf_request
+        view.headers = view.default_response_headers
+        try:
+            view.initial(drf_request, *args, **kwargs)
+            response = await view.alist(drf_request, *args, **kwargs)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        return rendered(view.finalize_response(drf_request, response, *args, **kwargs))
+
+    list_view.__name__ = list_view.__qualname__ = view_class.__name__
+    return list_view
+
+
+def deliver_or_none(request, instance, field_name):
+    """
+    Deliver ``instance``'s file in ``field_name``. None when there is no
+    instance or file, or the file is missing from storage: the sync view
+    answers with the 404.
+    """
+    if instance is None or not getattr(instance, field_name):
+        return None
+    try:
+        return deliver_file(
+            request,
+            getattr(instance, field_name),
+            checksum=instance.file_checksum,
+            filename=instance.file_name,
+        )
+    except OSError:
+        return None
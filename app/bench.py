@@ -0,0 +1,38 @@
+"""
+Timing helpers shared by the benchmark management commands.
+"""
+
+import gc
+import time
+
+
+def best_of(func, repeat=3):
+    """
+    Run ``func`` ``repeat`` times and return the fastest wall-clock time in
+    seconds together with the result of the last run. The garbage collector
+    is paused while timing so a collection doesn't land in one sample only.
+    """
+    timings = []
+    result = None
+    gc.collect()
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+    return min(timings), result
+
+
+def format_table(headers, rows):
+    """Plain-text table with right-aligned columns."""
+    rows = [[str(cell) for cell in row] for row in rows]
+    widths = [max(len(str(header)), *(len(row[index]) for row in rows)) for index, header in enumerate(headers)]
+    lines = ['  '.join(str(header).rjust(width) for header, width in zip(headers, widths))]
+    lines.append('  '.join('-' * width for width in widths))
+    lines += ['  '.join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows]
+    return '\n'.join(lines)
@@ -0,0 +1,179 @@
+"""
+Versioned response cache for list endpoints.
+
+``CachedListMixin`` stores the serialized page of a list view under a key
+built from the host, path, query parameters, the requesting user's
+visibility scope and the current value of the view's generation counters.
+Writers never delete cache entries; they call ``bump_generation(name)``
+(from model signals), which changes the key every later request computes,
+so stale entries are simply never read again and expire on their own.
+
+Counters and entries live in ``settings.RESPONSE_CACHE_ALIAS`` and only use
+``get``/``set``/``add``/``incr``, so any Django cache backend works,
+including local memory and the file backend.
+
+A page read from a read replica (see ``app.replicas``) is not stored while
+any of its generations was bumped within ``DATABASE_REPLICA_STICKY_SECONDS``:
+the replica may not have the write yet, and the entry would outlive the lag.
+
+Entries keep the ETag set by ``app.conditional.ConditionalListMixin`` (when
+the view uses it, listed after this mixin), so a hit can still be answered
+with a 304.
+"""
+
+import hashlib
+import random
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from app.conditional import not_modified
+from app.replicas import reading_from_replica, replica_configured
+
+GENERATION_KEY = 'respcache:gen:{}'
+BUMPED_KEY = 'respcache:bumped:{}'
+STATS_KEY = 'respcache:stats:{}'
+ENTRY_KEY = 'respcache:page:{}'
+
+
+def response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _increment(key):
+    cache = response_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def get_generation(name):
+    cache = response_cache()
+    key = GENERATION_KEY.format(name)
+    value = cache.get(key)
+    if value is None:
+        # Start (or restart, after eviction) somewhere no earlier entry can
+        # have been stored under.
+        cache.add(key, random.getrandbits(48), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def bump_generation(name):
+    """
+    Invalidate every cached response that depends on ``name``. The counter is
+    bumped now and again once the current transaction commits, so a response
+    built from the pre-commit state while the write was in flight is never
+    served either.
+    """
+    _bump(name)
+    transaction.on_commit(lambda: _bump(name))
+
+
+def _bump(name):
+    get_generation(name)
+    _increment(GENERATION_KEY.format(name))
+    if replica_configured():
+        response_cache().set(BUMPED_KEY.format(name), time.time(), timeout=None)
+
+
+def bumped_since(names, since):
+    """Whether any of the generations ``names`` was bumped after the timestamp ``since``."""
+    bumped = response_cache().get_many([BUMPED_KEY.format(name) for name in names])
+    return any(when > since for when in bumped.values())
+
+
+def record(outcome):
+    _increment(STATS_KEY.format(outcome))
+
+
+def cache_stats():
+    cache = response_cache()
+    hits = cache.get(STATS_KEY.format('hit'), 0)
+    misses = cache.get(STATS_KEY.format('miss'), 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
+
+
+class CachedListMixin:
+    """
+    Serve ``list()`` from the response cache. ``cache_generations`` names the
+    generation counters the listing depends on. Responses are shared by all
+    users with the same role unless ``cache_per_user`` is set, for views
+    whose queryset depends on who is asking. Responses carry ``X-Cache: HIT``
+    or ``MISS``.
+    """
+
+    cache_generations = ()
+    cache_per_user = False
+
+    def get_cache_scope(self, request):
+        user = request.user
+        if not user.is_authenticated:
+            return 'anonymous'
+        if self.cache_per_user:
+            return f'user:{user.pk}'
+        return f"role:{(getattr(user, 'role', None) or '').lower()}"
+
+    def get_response_cache_key(self, request):
+        parts = [
+            request.scheme,
+            request.get_host(),
+            request.path,
+            urlencode(sorted(request.query_params.lists()), doseq=True),
+            self.get_cache_scope(request),
+        ]
+        parts += [f'{name}={get_generation(name)}' for name in self.cache_generations]
+        return ENTRY_KEY.format(hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest())
+
+    def list(self, request, *args, **kwargs):
+        key, response = self.get_cached_response(request)
+        if response is not None:
+            return response
+        return self.cache_response(key, super().list(request, *args, **kwargs))
+
+    async def alist(self, request, *args, **kwargs):
+        # The cache is local memory or small files (see settings.CACHES);
+        # reading it directly is cheaper than a thread hop.
+        key, response = self.get_cached_response(request)
+        if response is not None:
+            return response
+        return self.cache_response(key, await super().alist(request, *args, **kwargs))
+
+    def get_cached_response(self, request):
+        """The cache key for ``request`` and the response stored under it, if any."""
+        key = self.get_response_cache_key(request)
+        entry = response_cache().get(key)
+        if entry is None:
+            record('miss')
+            return key, None
+        record('hit')
+        data, etag = entry
+        response = not_modified(request, etag=etag)
+        if response is None:
+            response = Response(data, headers={'ETag': etag} if etag else None)
+        response['X-Cache'] = 'HIT'
+        return key, response
+
+    def cache_response(self, key, response):
+        if response.status_code == 200 and not self.may_lag():
+            response_cache().set(key, (response.data, response.get('ETag')), settings.RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def may_lag(self):
+        """Whether this page was read from a replica that may miss a recent write."""
+        if not reading_from_replica():
+            return False
+        since = time.time() - settings.DATABASE_REPLICA_STICKY_SECONDS
+        return bumped_since(self.cache_generations, since)
@@ -0,0 +1,176 @@
+"""
+Read-only serialization straight from ``.values()`` rows.
+
+A ModelSerializer spends most of a large list in per-field machinery:
+``get_attribute`` on every field of every model instance, ``ReturnDict``
+bookkeeping and a ``to_representation`` call even for strings and ints.
+``compile_serializer`` inspects a serializer's readable fields once and
+turns each into a column of a ``.values()`` query plus a converter:
+
+* ints, strings and booleans are copied as they are,
+* primary key related fields are the foreign key column itself,
+* datetimes are converted to the current time zone and formatted the way
+  DRF's ISO 8601 output does (``Z`` for UTC),
+* files become ``storage.url(name)``, made absolute against the request,
+* anything else goes through the field's own ``to_representation``.
+
+The result renders to the same JSON bytes as the serializer it was compiled
+from. Serializers with fields that aren't a plain model column (method
+fields, nested serializers, dotted sources, to-many relations) can't be
+compiled and raise ImproperlyConfigured.
+
+``CompiledListMixin`` plugs this into the page building step of
+``app.conditional.ConditionalListMixin``, sync and async.
+"""
+
+import functools
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import fields as drf_fields
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+# Field classes whose to_representation returns database values unchanged.
+PASSTHROUGH_FIELDS = (drf_fields.BooleanField, drf_fields.CharField, drf_fields.IntegerField)
+
+
+def _representation(field):
+    def bind(request):
+        return field.to_representation
+    return bind
+
+
+def _primary_key(field):
+    if field.pk_field is not None:
+        return _representation(field.pk_field)
+    return None
+
+
+def _datetime(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601 or getattr(field, 'timezone', None):
+        return _representation(field)
+
+    def bind(request):
+        if not settings.USE_TZ:
+            return field.to_representation
+        current = timezone.get_current_timezone()
+
+        def convert(value):
+            if value.utcoffset() is None:
+                return field.to_representation(value)
+            text = value.astimezone(current).isoformat()
+            return text[:-6] + 'Z' if text.endswith('+00:00') else text
+        return convert
+    return bind
+
+
+def _file(field, model_field):
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        return lambda request: lambda value: value or None
+    url = model_field.storage.url
+
+    def bind(request):
+        if request is None:
+            return lambda value: url(value) if value else None
+        absolute = request.build_absolute_uri
+        return lambda value: absolute(url(value)) if value else None
+    return bind
+
+
+class CompiledSerializer:
+    """
+    ``columns`` is the ``.values()`` column list; ``render(rows, request)``
+    returns the serialized list for those rows. Each field has a converter
+    factory, called once per render with the request (so per-request state
+    such as the current time zone is looked up once, not per value), or
+    None when the column value is already the output.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        serializer = serializer_class()
+        model = serializer.Meta.model
+        self.fields = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            self.fields.append((name, field.source, self.get_converter(model, field)))
+        self.columns = tuple(dict.fromkeys(source for _, source, _ in self.fields))
+
+    def get_converter(self, model, field):
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            model_field = None
+        if model_field is None or not model_field.concrete or model_field.many_to_many:
+            raise ImproperlyConfigured(
+                f"{self.serializer_class.__name__}.{field.field_name} is not a model column and can't be compiled."
+            )
+        if isinstance(field, PrimaryKeyRelatedField):
+            if not model_field.is_relation or not model_field.target_field.primary_key:
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{field.field_name} must relate to a primary key."
+                )
+            return _primary_key(field)
+        if model_field.is_relation:
+            raise ImproperlyConfigured(
+                f"{self.serializer_class.__name__}.{field.field_name} is a relation that can't be compiled."
+            )
+        if isinstance(field, drf_fields.FileField):
+            return _file(field, model_field)
+        if isinstance(field, drf_fields.DateTimeField):
+            return _datetime(field)
+        if isinstance(field, PASSTHROUGH_FIELDS):
+            return None
+        return _representation(field)
+
+    def render(self, rows, request=None):
+        fields = [(name, source, bind and bind(request)) for name, source, bind in self.fields]
+        data = []
+        append = data.append
+        for row in rows:
+            item = {}
+            for name, source, convert in fields:
+                value = row[source]
+                item[name] = value if value is None or convert is None else convert(value)
+            append(item)
+        return data
+
+
+@functools.cache
+def compile_serializer(serializer_class):
+    return CompiledSerializer(serializer_class)
+
+
+class CompiledListMixin:
+    """
+    Build list pages from ``.values()`` rows with the compiled form of the
+    view's serializer instead of instantiating and serializing models. Put
+    it before ``ConditionalListMixin`` in the bases.
+    """
+
+    def get_list_rows(self, queryset):
+        compiled = compile_serializer(self.get_serializer_class())
+        # The paginator orders and seeks on annotations such as search_rank,
+        # so they stay in the rows.
+        rows = queryset.prefetch_related(None).values(*compiled.columns, *queryset.query.annotation_select)
+        return compiled, rows, self.get_serializer_context().get('request')
+
+    def get_list_response(self, queryset):
+        compiled, rows, request = self.get_list_rows(queryset)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(compiled.render(page, request))
+        return Response(compiled.render(rows, request))
+
+    async def aget_list_response(self, queryset):
+        compiled, rows, request = self.get_list_rows(queryset)
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(rows, self.request, view=self)
+            if page is not None:
+                return self.get_paginated_response(compiled.render(page, request))
+        return Response(compiled.render([row async for row in rows], request))
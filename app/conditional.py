@@ -0,0 +1,148 @@
+"""
+Conditional GET for generic list and detail views.
+
+``ConditionalListMixin`` fingerprints the filtered queryset with one
+aggregate query (the latest ``last_modified_field`` and the row count)
+before anything is paginated or serialized. The fingerprint, the request's
+query parameters, the caller and the negotiated format are hashed into a
+weak ETag; a request whose ``If-None-Match`` still matches gets a 304 and
+the page is never built. Any insert, update or delete in the collection
+moves either the timestamp or the count, so the ETag changes with it.
+
+Lists only send an ETag: ``Last-Modified`` can't express a deletion, so an
+``If-Modified-Since``-only client could be told a shrunken list had not
+changed. ``ConditionalRetrieveMixin`` sends both for single objects.
+
+``ConditionalListMixin.alist()`` does the same with async queries for
+``app.asyncviews.async_list_view``.
+
+Rows changed with ``QuerySet.update()`` must set ``last_modified_field``
+themselves.
+"""
+
+import hashlib
+from calendar import timegm
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    digest = hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return 'W/' + quote_etag(digest[:32])
+
+
+def set_validators(response, etag=None, last_modified=None):
+    if etag:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(timegm(last_modified.utctimetuple()))
+    return response
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """
+    The 304 (or 412) response for ``request`` given the current validators,
+    or None when the full response has to be sent.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    timestamp = timegm(last_modified.utctimetuple()) if last_modified is not None else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+class ConditionalMixin:
+    last_modified_field = 'updated_at'
+
+    def get_etag_scope(self, request):
+        user = request.user
+        return f'user:{user.pk}' if user.is_authenticated else 'anonymous'
+
+    def get_etag_parts(self, request):
+        renderer = getattr(request, 'accepted_renderer', None)
+        return [
+            request.path,
+            urlencode(sorted(request.query_params.lists()), doseq=True),
+            self.get_etag_scope(request),
+            getattr(renderer, 'format', ''),
+        ]
+
+
+class ConditionalListMixin(ConditionalMixin):
+    """
+    Answer conditional ``list()`` requests from an aggregate fingerprint of
+    the filtered queryset. Successful responses carry the ETag.
+    """
+
+    def get_list_fingerprint(self, queryset):
+        return queryset.order_by().aggregate(
+            last_modified=Max(self.last_modified_field),
+            count=Count('pk'),
+        )
+
+    async def aget_list_fingerprint(self, queryset):
+        return await queryset.order_by().aaggregate(
+            last_modified=Max(self.last_modified_field),
+            count=Count('pk'),
+        )
+
+    def get_list_etag(self, request, fingerprint):
+        return make_etag(
+            *self.get_etag_parts(request),
+            fingerprint['last_modified'] and fingerprint['last_modified'].isoformat(),
+            fingerprint['count'],
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = self.get_list_etag(request, self.get_list_fingerprint(queryset))
+        response = not_modified(request, etag=etag)
+        if response is not None:
+            return response
+        return set_validators(self.get_list_response(queryset), etag)
+
+    async def alist(self, request, *args, **kwargs):
+        """``list()`` with async queries, for ``app.asyncviews.async_list_view``."""
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = self.get_list_etag(request, await self.aget_list_fingerprint(queryset))
+        response = not_modified(request, etag=etag)
+        if response is not None:
+            return response
+        return set_validators(await self.aget_list_response(queryset), etag)
+
+    def get_list_response(self, queryset):
+        # ListModelMixin.list() from an already filtered queryset.
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    async def aget_list_response(self, queryset):
+        # Serializers may follow relations lazily, so this runs in a thread.
+        return await sync_to_async(self.get_list_response)(queryset)
+
+
+class ConditionalRetrieveMixin(ConditionalMixin):
+    """
+    Answer conditional ``retrieve()`` requests from the object's
+    ``last_modified_field`` before it is serialized.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        last_modified = getattr(instance, self.last_modified_field)
+        etag = make_etag(*self.get_etag_parts(request), instance.pk, last_modified.isoformat())
+        response = not_modified(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return response
+        serializer = self.get_serializer(instance)
+        return set_validators(Response(serializer.data), etag, last_modified)
@@ -0,0 +1,113 @@
+"""
+Pluggable file delivery backends.
+
+Download views authorise the request and then hand the file to the backend
+named by ``settings.FILE_DELIVERY_BACKEND``:
+
+* ``DirectDeliveryBackend`` streams the bytes from the Python worker
+  (see ``app.downloads.serve_file``). This is the default.
+* ``XAccelRedirectBackend`` returns an empty response carrying an
+  ``X-Accel-Redirect`` header so nginx serves the file from an ``internal``
+  location mapped onto ``MEDIA_ROOT``.
+* ``XSendfileBackend`` returns an ``X-Sendfile`` header with the absolute
+  path for Apache ``mod_xsendfile`` (or lighttpd).
+
+Offload backends still answer conditional requests themselves, so a 304
+never reaches the proxy. They never read the file: a row without a stored
+checksum gets a weak ETag from the file's size and modification time.
+"""
+
+import functools
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+from django.utils.module_loading import import_string
+
+from app.downloads import get_etag, get_last_modified, serve_file
+
+
+class BaseDeliveryBackend:
+    def serve(self, request, field_file, *, checksum=None, filename=None, as_attachment=True):
+        raise NotImplementedError("Delivery backends must implement serve()")
+
+
+class DirectDeliveryBackend(BaseDeliveryBackend):
+    def serve(self, request, field_file, *, checksum=None, filename=None, as_attachment=True):
+        return serve_file(
+            request,
+            field_file,
+            checksum=checksum,
+            filename=filename,
+            as_attachment=as_attachment,
+        )
+
+
+class OffloadDeliveryBackend(BaseDeliveryBackend):
+    """Base for backends that let the front proxy send the file body."""
+
+    header = None
+
+    def get_header_value(self, field_file):
+        raise NotImplementedError
+
+    def serve(self, request, field_file, *, checksum=None, filename=None, as_attachment=True):
+        filename = filename or os.path.basename(field_file.name)
+        last_modified = get_last_modified(field_file)
+        etag = get_etag(field_file, checksum, last_modified)
+
+        response = HttpResponse(
+            content_type=mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        )
+        if etag:
+            response.headers["ETag"] = etag
+        if last_modified is not None:
+            response.headers["Last-Modified"] = http_date(last_modified)
+        conditional = get_conditional_response(
+            request, etag=etag, last_modified=last_modified, response=response
+        )
+        if conditional is not response:
+            return conditional
+
+        response.headers[self.header] = self.get_header_value(field_file)
+        response.headers["Content-Disposition"] = content_disposition_header(
+            as_attachment, filename
+        )
+        return response
+
+
+class XAccelRedirectBackend(OffloadDeliveryBackend):
+    header = "X-Accel-Redirect"
+
+    def get_header_value(self, field_file):
+        prefix = settings.FILE_DELIVERY_ACCEL_PREFIX.rstrip("/")
+        return f"{prefix}/{quote(field_file.name)}"
+
+
+class XSendfileBackend(OffloadDeliveryBackend):
+    header = "X-Sendfile"
+
+    def get_header_value(self, field_file):
+        return field_file.path
+
+
+@functools.cache
+def get_delivery_backend():
+    return import_string(settings.FILE_DELIVERY_BACKEND)()
+
+
+@receiver(setting_changed)
+def _reset_delivery_backend(*, setting, **kwargs):
+    if setting in ("FILE_DELIVERY_BACKEND", "FILE_DELIVERY_ACCEL_PREFIX"):
+        get_delivery_backend.cache_clear()
+
+
+def deliver_file(request, field_file, **kwargs):
+    """Serve ``field_file`` through the configured delivery backend."""
+    return get_delivery_backend().serve(request, field_file, **kwargs)
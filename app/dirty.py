@@ -0,0 +1,89 @@
+"""
+Dirty-field tracking for models.
+
+``DirtyFieldsMixin`` keeps the values each instance was loaded with (taken
+in ``from_db()`` and ``refresh_from_db()``, and again after every save).
+``save()`` on a loaded instance then passes ``update_fields`` itself: the
+columns that differ from those values plus ``auto_now`` fields, so saving an
+unchanged instance still touches ``updated_at`` and sends the save signals
+(on a model without ``auto_now`` fields Django skips it). Explicit
+``update_fields`` and inserts behave as usual.
+
+A changed file field makes the save write every column: ``pre_save``
+handlers derive other columns (checksum, size, content type) from the file
+after ``update_fields`` is fixed. Values mutated in place (a dict or list
+held by a field) are not seen as changes; assign a new value instead.
+"""
+
+from django.db.models import DEFERRED
+from django.db.models.fields.files import FieldFile, FileField
+
+# Compares unequal to any loaded value.
+_CHANGED = object()
+
+
+def _comparable(field, value):
+    if isinstance(field, FileField):
+        if isinstance(value, FieldFile):
+            return value.name if value._committed else _CHANGED
+        # A str from the database, None, or a File assigned but not saved yet.
+        return value if value is None or isinstance(value, str) else _CHANGED
+    return value
+
+
+class DirtyFieldsMixin:
+    _loaded_values = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._snapshot()
+
+    def _snapshot(self, names=None):
+        fields = self._meta.concrete_fields
+        if names is not None:
+            fields = [self._meta.get_field(name) for name in names]
+        loaded = self._loaded_values if self._loaded_values is not None else {}
+        for field in fields:
+            if field.attname in self.__dict__:
+                loaded[field.attname] = _comparable(field, self.__dict__[field.attname])
+        self._loaded_values = loaded
+
+    def get_loaded_value(self, name, default=DEFERRED):
+        """The value field ``name`` was loaded (or last saved) with; ``default`` if unknown."""
+        if self._loaded_values is None:
+            return default
+        return self._loaded_values.get(self._meta.get_field(name).attname, default)
+
+    def get_dirty_fields(self):
+        """Names of the loaded fields whose value has changed since."""
+        if self._loaded_values is None:
+            return []
+        return [
+            field.name for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+            and _comparable(field, self.__dict__[field.attname])
+            != self._loaded_values.get(field.attname, _CHANGED)
+        ]
+
+    def get_update_fields(self):
+        """The ``update_fields`` for saving this loaded instance, or None to write every column."""
+        if self._loaded_values is None:
+            return None
+        dirty = self.get_dirty_fields()
+        if self._meta.pk.name in dirty or any(isinstance(self._meta.get_field(name), FileField) for name in dirty):
+            # A new pk means a copy to insert; see the module docstring for files.
+            return None
+        auto_now = [field.name for field in self._meta.concrete_fields if getattr(field, 'auto_now', False)]
+        return [*dirty, *(name for name in auto_now if name not in dirty)]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = self.get_update_fields()
+        super().save(*args, **kwargs)
+        self._snapshot(kwargs.get('update_fields'))
@@ -0,0 +1,283 @@
+"""
+Shared file download engine.
+
+Serves a stored file with byte-range (single and multi-range) support,
+ETag / Last-Modified validators and conditional GET (304/412) handling.
+Under ASGI the body is streamed through an async iterator so file reads
+never block the event loop; under WSGI a plain generator is used.
+"""
+
+import mimetypes
+import os
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import (
+    content_disposition_header,
+    http_date,
+    parse_http_date_safe,
+    quote_etag,
+)
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+# More ranges than this in a single request are ignored and the full file is
+# served instead, as allowed by RFC 9110 section 14.2.
+MAX_RANGES = 20
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def is_asgi_request(request):
+    """Return True when ``request`` (Django or DRF) is being served over ASGI."""
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+def parse_range_header(header, size):
+    """
+    Parse a ``Range`` header into a sorted list of ``(start, end)`` pairs
+    (inclusive). Overlapping or adjacent ranges are merged.
+
+    Returns None when the header should be ignored (missing, malformed,
+    not in bytes, or too many ranges) and raises ``RangeNotSatisfiable``
+    when none of the requested ranges overlap the file.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+
+    parts = spec.split(",")
+    if len(parts) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for part in parts:
+        first, sep, last = part.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else size - 1
+                if start > end:
+                    return None
+            else:
+                suffix = int(last)
+                if suffix == 0:
+                    continue
+                start, end = max(size - suffix, 0), size - 1
+        except ValueError:
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size - 1)))
+
+    if not ranges:
+        raise RangeNotSatisfiable
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _if_range_passes(request, etag, last_modified):
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        # Only strong validators may be used with If-Range.
+        return etag is not None and not if_range.startswith("W/") and if_range == etag
+    if_range_date = parse_http_date_safe(if_range)
+    return last_modified is not None and if_range_date == last_modified
+
+
+def _read_range(file, start, length, chunk_size):
+    file.seek(start)
+    while length > 0:
+        data = file.read(min(chunk_size, length))
+        if not data:
+            break
+        length -= len(data)
+        yield data
+
+
+def _iter_parts(field_file, segments, chunk_size):
+    """
+    Yield the response body. ``segments`` is a list of ``bytes`` literals
+    (multipart headers) and ``(start, length)`` file slices.
+    """
+    with field_file.storage.open(field_file.name, "rb") as file:
+        for segment in segments:
+            if isinstance(segment, bytes):
+                yield segment
+            else:
+                yield from _read_range(file, *segment, chunk_size)
+
+
+async def _aiter_parts(field_file, segments, chunk_size):
+    open_file = sync_to_async(field_file.storage.open, thread_sensitive=False)
+    file = await open_file(field_file.name, "rb")
+    seek = sync_to_async(file.seek, thread_sensitive=False)
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        for segment in segments:
+            if isinstance(segment, bytes):
+                yield segment
+                continue
+            start, length = segment
+            await seek(start)
+            while length > 0:
+                data = await read(min(chunk_size, length))
+                if not data:
+                    break
+                length -= len(data)
+                yield data
+    finally:
+        await sync_to_async(file.close, thread_sensitive=False)()
+
+
+def _multipart_segments(ranges, size, content_type, boundary):
+    segments = []
+    for start, end in ranges:
+        segments.append(
+            (
+                f"\r\n--{boundary}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+            ).encode("ascii")
+        )
+        segments.append((start, end - start + 1))
+    segments.append(f"\r\n--{boundary}--\r\n".encode("ascii"))
+    return segments
+
+
+def _segments_length(segments):
+    return sum(len(s) if isinstance(s, bytes) else s[1] for s in segments)
+
+
+def get_last_modified(field_file):
+    """Return the file's modification time as a UNIX timestamp, if known."""
+    try:
+        modified = field_file.storage.get_modified_time(field_file.name)
+    except (NotImplementedError, OSError):
+        return None
+    return int(modified.timestamp())
+
+
+def get_etag(field_file, checksum, last_modified, size=None):
+    """
+    A strong ETag from the stored content hash. Rows stored without one
+    get a weak ETag from the file's size and modification time, so no
+    request ever reads the file to hash it (``backfill_file_checksums``
+    stores the missing hashes).
+    """
+    if checksum:
+        return quote_etag(checksum)
+    if last_modified is None:
+        return None
+    if size is None:
+        try:
+            size = field_file.storage.size(field_file.name)
+        except (NotImplementedError, OSError):
+            return None
+    return f'W/"{size:x}-{last_modified:x}"'
+
+
+def serve_file(
+    request,
+    field_file,
+    *,
+    checksum=None,
+    filename=None,
+    as_attachment=True,
+    chunk_size=None,
+):
+    """
+    Build a download response for ``field_file``.
+
+    ``checksum`` is a stored content hash used as a strong ETag (see
+    ``get_etag``). Range, If-Range, If-None-Match and If-Modified-Since are
+    all honoured.
+    Raises ``FileNotFoundError`` when the file is missing from storage.
+    """
+    chunk_size = chunk_size or getattr(settings, "DOWNLOAD_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+    size = field_file.storage.size(field_file.name)
+    filename = filename or os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    last_modified = get_last_modified(field_file)
+    etag = get_etag(field_file, checksum, last_modified, size)
+
+    validators = HttpResponse()
+    if etag:
+        validators.headers["ETag"] = etag
+    if last_modified is not None:
+        validators.headers["Last-Modified"] = http_date(last_modified)
+    conditional = get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=validators
+    )
+    if conditional is not validators:
+        return conditional
+
+    status = 200
+    segments = [(0, size)]
+    response_type = content_type
+    content_range = None
+    ranges = None
+    if request.method == "GET" and _if_range_passes(request, etag, last_modified):
+        try:
+            ranges = parse_range_header(request.META.get("HTTP_RANGE"), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response.headers["Content-Range"] = f"bytes */{size}"
+            response.headers["Accept-Ranges"] = "bytes"
+            return response
+
+    if ranges and len(ranges) == 1:
+        start, end = ranges[0]
+        status = 206
+        segments = [(start, end - start + 1)]
+        content_range = f"bytes {start}-{end}/{size}"
+    elif ranges:
+        status = 206
+        boundary = uuid.uuid4().hex
+        segments = _multipart_segments(ranges, size, content_type, boundary)
+        response_type = f"multipart/byteranges; boundary={boundary}"
+
+    if request.method == "HEAD":
+        response = HttpResponse(status=status, content_type=response_type)
+    elif is_asgi_request(request):
+        response = StreamingHttpResponse(
+            _aiter_parts(field_file, segments, chunk_size),
+            status=status,
+            content_type=response_type,
+        )
+    else:
+        response = StreamingHttpResponse(
+            _iter_parts(field_file, segments, chunk_size),
+            status=status,
+            content_type=response_type,
+        )
+    response.headers["Content-Length"] = str(_segments_length(segments))
+    response.headers["Accept-Ranges"] = "bytes"
+    response.headers["Content-Disposition"] = content_disposition_header(
+        as_attachment, filename
+    )
+    if content_range:
+        response.headers["Content-Range"] = content_range
+    for header in ("ETag", "Last-Modified"):
+        if header in validators:
+            response.headers[header] = validators[header]
+    return response
@@ -0,0 +1,184 @@
+"""
+Eager loading derived from what is actually rendered.
+
+``serializer_related_lookups`` walks a serializer's readable fields
+(including nested serializers and dotted ``source`` paths) and returns the
+``select_related`` and ``prefetch_related`` lookups needed to render a list
+without one query per row. ``EagerLoadingMixin`` applies those, plus the
+to-one relations named by the request's active search and ordering fields,
+to a generic view's queryset. ``EagerLoadingAdmin`` does the same for admin
+changelists from ``list_display``/``search_fields``/``ordering`` and for the
+``__str__`` of related objects shown in foreign key choices.
+"""
+
+import functools
+
+from django.contrib import admin
+from django.contrib.admin.views.main import SEARCH_VAR
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.filters import SearchFilter
+from rest_framework.relations import ManyRelatedField, RelatedField
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+def _get_relation(model, name):
+    """Return the relation ``name`` on ``model`` (forward field or reverse accessor), or None."""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        field = next(
+            (rel for rel in model._meta.related_objects if rel.get_accessor_name() == name),
+            None,
+        )
+    if field is None or not field.is_relation:
+        return None
+    return field
+
+
+def _follow(model, names):
+    """
+    Follow ``names`` through relations of ``model``. Returns the relation path
+    that was followed, whether it crosses a to-many relation, the model it
+    ends on and the last relation field.
+    """
+    path, many, field = [], False, None
+    for name in names:
+        relation = _get_relation(model, name)
+        if relation is None:
+            break
+        path.append(name)
+        many = many or relation.many_to_many or relation.one_to_many
+        field = relation
+        model = relation.related_model
+    return path, many, model, field
+
+
+def related_lookups(model, lookups):
+    """
+    The ``select_related`` lookups for the to-one relations traversed by ORM
+    lookups such as ``'course_id__course_name'`` or ``'-assignment__due_date'``
+    (search field prefixes like ``'^'`` and ``'='`` are accepted).
+    To-many paths are skipped: they are joined in SQL, not rendered per row.
+    """
+    selected = set()
+    for lookup in lookups:
+        if not isinstance(lookup, str):
+            continue
+        names = lookup.lstrip('-^=@$').split(LOOKUP_SEP)
+        path, many, _, _ = _follow(model, names[:-1])
+        if path and not many:
+            selected.add(LOOKUP_SEP.join(path))
+    return selected
+
+
+def _collect(serializer, prefix, many):
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    select, prefetch = set(), set()
+    if model is None:
+        return select, prefetch
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        names = [] if field.source == '*' else field.source.split('.')
+        path, to_many, related_model, relation = _follow(model, names)
+
+        related_field = field.child_relation if isinstance(field, ManyRelatedField) else field
+        if (
+            isinstance(related_field, RelatedField)
+            and related_field.use_pk_only_optimization()
+            and path == names
+            and relation is not None
+            and relation.concrete
+            and not to_many
+        ):
+            # A primary key field reads the foreign key column on the row.
+            path = path[:-1]
+
+        if path:
+            lookup = LOOKUP_SEP.join(prefix + path)
+            (prefetch if many or to_many else select).add(lookup)
+
+        nested = field.child if isinstance(field, ListSerializer) else field
+        if isinstance(nested, BaseSerializer) and path == names:
+            nested_select, nested_prefetch = _collect(nested, prefix + path, many or to_many)
+            select |= nested_select
+            prefetch |= nested_prefetch
+    return select, prefetch
+
+
+@functools.cache
+def serializer_related_lookups(serializer_class):
+    """Return ``(select_related, prefetch_related)`` lookups for ``serializer_class``."""
+    select, prefetch = _collect(serializer_class(), [], False)
+    return frozenset(select), frozenset(prefetch)
+
+
+class EagerLoadingMixin:
+    """
+    Load the relations the serializer renders, and those the active search
+    and ordering join through, together with the rows of a generic view.
+    """
+
+    def get_eager_lookups(self, queryset):
+        select, prefetch = serializer_related_lookups(self.get_serializer_class())
+        select = set(select) | related_lookups(queryset.model, queryset.query.order_by)
+        for backend in self.filter_backends:
+            if issubclass(backend, SearchFilter) and self.request.query_params.get(backend.search_param):
+                select |= related_lookups(queryset.model, getattr(self, 'search_fields', None) or [])
+        return select, set(prefetch)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        select, prefetch = self.get_eager_lookups(queryset)
+        if select:
+            queryset = queryset.select_related(*sorted(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*sorted(prefetch))
+        return queryset
+
+
+class EagerLoadingAdmin(admin.ModelAdmin):
+    """
+    ModelAdmin whose changelist joins the to-one relations shown in
+    ``list_display`` or used by the ordering and an active search. Relations
+    read by the model's ``__str__`` are declared in ``str_select_related``
+    and are loaded wherever the admin renders that string: ``__str__``
+    columns, foreign key columns of other admins and foreign key choices.
+    """
+
+    str_select_related = ()
+
+    def _str_select_related(self, model):
+        if not self.admin_site.is_registered(model):
+            return ()
+        return getattr(self.admin_site.get_model_admin(model), 'str_select_related', ())
+
+    def get_list_select_related(self, request):
+        list_display = [name for name in self.get_list_display(request) if isinstance(name, str)]
+        lookups = list_display + list(self.get_ordering(request) or ())
+        if request.GET.get(SEARCH_VAR):
+            lookups += list(self.get_search_fields(request))
+        selected = related_lookups(self.model, lookups)
+
+        for name in list_display:
+            if name == '__str__':
+                selected |= set(self.str_select_related)
+                continue
+            relation = _get_relation(self.model, name)
+            if relation is not None and relation.concrete and not relation.many_to_many:
+                selected.add(name)
+                selected |= {
+                    f'{name}{LOOKUP_SEP}{lookup}' for lookup in self._str_select_related(relation.related_model)
+                }
+        return sorted(selected)
+
+    def get_field_queryset(self, db, db_field, request):
+        queryset = super().get_field_queryset(db, db_field, request)
+        str_select_related = self._str_select_related(db_field.remote_field.model)
+        if str_select_related:
+            if queryset is None:
+                queryset = db_field.remote_field.model._default_manager.using(db).all()
+            queryset = queryset.select_related(*str_select_related)
+        return queryset
@@ -0,0 +1,44 @@
+"""
+Middleware that keeps the ASGI request path async.
+
+Django runs a sync-only middleware under ASGI by switching to a thread for
+it and back to the event loop for everything inside it, on every request.
+WhiteNoise's middleware is sync-only and sits near the top of the stack, so
+it would put every request (and the async views in ``app.asyncviews``)
+through that round trip even though it only ever serves static files.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise import middleware
+
+
+class WhiteNoiseMiddleware(middleware.WhiteNoiseMiddleware):
+    """
+    ``whitenoise.middleware.WhiteNoiseMiddleware`` that can also run async.
+    Requests for anything but a static file go straight on; static files
+    (and the file lookup when ``autorefresh`` is on) are served from a
+    thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
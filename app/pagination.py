@@ -0,0 +1,286 @@
+"""
+Keyset (cursor) pagination used by every list endpoint.
+
+Rows are ordered by the active ordering (the view's OrderingFilter, the
+queryset's explicit order_by, or the model's Meta.ordering) followed by the
+primary key as a tiebreaker. The cursor holds that key tuple for the last
+(or first) row of the page, and the next page is fetched with a seek
+predicate such as
+
+    WHERE (uploaded_at > :t) OR (uploaded_at = :t AND id > :id)
+
+instead of an OFFSET. Every page therefore costs one index range scan,
+however deep into the collection it is.
+"""
+
+import base64
+import binascii
+import datetime
+import decimal
+import json
+import uuid
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class OrderingKey:
+    """One column of the keyset: a field path or annotation and its direction."""
+
+    def __init__(self, queryset, term, index):
+        model = queryset.model
+        self.descending = term.startswith('-')
+        path = term.lstrip('-')
+        if path == 'pk':
+            path = model._meta.pk.name
+        self.annotation = None
+        if path in queryset.query.annotations:
+            self.field = queryset.query.annotations[path].output_field
+            self.lookup = path
+            self.nullable = True
+        elif '__' in path:
+            # Related columns are annotated onto the row under a private alias.
+            self.field = _resolve_field(model, path)
+            self.lookup = f'_keyset_{index}'
+            self.annotation = F(path)
+            self.nullable = True
+        else:
+            self.field = _resolve_field(model, path)
+            self.lookup = self.field.attname
+            self.nullable = self.field.null
+
+    def order_by(self, reverse=False):
+        expression = F(self.lookup)
+        descending = self.descending != reverse
+        # NULLs go after every value in the forward direction. Non-nullable
+        # columns keep a plain ORDER BY so an ordinary index can serve it.
+        nulls = {}
+        if self.nullable:
+            nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+        return expression.desc(**nulls) if descending else expression.asc(**nulls)
+
+    def after(self, value, reverse=False):
+        """Rows strictly after ``value`` on this column, in the direction read."""
+        if value is None:
+            return Q(**{f'{self.lookup}__isnull': False}) if reverse else Q(pk__in=[])
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        condition = Q(**{f'{self.lookup}__{lookup}': value})
+        if self.nullable and not reverse:
+            condition |= Q(**{f'{self.lookup}__isnull': True})
+        return condition
+
+    def equal(self, value):
+        if value is None:
+            return Q(**{f'{self.lookup}__isnull': True})
+        return Q(**{self.lookup: value})
+
+    def value_of(self, row):
+        if isinstance(row, dict):
+            # .values() rows key foreign keys by field name, not attname.
+            return row[self.lookup] if self.lookup in row else row[self.field.name]
+        return getattr(row, self.lookup)
+
+    def encode(self, value):
+        if isinstance(value, (datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, (decimal.Decimal, uuid.UUID)):
+            return str(value)
+        return value
+
+    def decode(self, value):
+        if value is None:
+            return None
+        target = self.field.target_field if self.field.is_relation else self.field
+        return target.to_python(value)
+
+
+def _resolve_field(model, path):
+    field = None
+    for name in path.split('__'):
+        field = model._meta.get_field(name)
+        if field.is_relation:
+            model = field.related_model
+    return field
+
+
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size,
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering_terms(self, request, queryset, view):
+        terms = None
+        for backend in getattr(view, 'filter_backends', None) or []:
+            if issubclass(backend, OrderingFilter):
+                terms = backend().get_ordering(request, queryset, view)
+                break
+        if not terms:
+            terms = [term for term in queryset.query.order_by if isinstance(term, str)]
+        if not terms:
+            terms = list(queryset.model._meta.ordering)
+        terms = [term for term in terms if isinstance(term, str) and term != '?']
+
+        pk_name = queryset.model._meta.pk.name
+        if not any(term.lstrip('-') in ('pk', pk_name) for term in terms):
+            # The primary key makes the ordering total, so no row is skipped
+            # or repeated between pages when the leading columns tie.
+            descending = bool(terms) and terms[-1].startswith('-')
+            terms.append(f'-{pk_name}' if descending else pk_name)
+        return terms
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.start_page(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.finish_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset()`` reading the page with the async ORM."""
+        page_queryset = self.start_page(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.finish_page([row async for row in page_queryset])
+
+    def start_page(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        return self.get_page_queryset(queryset, request, view)
+
+    def finish_page(self, rows):
+        """The page from the rows of the page query; sets the neighbouring cursors."""
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        if self.reverse:
+            has_next, has_previous = self.position is not None, has_more
+        else:
+            has_next, has_previous = has_more, self.position is not None
+        self.next_position = self.position_of(rows[-1]) if has_next and rows else None
+        self.previous_position = self.position_of(rows[0]) if has_previous and rows else None
+        return rows
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        The unevaluated query for the requested page (one extra row to detect
+        a following page), or None when ``queryset`` cannot be keyset-paginated.
+        """
+        try:
+            self.keys = [
+                OrderingKey(queryset, term, index)
+                for index, term in enumerate(self.get_ordering_terms(request, queryset, view))
+            ]
+        except FieldDoesNotExist:
+            return None
+
+        annotations = {key.lookup: key.annotation for key in self.keys if key.annotation is not None}
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+
+        self.position, self.reverse = self.decode_cursor(request)
+        if self.position is not None:
+            queryset = queryset.filter(self.seek(self.position, self.reverse))
+        queryset = queryset.order_by(*(key.order_by(self.reverse) for key in self.keys))
+        return queryset[:self.page_size + 1]
+
+    def seek(self, position, reverse=False):
+        condition = Q(pk__in=[])
+        equal = Q()
+        for key, value in zip(self.keys, position):
+            condition |= equal & key.after(value, reverse)
+            equal &= key.equal(value)
+        return condition
+
+    def position_of(self, row):
+        return [key.encode(key.value_of(row)) for key in self.keys]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values = payload['p']
+            if len(values) != len(self.keys):
+                raise ValueError
+            position = [key.decode(value) for key, value in zip(self.keys, values)]
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound('Invalid cursor')
+
+    def encode_position(self, position, reverse):
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def encode_cursor(self, position, reverse):
+        encoded = self.encode_position(position, reverse)
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Number of results to return per page (max {self.max_page_size}).',
+                'schema': {'type': 'integer'},
+            },
+        ]
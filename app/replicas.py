@@ -0,0 +1,144 @@
+"""
+Read-replica routing.
+
+When ``DATABASES`` has a ``replica`` alias (``DATABASE_REPLICA_URL``),
+``ReplicaMiddleware`` lets the reads of safe requests to views with
+``read_from_replica = True`` (the resource, assignment and submission lists
+with their searches, and the download views' permission lookups) go to it;
+``ReplicaRouter`` sends everything else, and every write, to ``default``.
+
+A replica lags behind the primary, so a client that has just written must
+not read from it straight away. A request that writes (any ``POST``,
+``PUT``, ``PATCH`` or ``DELETE``, or a ``GET`` whose view saves something)
+sets the ``REPLICA_PIN_COOKIE`` for ``DATABASE_REPLICA_STICKY_SECONDS``,
+and requests carrying it read from the primary. Within a request, reads
+after the first write (and ``select_for_update()``, which Django routes as
+a write) use the primary too.
+
+Sessions and users are always read from the primary: ``custom.sessions``
+caches them per process and would otherwise keep a lagging answer (a
+deactivated user, say) for ``AUTH_CACHE_TTL``.
+
+For a local stand-in, point ``DATABASE_URL`` and ``DATABASE_REPLICA_URL``
+at two SQLite files and refresh the replica with
+``python manage.py copy_sqlite_replica``.
+"""
+
+import contextvars
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import Resolver404, resolve
+
+REPLICA_DB_ALIAS = 'replica'
+REPLICA_PIN_COOKIE = 'pin_primary'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Models only ever read from the primary (see the module docstring).
+PRIMARY_MODELS = ('sessions.session', settings.AUTH_USER_MODEL.lower())
+
+_request = contextvars.ContextVar('replica_request', default=None)
+
+
+class RequestRouting:
+    """How the current request reads; shared by every thread serving it."""
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in connections
+
+
+def reading_from_replica():
+    """Whether reads made now, in the current request, go to the replica."""
+    routing = _request.get()
+    return routing is not None and routing.use_replica
+
+
+def reads_from_replica(view):
+    """Whether the URL callback ``view`` (a view function or ``as_view()``) is marked ``read_from_replica``."""
+    view_class = getattr(view, 'cls', None) or getattr(view, 'view_class', None)
+    return getattr(view, 'read_from_replica', False) or getattr(view_class, 'read_from_replica', False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower not in PRIMARY_MODELS and reading_from_replica():
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        routing = _request.get()
+        if routing is not None:
+            routing.use_replica = False
+            routing.wrote = True
+        # Explicit, so instances read from the replica are saved to the primary.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = (DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS)
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaMiddleware:
+    """Decides, per request, whether ``ReplicaRouter`` may use the replica; sync and async."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not replica_configured():
+            return self.get_response(request)
+        routing = self.routing(request)
+        token = _request.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request.reset(token)
+        return self.pin(request, routing, response)
+
+    async def __acall__(self, request):
+        if not replica_configured():
+            return await self.get_response(request)
+        routing = self.routing(request)
+        token = _request.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request.reset(token)
+        return self.pin(request, routing, response)
+
+    def routing(self, request):
+        use_replica = request.method in SAFE_METHODS and REPLICA_PIN_COOKIE not in request.COOKIES
+        if use_replica:
+            try:
+                match = resolve(request.path_info, getattr(request, 'urlconf', None))
+            except Resolver404:
+                use_replica = False
+            else:
+                use_replica = reads_from_replica(match.func)
+        return RequestRouting(use_replica)
+
+    def pin(self, request, routing, response):
+        if routing.wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, '1',
+                max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+                secure=request.is_secure(), httponly=True, samesite='Lax',
+            )
+        return response
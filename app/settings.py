@@ -50,6 +50,7 @@ DEFAULT_APPS = [
 ]
 
 LOCAL_APPS = [
+    'app',
     'custom',
     'student',
     'lecture',
@@ -60,12 +61,13 @@ INSTALLED_APPS = THIRD_PARTY_APPS + DEFAULT_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'app.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'custom.middleware.AuthenticationMiddleware',
+    'app.replicas.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -94,12 +96,52 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# DATABASE_URL selects the primary database (default: db.sqlite3 below) and
+# DATABASE_REPLICA_URL adds a read replica, which app/replicas.py routes safe
+# list, search and download reads to. A client that writes reads from the
+# primary for the next DATABASE_REPLICA_STICKY_SECONDS.
+#
+# On PostgreSQL each worker process keeps a psycopg pool of up to
+# DATABASE_POOL_SIZE connections, checked before being handed out. With
+# DATABASE_POOL_SIZE=0 connections are instead kept for DATABASE_CONN_MAX_AGE
+# seconds and checked at the start of each request; Django can't do both.
+# Under ASGI every request runs its sync code in a new thread, so persistent
+# connections only pay off under WSGI.
+DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 10))
+DATABASE_CONN_MAX_AGE = int(os.environ.get('DATABASE_CONN_MAX_AGE', 0))
+DATABASE_REPLICA_STICKY_SECONDS = int(os.environ.get('DATABASE_REPLICA_STICKY_SECONDS', 10))
+
+
+def database_config(url):
+    config = dj_database_url.parse(url, conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=True)
+    if DATABASE_POOL_SIZE and config['ENGINE'] == 'django.db.backends.postgresql':
+        # CONN_HEALTH_CHECKS makes Django give the pool its connection check.
+        config['CONN_MAX_AGE'] = 0
+        config.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': min(2, DATABASE_POOL_SIZE),
+            'max_size': DATABASE_POOL_SIZE,
+        }
+    return config
+
+
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    'default': database_config(os.environ.get('DATABASE_URL') or f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
 }
+if os.environ.get('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = database_config(os.environ['DATABASE_REPLICA_URL'])
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['app.replicas.ReplicaRouter']
+
+# Tuning applied to every SQLite connection (see app/sqlite.py): WAL with
+# synchronous=NORMAL, a busy timeout in ms, up to SQLITE_MMAP_SIZE bytes
+# memory-mapped, SQLITE_CACHE_SIZE KiB of page cache per connection and fresh
+# planner statistics every SQLITE_OPTIMIZE_INTERVAL seconds. SQLITE_TUNING=0
+# leaves connections at SQLite's defaults.
+SQLITE_TUNING = bool(int(os.environ.get('SQLITE_TUNING', 1)))
+SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20000))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', 64 * 1024))
+SQLITE_OPTIMIZE_INTERVAL = int(os.environ.get('SQLITE_OPTIMIZE_INTERVAL', 60 * 60))
 
 
 # Password validation
@@ -141,6 +183,68 @@ STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 
+# Uploaded files (resources, submissions)
+
+MEDIA_URL = 'media/'
+
+MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+# Largest file each role may upload, in bytes (see resources/uploadhandlers.py)
+UPLOAD_SIZE_LIMITS = {
+    'student': 50 * 1024 * 1024,
+    'cr': 500 * 1024 * 1024,
+    'lecture': 4 * 1024 * 1024 * 1024,
+}
+
+# Resumable chunked uploads (see resources/uploads.py)
+CHUNKED_UPLOAD_DIR = os.path.join(MEDIA_ROOT, "chunked_uploads")
+CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Read size used when streaming downloads (see app/downloads.py)
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+# How download views hand files to the client (see app/delivery.py).
+# Set to 'app.delivery.XAccelRedirectBackend' behind nginx or
+# 'app.delivery.XSendfileBackend' behind Apache to offload file bodies.
+FILE_DELIVERY_BACKEND = os.environ.get('FILE_DELIVERY_BACKEND', 'app.delivery.DirectDeliveryBackend')
+
+# nginx `internal` location that aliases MEDIA_ROOT (X-Accel-Redirect only)
+FILE_DELIVERY_ACCEL_PREFIX = os.environ.get('FILE_DELIVERY_ACCEL_PREFIX', '/protected-media/')
+
+# Caches. The "responses" cache holds cached list responses and their
+# generation counters (see app/caching.py). Local memory is per process, so
+# when running several worker processes set RESPONSE_CACHE_LOCATION to a
+# directory they share; invalidations then reach every worker.
+RESPONSE_CACHE_LOCATION = os.environ.get('RESPONSE_CACHE_LOCATION')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': (
+            'django.core.cache.backends.filebased.FileBasedCache'
+            if RESPONSE_CACHE_LOCATION
+            else 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': RESPONSE_CACHE_LOCATION or 'responses',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    # Versions of the sessions and users cached by each worker (see
+    # custom/sessions.py).
+    'auth': {
+        'BACKEND': (
+            'django.core.cache.backends.filebased.FileBasedCache'
+            if RESPONSE_CACHE_LOCATION
+            else 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.path.join(RESPONSE_CACHE_LOCATION, 'auth') if RESPONSE_CACHE_LOCATION else 'auth',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+}
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -150,6 +254,40 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom User Model
 AUTH_USER_MODEL = 'custom.User'
 
+# Login by email with one indexed lookup; ModelBackend keeps username logins
+# (admin, createsuperuser) working.
+AUTHENTICATION_BACKENDS = [
+    'custom.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# The first hasher sets the cost of new hashes; hashes made at any other
+# PBKDF2 iteration count are re-encoded when their owner logs in (see
+# custom/hashers.py). Unset keeps Django's default.
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 0)) or None
+PASSWORD_HASHERS = [
+    'custom.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Threads verifying passwords for async logins, per worker process (see
+# custom/backends.py). Unset: min(4, CPU count).
+PASSWORD_CHECK_THREADS = int(os.environ.get('PASSWORD_CHECK_THREADS', 0)) or None
+
+# Sessions and the users they belong to are cached per worker process (see
+# custom/sessions.py), so most requests authenticate without a query. Every
+# hit checks a version in the AUTH_CACHE_ALIAS cache, which a logout,
+# deactivation or password change deletes; that cache has to be shared by
+# the workers, so the caches are only on by default with
+# RESPONSE_CACHE_LOCATION set. AUTH_CACHE_TTL=0 turns them off.
+SESSION_ENGINE = 'custom.sessions'
+AUTH_CACHE_ALIAS = 'auth'
+AUTH_CACHE_TTL = int(os.environ.get('AUTH_CACHE_TTL', 30 if RESPONSE_CACHE_LOCATION else 0))
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', 10000))
+
 ACCOUNT_UNIQUE_EMAIL = True
 
 REST_FRAMEWORK = {
@@ -158,6 +296,8 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'app.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
 SPECTACULAR_SETTINGS = {
@@ -0,0 +1,108 @@
+"""
+SQLite production profile.
+
+Many deployments run on the SQLite file. Every SQLite connection is tuned
+when it is opened (``connection_created``, connected in ``app.apps``),
+unless ``SQLITE_TUNING`` is off:
+
+* ``journal_mode=WAL``: readers no longer block the writer, or it them.
+* ``synchronous=NORMAL``: with WAL a commit doesn't wait for an fsync. A
+  power cut can lose the last commits but can't corrupt the file.
+* ``busy_timeout``: a writer waits up to ``SQLITE_BUSY_TIMEOUT`` ms for
+  the write lock before failing with "database is locked".
+* ``mmap_size`` and ``cache_size``: up to ``SQLITE_MMAP_SIZE`` bytes of the
+  file are read through memory mapping, and each connection caches
+  ``SQLITE_CACHE_SIZE`` KiB of pages.
+* ``temp_store=MEMORY``: sorts and temporary indexes stay off disk.
+* Every ``SQLITE_OPTIMIZE_INTERVAL`` seconds, one new connection per process
+  refreshes the planner statistics (``PRAGMA optimize``; before SQLite
+  3.46 a fresh connection has nothing to optimize, so a bounded
+  ``ANALYZE`` instead).
+
+SQLite still allows one writer at a time. ``write_transaction()`` wraps
+write paths that arrive in bursts, such as submissions in the minutes before
+a deadline. It begins with ``BEGIN IMMEDIATE``, so the transaction holds
+the write lock before its first statement: it can't start as a reader and
+then fail to upgrade, which the busy timeout doesn't retry. Threads of one
+process also queue on a lock rather than polling SQLite's busy handler,
+which lets a waiting writer sleep past lock releases. On other databases,
+or inside a transaction, it is ``transaction.atomic()``.
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+# Rows sampled per index by the periodic ANALYZE.
+ANALYSIS_LIMIT = 400
+
+_optimize_lock = threading.Lock()
+_next_optimize = 0
+
+_write_lock = threading.Lock()
+
+
+def pragmas():
+    return {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': settings.SQLITE_BUSY_TIMEOUT,
+        'mmap_size': settings.SQLITE_MMAP_SIZE,
+        'cache_size': -settings.SQLITE_CACHE_SIZE,
+        'temp_store': 'MEMORY',
+    }
+
+
+def optimize_due():
+    """True for the first caller after each ``SQLITE_OPTIMIZE_INTERVAL``."""
+    global _next_optimize
+    with _optimize_lock:
+        now = time.monotonic()
+        if now < _next_optimize:
+            return False
+        _next_optimize = now + settings.SQLITE_OPTIMIZE_INTERVAL
+        return True
+
+
+def optimize(cursor):
+    cursor.execute(f'PRAGMA analysis_limit={ANALYSIS_LIMIT}')
+    if sqlite3.sqlite_version_info >= (3, 46):
+        # 0x10000: check every table, not only those this connection used.
+        cursor.execute('PRAGMA optimize=0x10002')
+    else:
+        cursor.execute('ANALYZE')
+
+
+def tune_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.SQLITE_TUNING:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas().items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        if optimize_due():
+            optimize(cursor)
+
+
+@contextmanager
+def write_transaction(using=None):
+    """``transaction.atomic(using)`` that takes SQLite's write lock up front (see the module docstring)."""
+    using = using or DEFAULT_DB_ALIAS
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not settings.SQLITE_TUNING or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+    with _write_lock:
+        connection.ensure_connection()
+        mode = connection.transaction_mode
+        connection.transaction_mode = 'IMMEDIATE'
+        try:
+            with transaction.atomic(using=using):
+                connection.transaction_mode = mode
+                yield
+        finally:
+            connection.transaction_mode = mode
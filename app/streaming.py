@@ -0,0 +1,187 @@
+"""
+Streaming list exports.
+
+``StreamingListMixin`` adds two renderers to a list view: ``?format=ndjson``
+(or ``Accept: application/x-ndjson``) streams newline-delimited JSON and
+``?format=json-stream`` streams one JSON array. Either skips pagination and
+sends every row of the filtered queryset through a
+``StreamingHttpResponse``. Rows are read with ``.iterator(chunk_size=...)``,
+serialized one chunk at a time (with the compiled serializer when the view's
+serializer can be compiled) and written as soon as they are encoded, so
+memory use is bounded by the chunk size rather than the size of the export.
+
+Under ASGI the content is an async generator over ``.aiterator()``: Django
+would otherwise read a synchronous iterator to the end before sending any
+of it. ``streaming_response`` does the same for any other source of record
+batches, such as the gradebook export.
+"""
+
+import csv
+import io
+from itertools import islice
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+from app.compiled import compile_serializer
+
+
+class StreamingRenderer(BaseRenderer):
+    """
+    Base for renderers that write a list as it is produced. ``render()`` is
+    only used for responses that aren't streamed, such as errors.
+    """
+    streaming = True
+    charset = None
+
+    def __init__(self):
+        self.encoder = encoders.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data, accepted_media_type, renderer_context)
+
+    def start(self):
+        return b''
+
+    def encode_batch(self, items, first):
+        raise NotImplementedError
+
+    def end(self):
+        return b''
+
+
+class JSONStreamRenderer(StreamingRenderer):
+    media_type = 'application/json'
+    format = 'json-stream'
+
+    def start(self):
+        return b'['
+
+    def encode_batch(self, items, first):
+        encoded = ','.join(self.encoder.encode(item) for item in items).encode('utf-8')
+        return encoded if first else b',' + encoded
+
+    def end(self):
+        return b']'
+
+
+class NDJSONRenderer(StreamingRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(data, accepted_media_type, renderer_context) + b'\n'
+
+    def encode_batch(self, items, first):
+        return ''.join(self.encoder.encode(item) + '\n' for item in items).encode('utf-8')
+
+
+class CSVStreamRenderer(StreamingRenderer):
+    """Records are lists of cells; the first record is normally the header row."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def encode_batch(self, items, first):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(items)
+        return buffer.getvalue().encode('utf-8')
+
+
+def is_asgi_request(request):
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def stream_batches(renderer, batches):
+    yield renderer.start()
+    first = True
+    for batch in batches:
+        yield renderer.encode_batch(batch, first)
+        first = False
+    yield renderer.end()
+
+
+async def astream_batches(renderer, batches):
+    yield renderer.start()
+    first = True
+    async for batch in batches:
+        yield renderer.encode_batch(batch, first)
+        first = False
+    yield renderer.end()
+
+
+def streaming_response(request, renderer, batches, abatches):
+    """
+    A StreamingHttpResponse writing the record batches produced by
+    ``batches()`` (WSGI) or the async generator ``abatches()`` (ASGI).
+    """
+    if is_asgi_request(request):
+        content = astream_batches(renderer, abatches())
+    else:
+        content = stream_batches(renderer, batches())
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type += f'; charset={renderer.charset}'
+    return StreamingHttpResponse(content, content_type=content_type)
+
+
+def batched(rows, size):
+    """Group an iterable into lists of at most ``size`` items."""
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+async def abatched(rows, size):
+    """``batched()`` for async iterables."""
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class StreamingListMixin:
+    """
+    Stream the whole filtered queryset when a streaming renderer is
+    selected; other formats go through the normal paginated ``list()``.
+    """
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, JSONStreamRenderer, NDJSONRenderer]
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if not getattr(renderer, 'streaming', False):
+            return super().list(request, *args, **kwargs)
+
+        queryset, serialize = self.get_stream_rows(self.filter_queryset(self.get_queryset()))
+        size = self.stream_chunk_size
+
+        def batches():
+            for rows in batched(queryset.iterator(chunk_size=size), size):
+                yield serialize(rows)
+
+        async def abatches():
+            async for rows in abatched(queryset.aiterator(chunk_size=size), size):
+                yield serialize(rows)
+
+        return streaming_response(request, renderer, batches, abatches)
+
+    def get_stream_rows(self, queryset):
+        """The queryset to stream and a function turning a list of its rows into output dicts."""
+        context = self.get_serializer_context()
+        serializer_class = self.get_serializer_class()
+        try:
+            compiled = compile_serializer(serializer_class)
+        except ImproperlyConfigured:
+            return queryset, lambda rows: serializer_class(rows, many=True, context=context).data
+        request = context.get('request')
+        rows = queryset.prefetch_related(None).values(*compiled.columns)
+        return rows, lambda batch: compiled.render(batch, request)
@@ -1,6 +1,6 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from custom.api.views import UserListView, UserProfileView, user_role_view
+from custom.api.views import RosterImportView, UserListView, UserProfileView, auser_role_view
 
 urlpatterns = []
 router = DefaultRouter()
@@ -9,5 +9,6 @@ urlpatterns += router.urls
 
 urlpatterns += [
     path('profile/', UserProfileView.as_view(), name='user-profile'),
-    path('role/', user_role_view, name='user-role'),
+    path('role/', auser_role_view, name='user-role'),
+    path('roster/', RosterImportView.as_view(), name='roster-import'),
 ]
\ No newline at end of file
@@ -1,15 +1,28 @@
+import json
+import os
+
+from django.contrib.auth import aauthenticate, alogin
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
+from django.views.decorators.http import require_POST
+
 from custom.models import User
+from custom.roster import PROFILE_MODELS, RosterImport, read_rows
 from .serializers import UserSerializer
 from rest_framework.views import APIView
 from .filters import UserFilter
 from rest_framework.response import Response
 from rest_framework import viewsets, filters
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework import status
 from rest_framework import generics
 from rest_framework.decorators import api_view, permission_classes
+from app.asyncviews import aget_user, async_get, json_response
+from app.streaming import StreamingListMixin
 
-class UserListView(viewsets.ModelViewSet):
+class UserListView(StreamingListMixin, viewsets.ModelViewSet):
     serializer_class = UserSerializer
     queryset = User.objects.all()
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -26,4 +39,98 @@ class UserProfileView(generics.RetrieveAPIView):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_role_view(request):
-    return Response({'role': request.user.role})
\ No newline at end of file
+    return Response({'role': request.user.role})
+
+
+@async_get(user_role_view)
+async def auser_role_view(request):
+    user = await aget_user(request)
+    if not user.is_authenticated:
+        return None
+    return json_response({'role': user.role})
+
+
+@ensure_csrf_cookie
+async def acheck_auth(request):
+    """GET handler for the student and lecturer ``check_auth`` views."""
+    user = await request.auser()
+    return JsonResponse({"isAuthenticated": user.is_authenticated})
+
+
+async def awho_am_i(request):
+    """GET handler for the student and lecturer ``WhoAmIView``."""
+    user = await aget_user(request, fields=('full_name', 'email'))
+    if not user.is_authenticated:
+        return None
+    return JsonResponse({
+        'full_name': user.full_name,
+        'username': user.username,
+        'email': user.email,
+    })
+
+
+class RosterImportView(APIView):
+    """
+    Create accounts from a roster: ``?role=student`` (or ``lecture``) with
+    either a JSON list of rows as the body or a CSV/JSON ``file`` upload.
+    Responds with the number of accounts created and the rows that failed.
+    """
+    permission_classes = [IsAdminUser]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def post(self, request, format=None):
+        role = request.query_params.get('role')
+        if role not in PROFILE_MODELS:
+            return Response({'detail': f"role must be one of {', '.join(PROFILE_MODELS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rows = self.get_rows(request)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        # Never a process pool here (see custom.roster).
+        report = RosterImport(rows, role).run(workers=1).report()
+        return Response(report, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST)
+
+    def get_rows(self, request):
+        if isinstance(request.data, list):
+            return request.data
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValueError("Send a JSON list of rows or a roster file as 'file'.")
+        roster_format = os.path.splitext(upload.name)[1].lstrip('.').lower()
+        return read_rows(upload.read(), roster_format)
+
+
+def _credentials(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None, None
+        return (data.get('email'), data.get('password')) if isinstance(data, dict) else (None, None)
+    return request.POST.get('email'), request.POST.get('password')
+
+
+def email_login_view(serializer_class):
+    """
+    The email and password login view for a role, answering with the user
+    rendered by ``serializer_class``. It runs natively under ASGI: the user
+    is looked up with one query and the password checked in the
+    custom.backends thread pool, so a burst of logins doesn't hold up the
+    event loop.
+    """
+    @csrf_exempt
+    @require_POST
+    async def login_view(request):
+        email, password = _credentials(request)
+        if not email or not password:
+            return JsonResponse({"Info": "Email and Password are needed"}, status=400)
+
+        user = await aauthenticate(request, email=email, password=password)
+        if user is None:
+            return JsonResponse({"Info": "Incorrect email or password"}, status=400)
+
+        await alogin(request, user)
+        return JsonResponse({"user": serializer_class(user).data, "Info": "User logged in successfully"})
+
+    return login_view
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CustomConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'custom'
+
+    def ready(self):
+        from . import signals  # noqa: F401
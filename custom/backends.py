@@ -0,0 +1,66 @@
+"""
+Email authentication.
+
+``EmailBackend`` resolves the user with a single ``LOWER(email)`` lookup
+(served by ``user_email_lower_idx``, see ``UserManager.by_email``) instead
+of finding the username first and letting ``ModelBackend`` query again.
+
+Its async path, used by ``aauthenticate()``/the login views, runs the
+password hash in a bounded thread pool (``PASSWORD_CHECK_THREADS``).
+PBKDF2 releases the GIL, so several checks proceed in parallel while the
+event loop keeps serving other requests; logins beyond the pool size queue
+for a thread instead of piling onto the loop. A hash made at an outdated
+cost (see ``custom.hashers``) is re-encoded in the pool as well and written
+back with one UPDATE.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+
+from .models import User
+
+
+@cache
+def password_check_pool():
+    workers = getattr(settings, 'PASSWORD_CHECK_THREADS', None) or min(4, os.cpu_count() or 1)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-check')
+
+
+async def run_in_pool(func, *args):
+    """Run ``func(*args)`` in the password check pool without blocking the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(password_check_pool(), func, *args)
+
+
+class EmailBackend(ModelBackend):
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+        user = User.objects.by_email(email).first()
+        if user is None:
+            # Hash once anyway so unknown emails take as long as wrong passwords.
+            make_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+        user = await User.objects.by_email(email).afirst()
+        if user is None:
+            await run_in_pool(make_password, password)
+            return None
+        is_correct, must_update = await run_in_pool(verify_password, password, user.password)
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+        if must_update:
+            user.password = await run_in_pool(make_password, password)
+            await user.asave(update_fields=['password'])
+        return user
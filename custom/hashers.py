@@ -0,0 +1,20 @@
+"""
+Password hashing cost policy.
+
+``PBKDF2PasswordHasher`` is Django's PBKDF2-SHA256 hasher with its iteration
+count taken from ``settings.PASSWORD_PBKDF2_ITERATIONS`` (Django's default
+when unset). It keeps the ``pbkdf2_sha256`` algorithm name, so existing
+hashes still verify, and any hash made with a different count is
+re-encoded at the configured cost the next time its owner logs in
+(Django's ``must_update``). Raising or lowering the setting therefore
+migrates every active account without a password reset.
+"""
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', None) or hashers.PBKDF2PasswordHasher.iterations
@@ -0,0 +1,37 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from custom.roster import PROFILE_MODELS, RosterImport, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Create student or lecturer accounts from a CSV (with a header row) or "
+        "JSON roster; rows that fail validation are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Roster file.')
+        parser.add_argument('--role', choices=sorted(PROFILE_MODELS), required=True)
+        parser.add_argument('--format', choices=['csv', 'json'], help='Default: from the file extension.')
+        parser.add_argument('--workers', type=int, help='Password hashing processes (default: one per CPU).')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the roster without creating anything.')
+
+    def handle(self, *args, path, role, format=None, workers=None, dry_run=False, **options):
+        format = format or os.path.splitext(path)[1].lstrip('.').lower()
+        try:
+            with open(path, 'rb') as roster:
+                rows = read_rows(roster.read(), format)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+
+        workers = workers or os.cpu_count() or 1
+        report = RosterImport(rows, role).run(workers=workers, dry_run=dry_run).report()
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']} ({error['username']}): {json.dumps(error['errors'])}")
+        if dry_run:
+            self.stdout.write(f"{len(rows) - report['failed']} rows valid, {report['failed']} invalid")
+        else:
+            self.stdout.write(f"{report['created']} {role} accounts created, {report['failed']} rows failed")
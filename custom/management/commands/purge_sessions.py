@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from custom.sessions import PURGE_BATCH_SIZE, SessionStore
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired sessions a batch at a time, so a large backlog never "
+        "holds a long write lock on the session table, and report how many "
+        "were deleted. Meant to run from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=PURGE_BATCH_SIZE,
+            help=f'Sessions deleted per statement (default: {PURGE_BATCH_SIZE}).',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        deleted = SessionStore.clear_expired(batch_size=batch_size)
+        self.stdout.write(f"{deleted} expired sessions deleted")
@@ -1,18 +1,31 @@
 from django.contrib.auth.models import UserManager as BaseUserManager
+from django.db.models import Value
+from django.db.models.functions import Lower
 
 class UserManager(BaseUserManager):
     use_in_migrations = True
     
-    def _create_user(self,full_name, email, password, **extra_fields):
+    def _create_user(self, email, password, **extra_fields):
         
         if not email:
             raise ValueError("The email must be set")
         email = self.normalize_email(email)
-        user = self.model(full_name=full_name, email = email, password = password, **extra_fields)
+        user = self.model(email = email, **extra_fields)
         user.set_password(password)
         user.save(using=self._db)
         return user
     
+    def by_email(self, email):
+        """
+        Case-insensitive email lookup. Unlike email__iexact (LIKE on SQLite,
+        UPPER() on PostgreSQL) this compares LOWER(email), which the
+        user_email_lower_idx functional index serves.
+        """
+        return self.alias(email_lower=Lower('email')).filter(email_lower=Lower(Value(email)))
+
+    def get_by_email(self, email):
+        return self.by_email(email).get()
+
     def create_user(self, email, password=None, **extra_fields):
         extra_fields.setdefault("is_superuser", False)
         return self._create_user(email, password, **extra_fields)
@@ -24,4 +37,4 @@ class UserManager(BaseUserManager):
         if extra_fields.get("is_superuser") is not True:
             raise ValueError("Superuser must have is_superuser=True.")
 
-        return self._create_user(self, email, password, **extra_fields)
\ No newline at end of file
+        return self._create_user(email, password, **extra_fields)
\ No newline at end of file
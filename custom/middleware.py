@@ -0,0 +1,30 @@
+from functools import partial
+
+from django.contrib.auth import middleware
+from django.utils.functional import SimpleLazyObject
+
+from . import sessions
+
+
+def get_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = sessions.get_user(request)
+    return request._cached_user
+
+
+async def auser(request):
+    if not hasattr(request, '_acached_user'):
+        request._acached_user = await sessions.aget_user(request)
+    return request._acached_user
+
+
+class AuthenticationMiddleware(middleware.AuthenticationMiddleware):
+    """
+    ``django.contrib.auth``'s middleware with ``request.user`` and
+    ``request.auser()`` resolved through the snapshots in ``custom.sessions``.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
+        request.auser = partial(auser, request)
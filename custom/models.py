@@ -1,9 +1,11 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
+from app.dirty import DirtyFieldsMixin
 from .manager import UserManager
 
 
-class User(AbstractUser):
+class User(DirtyFieldsMixin, AbstractUser):
     username = models.CharField(max_length=50, unique=True)
     email = models.EmailField(unique=True)
     full_name = models.CharField(max_length=255)
@@ -20,12 +22,25 @@ class User(AbstractUser):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, editable=False)
     
     def save(self, *args, **kwargs):
-        if self.pk:
-            old_role = User.objects.get(pk=self.pk).role
-            if old_role != self.role:
+        if not self._state.adding:
+            old_role = self.get_loaded_value('role', default=None)
+            if old_role is None:
+                # Not loaded through the ORM (e.g. after bulk_create).
+                old_role = User.objects.filter(pk=self.pk).values_list('role', flat=True).first()
+            if old_role is not None and old_role != self.role:
                 raise ValueError("You cannot change the role of a user once it's set.")
         super().save(*args, **kwargs)
 
+    # Set on users built from a session snapshot (see custom/sessions.py),
+    # which carry only a few columns.
+    _from_session_cache = False
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        if fields is not None and self._from_session_cache:
+            # Load every deferred column on the first access to any of them.
+            fields = [*fields, *(name for name in self.get_deferred_fields() if name not in fields)]
+        super().refresh_from_db(using, fields, from_queryset)
+
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -54,3 +69,9 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.username
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive login lookup, see UserManager.get_by_email().
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
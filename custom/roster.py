@@ -0,0 +1,204 @@
+"""
+Roster import: create many student or lecturer accounts at once.
+
+Rows come from CSV (with a header row) or a JSON list of objects. They are
+validated together: field checks per row, then usernames and emails against
+each other and, with one query each, against existing accounts. Passwords
+of the valid rows are hashed (PBKDF2 costs about as much as everything else
+put together) and the ``User`` rows and their ``Student``/``Lecture``
+profiles are written with ``bulk_create`` in batches, one transaction per
+batch.
+
+Only the ``import_roster`` command hashes across a process pool
+(``run(workers=...)``). The API view hashes in its own thread: forking a
+multithreaded server process can deadlock on locks held by other threads,
+and one request must not take every core of the web host.
+
+Invalid rows are reported and skipped; they never stop the rest of the
+import. A row left without a password gets an unusable one, so the account
+has to go through a password reset before it can log in.
+"""
+
+import csv
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from rest_framework import serializers
+
+from lecture.models import Lecture
+from student.models import Student
+
+from .models import User
+
+# Profile model created alongside each user, per role.
+PROFILE_MODELS = {
+    'student': Student,
+    'lecture': Lecture,
+}
+
+BATCH_SIZE = 500
+
+# Rows handed to a worker process at a time.
+HASH_CHUNK_SIZE = 64
+
+
+class RosterRowSerializer(serializers.Serializer):
+    username = serializers.CharField(max_length=50)
+    email = serializers.EmailField()
+    full_name = serializers.CharField(max_length=255)
+    password = serializers.CharField(required=False, allow_blank=True, trim_whitespace=False)
+    # Students
+    reg_number = serializers.CharField(max_length=15, required=False, allow_blank=True, allow_null=True)
+    year_of_study = serializers.IntegerField(required=False, allow_null=True)
+    # Lecturers
+    employee_number = serializers.CharField(max_length=15, required=False, allow_blank=True, allow_null=True)
+    title = serializers.ChoiceField(choices=User.TITLE_SELECT, required=False, allow_blank=True, allow_null=True)
+    department = serializers.ChoiceField(
+        choices=User.DEPARTMENT_CHOICES, required=False, allow_blank=True, allow_null=True)
+
+    def to_internal_value(self, data):
+        # CSV cells are strings; an empty cell means "not given".
+        if isinstance(data, dict):
+            data = {key: value for key, value in data.items() if value not in ('', None)}
+        return super().to_internal_value(data)
+
+
+def read_rows(content, format):
+    """Parse CSV or JSON ``content`` (str or bytes) into a list of dicts."""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    if format == 'csv':
+        return [
+            {key.strip(): (value or '').strip() for key, value in row.items() if key}
+            for row in csv.DictReader(io.StringIO(content))
+        ]
+    if format == 'json':
+        rows = json.loads(content)
+        if not isinstance(rows, list):
+            raise ValueError("Expected a JSON list of objects.")
+        return rows
+    raise ValueError(f"Unknown roster format {format!r}.")
+
+
+def _setup_worker():
+    # Under the forkserver/spawn start methods the worker starts without
+    # Django configured; make_password needs the hasher settings.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE or 'app.settings')
+    django.setup()
+
+
+def _hash(password):
+    return make_password(password or None)
+
+
+def hash_passwords(passwords, workers=1):
+    """``make_password`` over ``passwords``, in order, across ``workers`` processes."""
+    if workers <= 1 or len(passwords) < 2:
+        return [_hash(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_setup_worker) as pool:
+        return list(pool.map(_hash, passwords, chunksize=HASH_CHUNK_SIZE))
+
+
+class RosterImport:
+    def __init__(self, rows, role):
+        if role not in PROFILE_MODELS:
+            raise ValueError(f"Role must be one of {', '.join(PROFILE_MODELS)}.")
+        self.rows = rows
+        self.role = role
+        self.errors = {}
+        self.created = []
+
+    def validate(self):
+        """Check every row; returns the (row number, validated data) pairs that can be imported."""
+        # One serializer for every row: building one per row (it deep-copies
+        # its fields) costs more than the validation itself.
+        serializer = RosterRowSerializer()
+        valid = []
+        for number, row in enumerate(self.rows, start=1):
+            try:
+                valid.append((number, serializer.run_validation(row)))
+            except serializers.ValidationError as exc:
+                self.errors[number] = exc.detail
+        return self._check_unique(valid)
+
+    def _check_unique(self, valid):
+        usernames = {data['username'] for _, data in valid}
+        emails = {data['email'].lower() for _, data in valid}
+        taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        taken_emails = set(
+            User.objects.annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=emails).values_list('email_lower', flat=True)
+        )
+        unique, seen_usernames, seen_emails = [], set(), set()
+        for number, data in valid:
+            username, email = data['username'], data['email'].lower()
+            errors = {}
+            if username in taken_usernames or username in seen_usernames:
+                errors['username'] = ["A user with that username already exists."]
+            if email in taken_emails or email in seen_emails:
+                errors['email'] = ["A user with that email already exists."]
+            seen_usernames.add(username)
+            seen_emails.add(email)
+            if errors:
+                self.errors[number] = errors
+            else:
+                unique.append((number, data))
+        return unique
+
+    def run(self, workers=1, dry_run=False):
+        valid = self.validate()
+        if dry_run or not valid:
+            return self
+        hashes = hash_passwords([data.pop('password', '') for _, data in valid], workers)
+        users = [(number, self._user(data, password)) for (number, data), password in zip(valid, hashes)]
+        for start in range(0, len(users), BATCH_SIZE):
+            self._create(users[start:start + BATCH_SIZE])
+        return self
+
+    def _user(self, data, password):
+        data['email'] = User.objects.normalize_email(data['email'])
+        return User(role=self.role, password=password, **data)
+
+    def _create(self, batch):
+        profile_model = PROFILE_MODELS[self.role]
+        try:
+            with transaction.atomic():
+                created = User.objects.bulk_create([user for _, user in batch])
+                profile_model.objects.bulk_create([profile_model(user=user) for user in created])
+        except IntegrityError:
+            # Someone registered one of these usernames or emails since
+            # validate(); find out which rows by creating them one by one.
+            for number, user in batch:
+                # bulk_create may have set pks from inserts that were rolled back.
+                user.pk, user._state.adding = None, True
+                try:
+                    with transaction.atomic():
+                        user.save()
+                        profile_model.objects.create(user=user)
+                except IntegrityError:
+                    self.errors[number] = {'non_field_errors': ["A user with that username or email already exists."]}
+                else:
+                    self.created.append(user)
+        else:
+            self.created.extend(created)
+
+    def report(self):
+        return {
+            'created': len(self.created),
+            'failed': len(self.errors),
+            'errors': [
+                {'row': number, 'username': _username(self.rows[number - 1]), 'errors': errors}
+                for number, errors in sorted(self.errors.items())
+            ],
+        }
+
+
+def _username(row):
+    return row.get('username') if isinstance(row, dict) else None
@@ -0,0 +1,343 @@
+"""
+Session engine and user resolution that usually need no queries.
+
+Every authenticated request used to read its ``django_session`` row and
+then its ``custom.User`` row before the view ran. Both are now kept in
+bounded in-process LRU caches whose entries expire after
+``AUTH_CACHE_TTL`` seconds:
+
+* ``SessionStore`` (``SESSION_ENGINE = 'custom.sessions'``) is the database
+  store with each decoded session cached by its key. Saving a session
+  refreshes its entry and deleting it (logout, key rotation) drops it; an
+  entry never outlives the session's own expiry date.
+* ``get_user()``/``aget_user()`` (installed by
+  ``custom.middleware.AuthenticationMiddleware``) keep a snapshot of each
+  signed-in user: ``SNAPSHOT_FIELDS`` and the session auth hash. A session
+  whose hash matches the snapshot gets a ``User`` built from it with every
+  other column deferred; reading any of those loads them all with one
+  query (see ``User.refresh_from_db``). Anything else goes through
+  ``django.contrib.auth.get_user()``, which also handles password changes
+  and rotated secrets, and the result is stored for the next request.
+  Snapshots are dropped whenever the user is saved or deleted and on
+  logout (see ``custom.signals``).
+
+Each entry records a version of its session or user kept in the shared
+``AUTH_CACHE_ALIAS`` cache, read before the database. Saving or deleting a
+session, and saving, deleting or logging out a user, deletes that version,
+so every process's entry stops matching and its next request reads the
+database again. Each hit costs one shared-cache read instead of a query.
+Changes written with ``QuerySet.update()`` send no signals and are only
+seen once entries expire. The caches are off (``AUTH_CACHE_TTL = 0``)
+unless the worker processes share a cache (``RESPONSE_CACHE_LOCATION``).
+"""
+
+import copy
+import functools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends import db
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+# The columns a cached user carries; enough for role checks and logging.
+SNAPSHOT_FIELDS = ('id', 'role', 'is_active', 'username')
+
+# Expired sessions deleted per statement by SessionStore.clear_expired().
+PURGE_BATCH_SIZE = 1000
+
+
+class LRUCache:
+    """
+    A thread-safe mapping holding at most ``max_entries`` items, each for
+    ``ttl`` seconds; the least recently used item goes first when full.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+@functools.cache
+def session_cache():
+    return LRUCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL)
+
+
+@functools.cache
+def user_cache():
+    return LRUCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL)
+
+
+@receiver(setting_changed)
+def _reset_caches(*, setting, **kwargs):
+    if setting in ('AUTH_CACHE_TTL', 'AUTH_CACHE_MAX_ENTRIES'):
+        session_cache.cache_clear()
+        user_cache.cache_clear()
+
+
+def _version_key(kind, key):
+    return f'auth:{kind}:{key}'
+
+
+def current_version(kind, key):
+    """
+    The shared version of the ``kind`` ('session' or 'user') entry ``key``,
+    created if missing. Read it before the database, so a change committed
+    after the read deletes the version the entry is stored with.
+    """
+    if settings.AUTH_CACHE_TTL <= 0 or key is None:
+        return None
+    versions = caches[settings.AUTH_CACHE_ALIAS]
+    name = _version_key(kind, key)
+    version = versions.get(name)
+    if version is None:
+        versions.add(name, uuid.uuid4().hex, settings.AUTH_CACHE_TTL * 2)
+        version = versions.get(name)
+    return version
+
+
+async def acurrent_version(kind, key):
+    if settings.AUTH_CACHE_TTL <= 0 or key is None:
+        return None
+    versions = caches[settings.AUTH_CACHE_ALIAS]
+    name = _version_key(kind, key)
+    version = await versions.aget(name)
+    if version is None:
+        await versions.aadd(name, uuid.uuid4().hex, settings.AUTH_CACHE_TTL * 2)
+        version = await versions.aget(name)
+    return version
+
+
+def is_current(kind, key, version):
+    return version is not None and caches[settings.AUTH_CACHE_ALIAS].get(_version_key(kind, key)) == version
+
+
+async def ais_current(kind, key, version):
+    return version is not None and await caches[settings.AUTH_CACHE_ALIAS].aget(_version_key(kind, key)) == version
+
+
+def invalidate(kind, key):
+    """Make every process's entry for ``key`` stale, now and once the current transaction commits."""
+    versions = caches[settings.AUTH_CACHE_ALIAS]
+    name = _version_key(kind, key)
+    versions.delete(name)
+    # Another process may read the version again before the change commits.
+    transaction.on_commit(lambda: versions.delete(name))
+
+
+async def ainvalidate(kind, key):
+    # Async ORM calls commit in their own thread; there is no transaction to wait for.
+    await caches[settings.AUTH_CACHE_ALIAS].adelete(_version_key(kind, key))
+
+
+class SessionStore(db.SessionStore):
+    """The database session store, reading through ``session_cache()``."""
+
+    def _entry(self):
+        entry = session_cache().get(self.session_key)
+        if entry is None:
+            return None
+        data, expire_date, version = entry
+        if expire_date <= timezone.now():
+            session_cache().delete(self.session_key)
+            return None
+        return data, version
+
+    def _remember(self, data, expire_date, version):
+        if self.session_key is not None and version is not None:
+            session_cache().set(self.session_key, (copy.deepcopy(data), expire_date, version))
+
+    def _forget(self, session_key):
+        session_cache().delete(session_key)
+        if session_key is not None:
+            invalidate('session', session_key)
+
+    async def _aforget(self, session_key):
+        session_cache().delete(session_key)
+        if session_key is not None:
+            await ainvalidate('session', session_key)
+
+    def load(self):
+        entry = self._entry()
+        if entry is not None and is_current('session', self.session_key, entry[1]):
+            return copy.deepcopy(entry[0])
+        version = current_version('session', self.session_key)
+        session = self._get_session_from_db()
+        if session is None:
+            return {}
+        data = self.decode(session.session_data)
+        self._remember(data, session.expire_date, version)
+        return data
+
+    async def aload(self):
+        entry = self._entry()
+        if entry is not None and await ais_current('session', self.session_key, entry[1]):
+            return copy.deepcopy(entry[0])
+        version = await acurrent_version('session', self.session_key)
+        session = await self._aget_session_from_db()
+        if session is None:
+            return {}
+        data = self.decode(session.session_data)
+        self._remember(data, session.expire_date, version)
+        return data
+
+    def save(self, must_create=False):
+        super().save(must_create)
+        self._forget(self.session_key)
+        self._remember(self._session_cache, self.get_expiry_date(), current_version('session', self.session_key))
+
+    async def asave(self, must_create=False):
+        await super().asave(must_create)
+        await self._aforget(self.session_key)
+        self._remember(
+            self._session_cache, await self.aget_expiry_date(),
+            await acurrent_version('session', self.session_key),
+        )
+
+    def delete(self, session_key=None):
+        self._forget(session_key or self.session_key)
+        super().delete(session_key)
+
+    async def adelete(self, session_key=None):
+        await self._aforget(session_key or self.session_key)
+        await super().adelete(session_key)
+
+    @classmethod
+    def clear_expired(cls, batch_size=PURGE_BATCH_SIZE):
+        """
+        Delete expired sessions ``batch_size`` at a time, so a large backlog
+        never holds a long write lock. Returns how many were deleted.
+        """
+        model = cls.get_model_class()
+        expired = model.objects.filter(expire_date__lt=timezone.now())
+        deleted = 0
+        while True:
+            keys = list(expired.values_list('session_key', flat=True)[:batch_size])
+            if keys:
+                deleted += model.objects.filter(session_key__in=keys).delete()[0]
+            if len(keys) < batch_size:
+                return deleted
+
+    @classmethod
+    async def aclear_expired(cls, batch_size=PURGE_BATCH_SIZE):
+        model = cls.get_model_class()
+        expired = model.objects.filter(expire_date__lt=timezone.now())
+        deleted = 0
+        while True:
+            keys = [key async for key in expired.values_list('session_key', flat=True)[:batch_size]]
+            if keys:
+                deleted += (await model.objects.filter(session_key__in=keys).adelete())[0]
+            if len(keys) < batch_size:
+                return deleted
+
+
+def _snapshot_attnames():
+    fields = auth.get_user_model()._meta.concrete_fields
+    return [field.attname for field in fields if field.name in SNAPSHOT_FIELDS]
+
+
+def _remember_user(user, version):
+    if version is not None and user.is_authenticated and user.is_active and not user.get_deferred_fields():
+        values = tuple(getattr(user, attname) for attname in _snapshot_attnames())
+        user_cache().set(user.pk, (user._state.db, values, user.get_session_auth_hash(), version))
+
+
+def _snapshot(user_id, backend_path, session_hash):
+    """The snapshot for a session, or None when it can't be trusted; its version is checked by the caller."""
+    snapshot = user_cache().get(user_id)
+    if (
+        snapshot is None
+        or backend_path not in settings.AUTHENTICATION_BACKENDS
+        or not session_hash
+        or not constant_time_compare(session_hash, snapshot[2])
+    ):
+        return None
+    return snapshot
+
+
+def _user_from(snapshot):
+    db_alias, values, _, _ = snapshot
+    user = auth.get_user_model().from_db(db_alias, _snapshot_attnames(), values)
+    user._from_session_cache = True
+    return user
+
+
+def forget_user(user_id):
+    """Drop the snapshots of user ``user_id`` in every process."""
+    user_cache().delete(user_id)
+    invalidate('user', user_id)
+
+
+def get_user(request):
+    """``django.contrib.auth.get_user()``, answered from the snapshot when it matches."""
+    try:
+        user_id = auth.get_user_model()._meta.pk.to_python(request.session[SESSION_KEY])
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return auth.get_user(request)
+    snapshot = _snapshot(user_id, backend_path, request.session.get(HASH_SESSION_KEY))
+    if snapshot is not None and is_current('user', user_id, snapshot[3]):
+        return _user_from(snapshot)
+    version = current_version('user', user_id)
+    user = auth.get_user(request)
+    _remember_user(user, version)
+    return user
+
+
+async def aget_user(request):
+    """See get_user()."""
+    user_id = await request.session.aget(SESSION_KEY)
+    backend_path = await request.session.aget(BACKEND_SESSION_KEY)
+    if user_id is None or backend_path is None:
+        return await auth.aget_user(request)
+    user_id = auth.get_user_model()._meta.pk.to_python(user_id)
+    snapshot = _snapshot(user_id, backend_path, await request.session.aget(HASH_SESSION_KEY))
+    if snapshot is not None and await ais_current('user', user_id, snapshot[3]):
+        return _user_from(snapshot)
+    version = await acurrent_version('user', user_id)
+    user = await auth.aget_user(request)
+    _remember_user(user, version)
+    return user
@@ -0,0 +1,21 @@
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import User
+from .sessions import forget_user
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_changed_user(sender, instance, **kwargs):
+    # Covers role, activation and password changes, update_account and
+    # delete_account; the next request loads the user again.
+    forget_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def forget_logged_out_user(sender, user, **kwargs):
+    # logout() flushes the session, which drops it from the session cache.
+    if user is not None:
+        forget_user(user.pk)
@@ -0,0 +1,305 @@
+import io
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from lecture.models import Lecture
+from student.models import Student
+from . import backends
+from .models import User
+from .roster import RosterImport, hash_passwords
+from .sessions import LRUCache
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RosterImportTestCase(APITestCase):
+    CSV = (
+        "username,email,full_name,password,reg_number,year_of_study\n"
+        "ann,ann@example.com,Ann A,secret-ann,S001,1\n"
+        "ben,BEN@Example.com,Ben B,,S002,2\n"
+        "ann,ann2@example.com,Ann Again,secret,S003,1\n"
+        "cat,not-an-email,Cat C,secret,S004,x\n"
+        "taken,dan@example.com,Dan D,secret,S005,3\n"
+    )
+
+    def setUp(self):
+        User.objects.create(username='taken', email='taken@example.com', role='student')
+        self.admin = User.objects.create(username='admin', email='admin@example.com', role='lecture', is_staff=True)
+
+    def test_import_reports_row_errors(self):
+        url = reverse('roster-import') + '?role=student'
+        self.client.force_authenticate(user=self.admin)
+        upload = SimpleUploadedFile('cohort.csv', self.CSV.encode(), content_type='text/csv')
+        with self.assertNumQueries(6):
+            # Two uniqueness checks, then one savepoint around the User and Student INSERTs.
+            response = self.client.post(url, {'file': upload})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 3))
+        errors = {error['row']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(sorted(errors), [3, 4, 5])
+        self.assertIn('username', errors[3])
+        self.assertEqual(sorted(errors[4]), ['email', 'year_of_study'])
+        self.assertIn('username', errors[5])
+
+        ann = User.objects.get(username='ann')
+        self.assertEqual((ann.role, ann.reg_number, ann.year_of_study), ('student', 'S001', 1))
+        self.assertTrue(ann.check_password('secret-ann'))
+        self.assertFalse(User.objects.get(username='ben').has_usable_password())
+        self.assertEqual(User.objects.get(username='ben').email, 'BEN@example.com')
+        self.assertEqual(Student.objects.filter(user__username__in=['ann', 'ben']).count(), 2)
+
+    def test_lecturers_from_json(self):
+        rows = [{'username': 'lee', 'email': 'lee@example.com', 'full_name': 'Lee L', 'password': 'pw',
+                 'employee_number': 'E1', 'title': 'Lecture'}]
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(reverse('roster-import') + '?role=lecture', rows, format='json')
+        self.assertEqual(response.data['created'], 1)
+        self.assertTrue(Lecture.objects.filter(user__username='lee', user__role='lecture').exists())
+
+    def test_requires_staff(self):
+        self.client.force_authenticate(user=User.objects.get(username='taken'))
+        response = self.client.post(reverse('roster-import') + '?role=student', [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_view_never_starts_a_process_pool(self):
+        rows = [{'username': f'user{index}', 'email': f'user{index}@example.com', 'full_name': 'U', 'password': 'pw'}
+                for index in range(3)]
+        self.client.force_authenticate(user=self.admin)
+        with mock.patch('custom.roster.ProcessPoolExecutor') as pool:
+            response = self.client.post(reverse('roster-import') + '?role=student', rows, format='json')
+        self.assertEqual(response.data['created'], 3)
+        pool.assert_not_called()
+
+    def test_command_and_process_pool(self):
+        self.assertEqual(len(set(hash_passwords(['a', 'b', 'c'], workers=2))), 3)
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as roster:
+            roster.write(self.CSV)
+        self.addCleanup(os.unlink, roster.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_roster', roster.name, '--role', 'student', '--workers', '2', stdout=out, stderr=err)
+        self.assertIn('2 student accounts created, 3 rows failed', out.getvalue())
+        self.assertIn('Row 4 (cat)', err.getvalue())
+        self.assertTrue(User.objects.get(username='ann').check_password('secret-ann'))
+
+    def test_conflicting_insert_falls_back_to_single_rows(self):
+        rows = [{'username': name, 'email': f'{name}@example.com', 'full_name': name} for name in ('eve', 'fay')]
+        roster = RosterImport(rows, 'student')
+        valid = roster.validate()
+        # Registered between validation and insert.
+        User.objects.create(username='fay', email='other@example.com', role='student')
+        users = [(number, roster._user(data, '!')) for number, data in valid]
+        roster._create(users)
+        self.assertEqual([user.username for user in roster.created], ['eve'])
+        self.assertEqual(list(roster.errors), [2])
+
+
+class DirtyFieldsTestCase(TestCase):
+    def setUp(self):
+        User.objects.create(username='ann', email='ann@example.com', role='student', full_name='Ann')
+        self.user = User.objects.get(username='ann')
+
+    def updates(self, queries):
+        return [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+
+    def test_writes_only_changed_columns_without_reading_first(self):
+        self.user.full_name = 'Ann Smith'
+        self.assertEqual(self.user.get_dirty_fields(), ['full_name'])
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save()
+        # No SELECT before the UPDATE (the rest is search reindexing of the new name).
+        self.assertTrue(queries[0]['sql'].startswith('UPDATE "custom_user"'))
+        [update] = self.updates(queries)
+        self.assertIn('"full_name"', update)
+        self.assertIn('"updated_at"', update)
+        self.assertNotIn('"email"', update)
+        self.assertEqual(self.user.get_dirty_fields(), [])
+        self.assertEqual(User.objects.get(pk=self.user.pk).full_name, 'Ann Smith')
+
+    def test_login_update_is_a_single_query(self):
+        self.user.last_login = timezone.now()
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
+
+    def test_role_is_immutable_without_a_query(self):
+        self.user.role = 'lecture'
+        with self.assertNumQueries(0), self.assertRaises(ValueError):
+            self.user.save()
+        # Instances not loaded through the ORM fall back to reading the role.
+        stranger = User(pk=self.user.pk, username='ann', email='ann@example.com', role='lecture')
+        stranger._state.adding = False
+        with self.assertRaises(ValueError):
+            stranger.save()
+
+    def test_refresh_resets_loaded_values(self):
+        User.objects.filter(pk=self.user.pk).update(full_name='Changed elsewhere')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.get_dirty_fields(), [])
+        self.assertEqual(self.user.get_loaded_value('full_name'), 'Changed elsewhere')
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+class EmailLoginTestCase(APITestCase):
+    def setUp(self):
+        self.student = User.objects.create(username='ann', email='Ann@Example.com', role='student')
+        self.student.set_password('secret')
+        self.student.save()
+        self.lecturer = User.objects.create(
+            username='lee', email='lee@example.com', role='lecture', employee_number='E1')
+        self.lecturer.set_password('secret')
+        self.lecturer.save()
+
+    def test_login_with_one_user_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/student/login', {'email': 'ann@example.COM', 'password': 'secret'},
+                                        format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['username'], 'ann')
+        user_reads = [query for query in queries if query['sql'].startswith('SELECT') and '"custom_user"' in query['sql']]
+        self.assertEqual(len(user_reads), 1)
+        self.assertIn('LOWER("custom_user"."email")', user_reads[0]['sql'])
+        self.assertEqual(self.client.get('/api/student/get_user').status_code, 200)
+
+    def test_wrong_credentials(self):
+        for email, password in (('ann@example.com', 'wrong'), ('nobody@example.com', 'secret')):
+            response = self.client.post('/api/student/login', {'email': email, 'password': password})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post('/api/student/login', {'email': 'ann@example.com'}).status_code, 400)
+
+    def test_lecturer_login_renders_lecturer_fields(self):
+        response = self.client.post('/api/lecture/login', {'email': 'lee@example.com', 'password': 'secret'})
+        self.assertEqual(response.json()['user']['employee_number'], 'E1')
+
+    def test_sync_authenticate(self):
+        from django.contrib.auth import authenticate
+        self.assertEqual(authenticate(email='ANN@example.com', password='secret'), self.student)
+        self.assertIsNone(authenticate(email='ann@example.com', password='nope'))
+
+    async def test_async_login_checks_password_in_pool(self):
+        threads = []
+        verify = backends.verify_password
+
+        def recording_verify(*args):
+            threads.append(threading.current_thread().name)
+            return verify(*args)
+
+        with mock.patch.object(backends, 'verify_password', recording_verify):
+            response = await self.async_client.post(
+                '/api/student/login', {'email': 'ann@example.com', 'password': 'secret'},
+                content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('password-check'))
+
+    def test_outdated_hash_is_upgraded_on_login(self):
+        self.assertTrue(self.student.password.startswith('pbkdf2_sha256$1000$'))
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=1500):
+            response = self.client.post('/api/student/login', {'email': 'ann@example.com', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.password.startswith('pbkdf2_sha256$1500$'))
+        self.assertTrue(self.student.check_password('secret'))
+
+
+@override_settings(AUTH_CACHE_TTL=30)
+class SessionCacheTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ann', email='ann@example.com', role='student', full_name='Ann')
+        self.user.set_password('secret')
+        self.user.save()
+        self.client.force_login(self.user)
+        # The first request loads the user; later ones use its snapshot.
+        self.assertEqual(self.client.get('/api/custom/role/').json(), {'role': 'student'})
+
+    def test_role_check_without_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/custom/role/').json(), {'role': 'student'})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/student/check_auth').json(), {'isAuthenticated': True})
+
+    def test_other_columns_load_with_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/student/get_user')
+        self.assertEqual(response.json()['email'], 'ann@example.com')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/student/student_dashboard')
+        self.assertEqual(response.json()['user']['full_name'], 'Ann')
+
+    async def test_async_views_load_other_columns_without_blocking(self):
+        await self.async_client.aforce_login(self.user)
+        self.assertEqual((await self.async_client.get('/api/custom/role/')).json(), {'role': 'student'})
+        response = await self.async_client.get('/api/student/get_user')
+        self.assertEqual(response.json()['full_name'], 'Ann')
+
+    def test_changes_to_the_user_reach_the_next_request(self):
+        response = self.client.patch('/api/student/update', {'full_name': 'Ann Lee'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/student/get_user').json()['full_name'], 'Ann Lee')
+        self.user.refresh_from_db()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/custom/role/').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_password_change_ends_other_sessions(self):
+        self.user.set_password('changed')
+        self.user.save()
+        self.assertEqual(self.client.get('/api/student/check_auth').json(), {'isAuthenticated': False})
+
+    def test_logout_and_delete_end_the_session(self):
+        session_key = self.client.session.session_key
+        self.assertEqual(self.client.post('/api/student/logout').status_code, 200)
+        self.client.cookies['sessionid'] = session_key
+        self.assertEqual(self.client.get('/api/custom/role/').status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.delete('/api/student/delete').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get('/api/student/check_auth').json(), {'isAuthenticated': False})
+
+    def test_changes_reach_other_processes(self):
+        # A second worker process: its own in-process caches, the same shared cache.
+        peer = {'session_cache': LRUCache(100, 30), 'user_cache': LRUCache(100, 30)}
+
+        def on_peer(url):
+            with mock.patch.multiple('custom.sessions', session_cache=lambda: peer['session_cache'],
+                                     user_cache=lambda: peer['user_cache']):
+                return self.client.get(url)
+
+        self.assertEqual(on_peer('/api/custom/role/').status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(on_peer('/api/custom/role/').status_code, 200)
+
+        User.objects.filter(pk=self.user.pk).update(role='lecture')
+        self.user.refresh_from_db()
+        self.user.save()
+        self.assertEqual(on_peer('/api/custom/role/').json(), {'role': 'lecture'})
+
+        session_key = self.client.session.session_key
+        self.assertEqual(self.client.post('/api/student/logout').status_code, 200)
+        self.client.cookies['sessionid'] = session_key
+        self.assertEqual(on_peer('/api/custom/role/').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_expired_session_is_not_served_from_cache(self):
+        session = self.client.session
+        session.set_expiry(-1)
+        session.save()
+        self.assertEqual(self.client.get('/api/student/check_auth').json(), {'isAuthenticated': False})
+
+    def test_purge_sessions_in_batches(self):
+        from django.contrib.sessions.models import Session
+        expired = timezone.now() - timezone.timedelta(days=1)
+        Session.objects.bulk_create(
+            Session(session_key=f'expired{index:025}', session_data='', expire_date=expired) for index in range(5)
+        )
+        out = io.StringIO()
+        with self.assertNumQueries(6):
+            call_command('purge_sessions', batch_size=2, stdout=out)
+        self.assertEqual(out.getvalue().strip(), '5 expired sessions deleted')
+        self.assertEqual(Session.objects.count(), 1)
@@ -1,5 +1,9 @@
 from django.contrib import admin
+from app.eager import EagerLoadingAdmin
 from .models import Lecture
 
 # Register your models here.
-admin.site.register(Lecture)
\ No newline at end of file
+@admin.register(Lecture)
+class LectureAdmin(EagerLoadingAdmin):
+    list_display = ('user', 'user__full_name', 'user__employee_number')
+    search_fields = ('user__username', 'user__employee_number')
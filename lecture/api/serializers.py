@@ -96,7 +96,7 @@ class AssignmentSubmissionSerializer(serializers.ModelSerializer):
     class Meta:
         model = AssignmentSubmissions
         fields = '__all__'
-        read_only_fields = ('id', 'submission_date', 'student', 'assignment', 'attempt_number', 'file_checksum')
+        read_only_fields = ('id', 'submission_date', 'student', 'assignment', 'attempt_number', 'submission_file', 'file_name', 'file_size', 'content_type', 'file_checksum')
 
 
 class FeedbackSerializer(serializers.ModelSerializer):
@@ -106,14 +106,27 @@ class FeedbackSerializer(serializers.ModelSerializer):
         fields = ['feedback', 'score', 'is_graded']
         
     def validate_score(self, value):
-        """Ensure score is within valid range if provided"""
-        if value is not None and (value < 0 or value > 100):
-            raise serializers.ValidationError("Score must be between 0 and 100")
+        """Ensure score is within the assignment's range if provided"""
+        max_score = self.instance.assignment.max_score if self.instance else 100
+        if value is not None and (value < 0 or value > max_score):
+            raise serializers.ValidationError(f"Score must be between 0 and {max_score}")
         return value
 
 
+class BulkFeedbackItemSerializer(serializers.Serializer):
+    """One row of a bulk grading request; max_score is checked by resources.grading"""
+    id = serializers.IntegerField()
+    score = serializers.IntegerField(min_value=0, required=False)
+    feedback = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    def validate(self, attrs):
+        if 'score' not in attrs and 'feedback' not in attrs:
+            raise serializers.ValidationError("Provide a score or feedback")
+        return attrs
+
+
 class ResourceSerializer(serializers.ModelSerializer):
     class Meta:
         model = resources
         fields = '__all__'
-        read_only_fields = ('id', 'uploaded_at', 'uploaded_by')
\ No newline at end of file
+        read_only_fields = ('id', 'uploaded_at', 'uploaded_by', 'file_name', 'file_size', 'content_type', 'file_checksum')
\ No newline at end of file
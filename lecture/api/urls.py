@@ -3,9 +3,10 @@ from .views import (
     registerView,
     get_csrf,
     loginView,
-    WhoAmIView,
+    who_am_i_view,
     LectureOnlyView,
-    check_auth,
+    LecturerDashboardView,
+    check_auth_view,
     logoutView,
     update_account,
     delete_account,
@@ -14,21 +15,33 @@ from .views import (
     AssignmentRetrieveUpdateDestroyView,
     AssignmentSubmissionListView,
     AssignmentSubmissionFeedbackView,
+    BulkFeedbackView,
+    AssignmentSubmissionDownloadView,
+    GradebookView,
+    AssignmentAnalyticsView,
+    CourseAnalyticsView,
 )
 
 urlpatterns = [
     path("csrf_cookie", get_csrf),
-    path("check_auth", check_auth),
+    path("check_auth", check_auth_view),
     path("register", registerView),
     path("login", loginView),
-    path("get_user", WhoAmIView.as_view()),
+    path("get_user", who_am_i_view),
     path('retrieve_user/<username>', LectureView.as_view({'get': 'retrieve'})),
     path("lecture_dashboard", LectureOnlyView.as_view()),
+    path('dashboard/', LecturerDashboardView.as_view(), name='lecturer-dashboard'),
     path("logout", logoutView),
     path("update", update_account),
     path("delete", delete_account),
     path('assignments/', AssignmentListCreateView.as_view(), name='lecturer-assignment-list-create'),
     path('assignments/<int:pk>/', AssignmentRetrieveUpdateDestroyView.as_view(), name='lecturer-assignment-detail'),
     path('submissions/', AssignmentSubmissionListView.as_view(), name='lecturer-submission-list'),
+    path('submissions/<int:pk>/download/', AssignmentSubmissionDownloadView.as_view(), name='lecturer-submission-download'),
     path('submissions/<int:pk>/feedback/', AssignmentSubmissionFeedbackView.as_view(), name='lecturer-submission-feedback'),
+    path('submissions/feedback/', BulkFeedbackView.as_view(), name='lecturer-bulk-feedback'),
+    path('assignments/<int:pk>/analytics/', AssignmentAnalyticsView.as_view(), name='lecturer-assignment-analytics'),
+    path('courses/<str:course_code>/analytics/', CourseAnalyticsView.as_view(), name='lecturer-course-analytics'),
+    path('courses/<str:course_code>/gradebook/', GradebookView.as_view(), name='lecturer-course-gradebook'),
+    path('groups/<int:group_id>/gradebook/', GradebookView.as_view(), name='lecturer-group-gradebook'),
 ]
\ No newline at end of file
@@ -2,7 +2,7 @@ import json
 from django.http import JsonResponse, FileResponse, Http404
 from django.middleware.csrf import get_token
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_protect
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from rest_framework.authentication import SessionAuthentication
@@ -18,17 +18,33 @@ from rest_framework import (
     decorators as rest_decorators,
     permissions as rest_permissions,
 )
+from custom.api.views import acheck_auth, awho_am_i, email_login_view
 from custom.models import User
-from resources.models import Assignments, AssignmentSubmissions
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils.http import content_disposition_header
+from app.asyncviews import async_get
+from resources import analytics, counters
+from resources.dashboard import lecturer_dashboard
+from resources.gradebook import Gradebook
+from resources.grading import bulk_grade
+from resources.models import Assignments, AssignmentSubmissions, CourseGroup, Courses
 from .serializers import (
     UserSerializer, 
     LectureSerializer, 
     UpdateSerializer, 
     AssignmentSerializer, 
     AssignmentSubmissionSerializer,
+    BulkFeedbackItemSerializer,
     FeedbackSerializer
 )
 from rest_framework.parsers import MultiPartParser, FormParser
+from app.delivery import deliver_file
+from app.eager import EagerLoadingMixin
+from app.compiled import CompiledListMixin
+from app.streaming import CSVStreamRenderer, NDJSONRenderer, StreamingListMixin, streaming_response
+from app.conditional import ConditionalListMixin, ConditionalRetrieveMixin
+from resources.api.filters import FullTextSearchFilter
 import os
 
 
@@ -51,27 +67,9 @@ def check_auth(request):
     return JsonResponse({"isAuthenticated": True})
 
 
-@rest_decorators.api_view(["POST"])
-@rest_decorators.permission_classes([rest_permissions.AllowAny])
-def loginView(request):
-    email = request.data.get("email")
-    password = request.data.get("password")
-
-    if not email or not password:
-        return JsonResponse({"Info": "Email and Password are needed"}, status=400)
-
-    try:
-        user_obj = User.objects.get(email__iexact=email)  # Case-insensitive
-    except User.DoesNotExist:
-        return JsonResponse({"Info": "User with given credentials does not exist"}, status=400)
-
-    user = authenticate(request, username=user_obj.username, password=password)
+check_auth_view = async_get(check_auth)(acheck_auth)
 
-    if user is None:
-        return JsonResponse({"Info": "Incorrect password"}, status=400)
-
-    login(request, user)
-    return JsonResponse({"user": UserSerializer(user).data, "Info": "User logged in successfully"})
+loginView = email_login_view(UserSerializer)
 
 
 def logoutView(request):
@@ -100,6 +98,9 @@ class WhoAmIView(APIView):
         return JsonResponse(data, safe=False)
 
 
+who_am_i_view = async_get(WhoAmIView.as_view())(awho_am_i)
+
+
 class LectureView(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -174,12 +175,24 @@ class IsLecturer(permissions.BasePermission):
         return request.user.is_authenticated and request.user.role == 'lecture'
 
 
+class LecturerDashboardView(APIView):
+    """
+    Everything the lecturer dashboard shows in one response: the user, their
+    upcoming assignments with submission counts, recent submissions with
+    grading status, new resources and counts.
+    """
+    permission_classes = [IsLecturer]
+
+    def get(self, request, format=None):
+        return Response(lecturer_dashboard(request.user))
+
+
 # Assignment CRUD
-class AssignmentListCreateView(generics.ListCreateAPIView):
+class AssignmentListCreateView(CompiledListMixin, ConditionalListMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     serializer_class = AssignmentSerializer
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
     ordering_fields = ['due_date', 'created_at']
-    search_fields = ['title', 'course_id__course_name']
+    read_from_replica = True
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -194,7 +207,7 @@ class AssignmentListCreateView(generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
-class AssignmentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class AssignmentRetrieveUpdateDestroyView(ConditionalRetrieveMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = AssignmentSerializer
     queryset = Assignments.objects.all()
 
@@ -205,19 +218,41 @@ class AssignmentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView)
 
 
 # Assignment Submissions (view and feedback)
-class AssignmentSubmissionListView(generics.ListAPIView):
+class AssignmentSubmissionListView(StreamingListMixin, CompiledListMixin, ConditionalListMixin, EagerLoadingMixin, generics.ListAPIView):
     serializer_class = AssignmentSubmissionSerializer
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
     ordering_fields = ['submission_date']
-    search_fields = ['student__user__username', 'assignment__title']
     permission_classes = [IsLecturer]
+    read_from_replica = True
 
     def get_queryset(self):
         # All submissions for assignments created by this lecturer
         return AssignmentSubmissions.objects.filter(assignment__created_by=self.request.user)
 
 
-class AssignmentSubmissionFeedbackView(generics.UpdateAPIView):
+class AssignmentSubmissionDownloadView(generics.GenericAPIView):
+    serializer_class = AssignmentSubmissionSerializer
+    permission_classes = [IsLecturer]
+    read_from_replica = True
+
+    def get(self, request, pk):
+        try:
+            submission = AssignmentSubmissions.objects.get(pk=pk, assignment__created_by=request.user)
+            if not submission.submission_file:
+                raise Http404
+            return deliver_file(
+                request,
+                submission.submission_file,
+                checksum=submission.file_checksum,
+                filename=submission.file_name,
+            )
+        except AssignmentSubmissions.DoesNotExist:
+            raise Http404
+        except Exception:
+            raise Http404
+
+
+class AssignmentSubmissionFeedbackView(EagerLoadingMixin, generics.UpdateAPIView):
     serializer_class = FeedbackSerializer
     queryset = AssignmentSubmissions.objects.all()
     permission_classes = [IsLecturer]
@@ -227,8 +262,116 @@ class AssignmentSubmissionFeedbackView(generics.UpdateAPIView):
         return self.partial_update(request, *args, **kwargs)
     
     def perform_update(self, serializer):
+        instance, data = serializer.instance, serializer.validated_data
         # Automatically mark as graded when feedback is provided
-        instance = serializer.save()
-        if instance.feedback or instance.score is not None:
-            instance.is_graded = True
-            instance.save()
\ No newline at end of file
+        is_graded = data.get('is_graded', instance.is_graded)
+        if data.get('feedback', instance.feedback) or data.get('score', instance.score) is not None:
+            is_graded = True
+        with transaction.atomic():
+            was_graded = (
+                AssignmentSubmissions.objects.select_for_update()
+                .values_list('is_graded', flat=True).get(pk=instance.pk)
+            )
+            instance = serializer.save(is_graded=is_graded)
+            counters.grading_changed(instance, was_graded)
+        if instance.is_graded:
+            # Analytics stay cached until the assignment's next grade.
+            analytics.invalidate(instance)
+
+
+
+class BulkFeedbackView(APIView):
+    """
+    Grade many submissions at once. The body is a list of
+    ``{"id", "score", "feedback"}`` (score or feedback may be left out);
+    scores are checked against each assignment's ``max_score``. Either every
+    row is applied, in one transaction, or none is and the per-row results
+    say which rows failed.
+    """
+    permission_classes = [IsLecturer]
+    max_rows = 1000
+
+    def post(self, request, format=None):
+        if not isinstance(request.data, list) or not request.data:
+            return Response({"detail": "Expected a non-empty list of grades."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > self.max_rows:
+            return Response({"detail": f"At most {self.max_rows} grades per request."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = BulkFeedbackItemSerializer(data=request.data, many=True)
+        if serializer.is_valid():
+            applied, results = bulk_grade(serializer.validated_data, request.user)
+        else:
+            applied, results = False, [
+                {"id": row.get("id") if isinstance(row, dict) else None, "status": "error", "errors": errors}
+                if errors else {"id": row["id"], "status": "ok"}
+                for row, errors in zip(request.data, serializer.errors)
+            ]
+        return Response(
+            {"graded": len(results) if applied else 0, "results": results},
+            status=status.HTTP_200_OK if applied else status.HTTP_400_BAD_REQUEST,
+        )
+
+class GradebookView(APIView):
+    """
+    Stream the students x assignments score matrix (latest attempt per cell)
+    of the lecturer's assignments in a course or course group, as CSV or,
+    with ?format=ndjson, NDJSON.
+    """
+    permission_classes = [IsLecturer]
+    renderer_classes = [CSVStreamRenderer, NDJSONRenderer]
+
+    def get(self, request, course_code=None, group_id=None):
+        if group_id is not None:
+            group = get_object_or_404(CourseGroup, pk=group_id)
+            gradebook = Gradebook.for_group(group, created_by=request.user)
+            name = f'gradebook-{group.course_id}-{group.pk}'
+        else:
+            course = get_object_or_404(Courses, pk=course_code)
+            gradebook = Gradebook.for_course(course, created_by=request.user)
+            name = f'gradebook-{course.pk}'
+
+        renderer = request.accepted_renderer
+        response = streaming_response(
+            request,
+            renderer,
+            lambda: gradebook.batches(renderer.format),
+            lambda: gradebook.abatches(renderer.format),
+        )
+        response['Content-Disposition'] = content_disposition_header(True, f'{name}.{renderer.format}')
+        return response
+
+
+class AssignmentAnalyticsView(APIView):
+    """
+    Score distribution, percentiles, z-scores, lateness and attempts for one
+    of the lecturer's assignments.
+    """
+    permission_classes = [IsLecturer]
+
+    def get(self, request, pk):
+        assignment = get_object_or_404(Assignments, pk=pk, created_by=request.user)
+        data = analytics.cached(
+            f'analytics:assignment:{assignment.pk}',
+            analytics.assignment_generation(assignment.pk),
+            lambda: analytics.assignment_analytics(assignment),
+        )
+        return Response(data)
+
+
+class CourseAnalyticsView(APIView):
+    """
+    Per-assignment figures and per-student percentages and z-scores over the
+    lecturer's assignments in a course.
+    """
+    permission_classes = [IsLecturer]
+
+    def get(self, request, course_code):
+        course = get_object_or_404(Courses, pk=course_code)
+        assignments = Assignments.objects.filter(course_id=course, created_by=request.user)
+        data = analytics.cached(
+            f'analytics:course:{course.pk}:{request.user.pk}',
+            analytics.course_generation(course.pk),
+            lambda: analytics.course_analytics(course, assignments),
+        )
+        return Response(data)
@@ -1,12 +1,51 @@
 from django.contrib import admin
 
 # Register your models here
-from .models import Departments, Courses, CourseGroup, Assignments, AssignmentSubmissions, resources
-
-admin.site.register(Departments)
-admin.site.register(Courses)
-admin.site.register(CourseGroup)
-admin.site.register(Assignments)
-admin.site.register(AssignmentSubmissions)
-admin.site.register(resources)
-                    
\ No newline at end of file
+from app.eager import EagerLoadingAdmin
+from .models import Departments, Courses, CourseGroup, Assignments, AssignmentSubmissions, resources, StoredBlob
+
+
+@admin.register(Departments)
+class DepartmentsAdmin(EagerLoadingAdmin):
+    list_display = ('name', 'created_at')
+    search_fields = ('name',)
+
+
+@admin.register(Courses)
+class CoursesAdmin(EagerLoadingAdmin):
+    list_display = ('course_code', 'course_name', 'department_id', 'credits')
+    search_fields = ('course_code', 'course_name')
+
+
+@admin.register(CourseGroup)
+class CourseGroupAdmin(EagerLoadingAdmin):
+    str_select_related = ('course',)
+    list_display = ('group_name', 'course')
+    search_fields = ('group_name', 'course__course_name')
+
+
+@admin.register(Assignments)
+class AssignmentsAdmin(EagerLoadingAdmin):
+    str_select_related = ('course_id',)
+    list_display = ('title', 'course_id', 'group_id', 'due_date', 'created_by', 'is_active')
+    list_filter = ('is_active',)
+    search_fields = ('title', 'course_id__course_name')
+
+
+@admin.register(AssignmentSubmissions)
+class AssignmentSubmissionsAdmin(EagerLoadingAdmin):
+    str_select_related = ('assignment', 'student__user')
+    list_display = ('assignment__title', 'student__user__username', 'submission_date', 'score', 'is_graded')
+    list_filter = ('is_graded',)
+    search_fields = ('assignment__title', 'student__user__username')
+
+
+@admin.register(resources)
+class ResourcesAdmin(EagerLoadingAdmin):
+    str_select_related = ('course_id', 'assignment')
+    list_display = ('__str__', 'file_name', 'uploaded_by', 'uploaded_at', 'is_active')
+    list_filter = ('resource_type', 'is_active')
+    search_fields = ('resource_type', 'course_id__course_name', 'assignment__title')
+
+
+admin.site.register(StoredBlob)
@@ -0,0 +1,241 @@
+"""
+Grade analytics for an assignment or a course.
+
+The submissions of the assignments involved are read with one
+``values_list`` query (lateness against ``due_date`` is computed by the
+database) into a NumPy array, and everything else is array arithmetic:
+
+* the latest attempt of each (student, assignment) is found by sorting and
+  comparing neighbours, and the attempts per pair come from the same groups;
+* score statistics use the latest graded attempts only, since ungraded
+  submissions carry the default score of 0;
+* course figures compare students by the percentage of the available
+  ``max_score`` they earned over their graded assignments.
+
+Results are cached under generation counters (``app.caching``) that are
+bumped when a submission of the assignment is made, graded or deleted, or
+the assignment's ``due_date`` or ``max_score`` changes (``resources.signals``),
+see ``invalidate``.
+"""
+
+import numpy as np
+from django.conf import settings
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
+
+from app.caching import bump_generation, get_generation, response_cache
+from custom.models import User
+
+from .models import AssignmentSubmissions
+
+HISTOGRAM_BINS = 10
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Columns of the submissions array.
+STUDENT, ASSIGNMENT, SCORE, ATTEMPT, GRADED, LATE, ID = range(7)
+
+
+def _number(value, digits=4):
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def submissions_array(assignments):
+    rows = (
+        AssignmentSubmissions.objects
+        .filter(assignment__in=assignments)
+        .annotate(late=ExpressionWrapper(
+            Q(submission_date__gt=F('assignment__due_date')), output_field=BooleanField()))
+        .order_by()
+        .values_list('student_id', 'assignment_id', 'score', 'attempt_number', 'is_graded', 'late', 'id')
+    )
+    return np.array(list(rows), dtype=np.int64).reshape(-1, 7)
+
+
+def latest_attempts(data):
+    """
+    The rows holding each (student, assignment)'s latest attempt, and the
+    number of attempts of each of those pairs.
+    """
+    if not len(data):
+        return data, np.zeros(0, dtype=np.int64)
+    data = data[np.lexsort((data[:, ID], data[:, ATTEMPT], data[:, ASSIGNMENT], data[:, STUDENT]))]
+    pair_changes = (np.diff(data[:, STUDENT]) != 0) | (np.diff(data[:, ASSIGNMENT]) != 0)
+    last = np.append(pair_changes, True)
+    ends = np.flatnonzero(last)
+    attempts = np.diff(np.concatenate(([-1], ends)))
+    return data[last], attempts
+
+
+def distribution(values, upper):
+    """Mean, spread, percentiles and a histogram over [0, upper]."""
+    values = values.astype(float)
+    if not len(values):
+        return {'count': 0, 'mean': None, 'stddev': None, 'min': None, 'max': None,
+                'percentiles': {}, 'histogram': {'edges': [], 'counts': []}}
+    upper = max(float(upper), float(values.max()), 1.0)
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BINS, range=(0.0, upper))
+    return {
+        'count': int(len(values)),
+        'mean': _number(values.mean()),
+        'stddev': _number(values.std()),
+        'min': _number(values.min()),
+        'max': _number(values.max()),
+        'percentiles': {
+            str(q): _number(value) for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+        },
+        'histogram': {'edges': [_number(edge, 2) for edge in edges], 'counts': counts.tolist()},
+    }
+
+
+def z_scores(values):
+    """Population z-scores; NaN values (and every value, when all are equal) get None."""
+    finite = values[np.isfinite(values)]
+    std = finite.std() if len(finite) else 0.0
+    if not std:
+        return [None] * len(values)
+    return [_number(value, 3) for value in (values - finite.mean()) / std]
+
+
+def attempts_summary(attempts):
+    if not len(attempts):
+        return {'mean': None, 'max': None, 'distribution': {}}
+    numbers, counts = np.unique(attempts, return_counts=True)
+    return {
+        'mean': _number(attempts.mean()),
+        'max': int(attempts.max()),
+        'distribution': {str(number): int(count) for number, count in zip(numbers.tolist(), counts.tolist())},
+    }
+
+
+def late_summary(data):
+    return {
+        'late_submissions': int(data[:, LATE].sum()) if len(data) else 0,
+        'late_rate': _number(data[:, LATE].mean()) if len(data) else None,
+    }
+
+
+def student_names(student_ids):
+    names = User.objects.filter(pk__in=student_ids.tolist()).values_list('pk', 'username', 'full_name')
+    return {pk: (username, full_name) for pk, username, full_name in names}
+
+
+def assignment_analytics(assignment):
+    data = submissions_array([assignment.pk])
+    latest, attempts = latest_attempts(data)
+    graded = latest[latest[:, GRADED] == 1]
+    scores = graded[:, SCORE]
+    z_by_student = dict(zip(graded[:, STUDENT].tolist(), z_scores(scores.astype(float))))
+    names = student_names(latest[:, STUDENT])
+
+    students = []
+    for row, count in zip(latest.tolist(), attempts.tolist()):
+        username, full_name = names.get(row[STUDENT], (None, None))
+        students.append({
+            'student': row[STUDENT],
+            'username': username,
+            'full_name': full_name,
+            'score': row[SCORE] if row[GRADED] else None,
+            'z_score': z_by_student.get(row[STUDENT]),
+            'attempts': count,
+            'late': bool(row[LATE]),
+        })
+    return {
+        'assignment': assignment.pk,
+        'title': assignment.title,
+        'max_score': assignment.max_score,
+        'due_date': assignment.due_date.isoformat(),
+        'submissions': int(len(data)),
+        'students_submitted': int(len(latest)),
+        'students_graded': int(len(graded)),
+        'scores': distribution(scores, assignment.max_score),
+        **late_summary(data),
+        'attempts': attempts_summary(attempts),
+        'students': students,
+    }
+
+
+def course_analytics(course, assignments):
+    assignments = list(assignments.order_by('due_date', 'id').values('id', 'title', 'max_score'))
+    ids = np.array([assignment['id'] for assignment in assignments], dtype=np.int64)
+    max_scores = np.array([assignment['max_score'] for assignment in assignments], dtype=np.int64)
+    data = submissions_array(ids.tolist())
+    latest, attempts = latest_attempts(data)
+    graded = latest[latest[:, GRADED] == 1]
+
+    # Column of each graded row in ``assignments`` (which is in due date order).
+    order = np.argsort(ids)
+    column = order[np.searchsorted(ids, graded[:, ASSIGNMENT], sorter=order)]
+    per_assignment = []
+    for index, assignment in enumerate(assignments):
+        in_assignment = data[:, ASSIGNMENT] == assignment['id']
+        pair_rows = latest[:, ASSIGNMENT] == assignment['id']
+        per_assignment.append({
+            'assignment': assignment['id'],
+            'title': assignment['title'],
+            'max_score': assignment['max_score'],
+            'scores': distribution(graded[column == index, SCORE], assignment['max_score']),
+            **late_summary(data[in_assignment]),
+            'attempts': attempts_summary(attempts[pair_rows]),
+        })
+
+    # Per student: share of the available marks over their graded assignments.
+    students, student_index = np.unique(graded[:, STUDENT], return_inverse=True)
+    earned = np.bincount(student_index, weights=graded[:, SCORE], minlength=len(students))
+    available = np.bincount(student_index, weights=max_scores[column], minlength=len(students))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentages = np.where(available > 0, 100.0 * earned / available, np.nan)
+    z = z_scores(percentages)
+    names = student_names(students)
+    submitted, pair_counts = np.unique(latest[:, STUDENT], return_counts=True)
+    assignments_attempted = dict(zip(submitted.tolist(), pair_counts.tolist()))
+
+    return {
+        'course': course.pk,
+        'course_name': course.course_name,
+        'assignments': per_assignment,
+        'submissions': int(len(data)),
+        'students_submitted': int(len(submitted)),
+        'students_graded': int(len(students)),
+        'percentages': distribution(percentages[np.isfinite(percentages)], 100),
+        **late_summary(data),
+        'attempts': attempts_summary(attempts),
+        'students': [
+            {
+                'student': student,
+                'username': names.get(student, (None, None))[0],
+                'full_name': names.get(student, (None, None))[1],
+                'percentage': _number(percentage, 2),
+                'z_score': z_score,
+                'assignments_attempted': assignments_attempted.get(student, 0),
+            }
+            for student, percentage, z_score in zip(students.tolist(), percentages.tolist(), z)
+        ],
+    }
+
+
+def assignment_generation(assignment_id):
+    return f'analytics:assignment:{assignment_id}'
+
+
+def course_generation(course_code):
+    return f'analytics:course:{course_code}'
+
+
+def cached(key, generation, compute):
+    cache = response_cache()
+    key = f'{key}:{get_generation(generation)}'
+    data = cache.get(key)
+    if data is None:
+        data = compute()
+        cache.set(key, data, settings.RESPONSE_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate(submission):
+    """Drop the cached analytics covering ``submission``."""
+    invalidate_assignment(submission.assignment_id, submission.assignment.course_id_id)
+
+
+def invalidate_assignment(assignment_id, course_code):
+    bump_generation(assignment_generation(assignment_id))
+    bump_generation(course_generation(course_code))
@@ -0,0 +1,33 @@
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from ..search import search
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Drop-in replacement for SearchFilter backed by resources.search. Matching
+    rows are annotated with ``search_rank`` (lower is better) and, unless the
+    request asked for another ordering, ordered by it.
+    """
+    search_param = api_settings.SEARCH_PARAM
+    search_description = 'Words to search for; each word matches as a prefix.'
+
+    def filter_queryset(self, request, queryset, view):
+        matches = search(queryset, request.query_params.get(self.search_param, ''))
+        if matches is None:
+            return queryset
+        if not matches.query.order_by:
+            matches = matches.order_by('search_rank')
+        return matches
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.search_param,
+                'required': False,
+                'in': 'query',
+                'description': self.search_description,
+                'schema': {'type': 'string'},
+            },
+        ]
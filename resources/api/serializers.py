@@ -1,8 +1,68 @@
+import os
+
+from django.conf import settings
 from rest_framework import serializers
-from ..models import resources as ResourceModel
+from ..models import UploadSession, resources as ResourceModel
+from ..uploadhandlers import upload_size_limit
+from ..uploads import received_chunks, received_offset
 
 class ResourceSerializer(serializers.ModelSerializer):
     class Meta:
         model = ResourceModel
         fields = '__all__'
-        read_only_fields = ('id', 'uploaded_at', 'uploaded_by') 
\ No newline at end of file
+        read_only_fields = ('id', 'uploaded_at', 'uploaded_by', 'file_name', 'file_size', 'content_type', 'file_checksum')
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.IntegerField(required=False, min_value=1)
+    total_chunks = serializers.IntegerField(read_only=True)
+    received_chunks = serializers.SerializerMethodField()
+    offset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id',
+            'filename',
+            'total_size',
+            'chunk_size',
+            'sha256',
+            'total_chunks',
+            'received_chunks',
+            'offset',
+            'resource',
+            'created_at',
+            'completed_at',
+        ]
+        read_only_fields = ('id', 'resource', 'created_at', 'completed_at')
+
+    def get_received_chunks(self, obj):
+        return received_chunks(obj)
+
+    def get_offset(self, obj):
+        return received_offset(obj)
+
+    def validate_filename(self, value):
+        name = os.path.basename(value.replace('\\', '/'))
+        if not name:
+            raise serializers.ValidationError("A file name is required")
+        return name
+
+    def validate_total_size(self, value):
+        if value < 1:
+            raise serializers.ValidationError("total_size must be at least 1 byte")
+        limit = upload_size_limit(self.context['request'].user)
+        if limit is not None and value > limit:
+            raise serializers.ValidationError(f"Uploads are limited to {limit} bytes")
+        return value
+
+    def validate_chunk_size(self, value):
+        if value > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+            raise serializers.ValidationError(
+                f"chunk_size may not exceed {settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE} bytes")
+        return value
+
+    def create(self, validated_data):
+        validated_data.setdefault('chunk_size', settings.CHUNKED_UPLOAD_CHUNK_SIZE)
+        return super().create(validated_data)
+
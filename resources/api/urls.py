@@ -1,8 +1,22 @@
 from django.urls import path
-from resources.api.views import ResourceListCreateView, ResourceRetrieveUpdateDestroyView, ResourceDownloadView
+from resources.api.views import (
+    resource_list_create_view,
+    ResourceRetrieveUpdateDestroyView,
+    resource_download_view,
+    UploadSessionCreateView,
+    UploadSessionDetailView,
+    UploadChunkView,
+    UploadSessionCompleteView,
+    ResponseCacheStatsView,
+)
 
 urlpatterns = [
-    path('resources/', ResourceListCreateView.as_view(), name='resource-list-create'),
+    path('resources/', resource_list_create_view, name='resource-list-create'),
     path('resources/<int:pk>/', ResourceRetrieveUpdateDestroyView.as_view(), name='resource-detail'),
-    path('resources/download/<int:pk>/', ResourceDownloadView.as_view(), name='resource-download'),
+    path('resources/download/<int:pk>/', resource_download_view, name='resource-download'),
+    path('uploads/', UploadSessionCreateView.as_view(), name='upload-session-create'),
+    path('uploads/<uuid:pk>/', UploadSessionDetailView.as_view(), name='upload-session-detail'),
+    path('uploads/<uuid:pk>/chunks/<int:index>/', UploadChunkView.as_view(), name='upload-chunk'),
+    path('uploads/<uuid:pk>/complete/', UploadSessionCompleteView.as_view(), name='upload-session-complete'),
+    path('cache/stats/', ResponseCacheStatsView.as_view(), name='response-cache-stats'),
 ]
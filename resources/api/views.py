@@ -1,13 +1,26 @@
+import io
+
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import generics, permissions, filters
-from resources.models import resources as ResourceModel
+from resources.models import UploadSession, resources as ResourceModel
+from resources.uploadhandlers import StreamingUploadMixin
+from resources.uploads import ChunkError, assemble, discard, received_offset, write_chunk
 from student.models import Student
 from custom.models import User
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.http import FileResponse, Http404
-import os
-from .serializers import ResourceSerializer
+from django.http import Http404
+from app.asyncviews import DOWNLOAD_FIELDS, aget_user, async_get, async_list_view, deliver_or_none
+from app.delivery import deliver_file
+from app.caching import CachedListMixin, cache_stats, get_generation
+from app.compiled import CompiledListMixin
+from app.conditional import ConditionalListMixin, ConditionalRetrieveMixin
+from app.eager import EagerLoadingMixin
+from .filters import FullTextSearchFilter
+from .serializers import ResourceSerializer, UploadSessionSerializer
 from rest_framework import status
 from django.urls import reverse
 
@@ -17,17 +30,18 @@ class IsLecturerOrClassRep(permissions.BasePermission):
         return request.user.is_authenticated and request.user.role in ['lecture', 'cr']
 
 # CRUD Views
-class ResourceListCreateView(generics.ListCreateAPIView):
+class ResourceListCreateView(CachedListMixin, CompiledListMixin, ConditionalListMixin, EagerLoadingMixin, StreamingUploadMixin, generics.ListCreateAPIView):
     """
     List all resources (GET) or create a new resource (POST, only for lecturers/class reps).
     Supports filtering, searching, and ordering.
     """
     queryset = ResourceModel.objects.filter(is_active=True)
     serializer_class = ResourceSerializer
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
     ordering_fields = ['uploaded_at', 'resource_type']
-    search_fields = ['resource_type', 'course_id__course_name', 'assignment__title']
+    cache_generations = ('resources',)
     parser_classes = [MultiPartParser, FormParser]
+    read_from_replica = True
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -37,7 +51,11 @@ class ResourceListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save(uploaded_by=self.request.user)
 
-class ResourceRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+
+resource_list_create_view = async_list_view(ResourceListCreateView)
+
+
+class ResourceRetrieveUpdateDestroyView(ConditionalRetrieveMixin, EagerLoadingMixin, StreamingUploadMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update, or delete a resource by ID.
     Update/delete only allowed for lecturers/class reps.
@@ -54,19 +72,136 @@ class ResourceRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 class ResourceDownloadView(APIView):
     """
     Download a resource file by ID. Only for authenticated users.
+    Supports Range requests and conditional GET (ETag / If-Modified-Since).
     """
     permission_classes = [permissions.IsAuthenticated]
+    read_from_replica = True
 
     def get(self, request, pk):
         try:
             resource = ResourceModel.objects.get(pk=pk, is_active=True)
             if not resource.resource_file:
                 raise Http404
-            file_path = resource.resource_file.path
-            file_handle = open(file_path, 'rb')
-            response = FileResponse(file_handle, as_attachment=True, filename=os.path.basename(file_path))
-            return response
+            return deliver_file(
+                request,
+                resource.resource_file,
+                checksum=resource.file_checksum,
+                filename=resource.file_name,
+            )
         except ResourceModel.DoesNotExist:
             raise Http404
         except Exception:
-            raise Http404 
\ No newline at end of file
+            raise Http404
+
+
+@async_get(ResourceDownloadView.as_view())
+async def resource_download_view(request, pk):
+    if not (await aget_user(request)).is_authenticated:
+        return None
+    resource = await ResourceModel.objects.only(*DOWNLOAD_FIELDS, 'resource_file').filter(pk=pk, is_active=True).afirst()
+    return deliver_or_none(request, resource, 'resource_file')
+
+
+# Resumable chunked uploads
+class UploadSessionCreateView(generics.CreateAPIView):
+    """
+    Start a resumable upload (POST, lecturers/class reps only).
+    Body: filename, total_size, optional chunk_size and sha256.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsLecturerOrClassRep]
+
+    def perform_create(self, serializer):
+        serializer.save(uploaded_by=self.request.user)
+
+
+class UploadSessionDetailView(generics.RetrieveDestroyAPIView):
+    """
+    Report which chunks have been received and the contiguous byte offset
+    (GET/HEAD, also sent as the Upload-Offset header), or abandon the upload (DELETE).
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsLecturerOrClassRep]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(uploaded_by=self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        response['Upload-Offset'] = str(response.data['offset'])
+        return response
+
+    def perform_destroy(self, instance):
+        discard(instance)
+        instance.delete()
+
+
+class UploadChunkView(APIView):
+    """
+    Store chunk number <index> (0-based) from the raw request body (PUT).
+    Re-sending a chunk replaces it. An optional X-Chunk-Checksum header
+    carries the chunk's SHA-256.
+    """
+    permission_classes = [IsLecturerOrClassRep]
+
+    def put(self, request, pk, index):
+        session = get_object_or_404(
+            UploadSession, pk=pk, uploaded_by=request.user, completed_at__isnull=True)
+        try:
+            write_chunk(
+                session,
+                index,
+                request.stream or io.BytesIO(),
+                checksum=request.headers.get('X-Chunk-Checksum'),
+            )
+        except ChunkError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        offset = received_offset(session)
+        return Response({'index': index, 'offset': offset}, headers={'Upload-Offset': str(offset)})
+
+
+class UploadSessionCompleteView(generics.GenericAPIView):
+    """
+    Verify and assemble the received chunks into a new resource (POST).
+    Body: the same fields as a resource create, without resource_file.
+    """
+    serializer_class = ResourceSerializer
+    permission_classes = [IsLecturerOrClassRep]
+
+    def post(self, request, pk):
+        session = get_object_or_404(UploadSession, pk=pk, uploaded_by=request.user)
+        if session.completed_at:
+            if session.resource is None:
+                # The resource made from this upload has been deleted since.
+                discard(session)
+                return Response(
+                    {'detail': 'The resource created by this upload has been deleted.'},
+                    status=status.HTTP_410_GONE,
+                )
+            return Response(self.get_serializer(session.resource).data)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            upload = assemble(session)
+        except ChunkError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with transaction.atomic():
+                resource = serializer.save(uploaded_by=request.user, resource_file=upload)
+                session.resource = resource
+                session.completed_at = timezone.now()
+                session.save(update_fields=['resource', 'completed_at'])
+        finally:
+            upload.close()
+        discard(session)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class ResponseCacheStatsView(APIView):
+    """Hit/miss counters of the list response cache (staff only)."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({**cache_stats(), 'generations': {'resources': get_generation('resources')}})
@@ -0,0 +1,118 @@
+"""
+Submission counters kept on each assignment.
+
+``submission_count``, ``submitter_count`` (distinct students),
+``graded_count`` and ``last_submission_at`` are written with single
+``UPDATE`` statements built from ``F()`` expressions and subqueries, so
+concurrent submissions and gradings never overwrite each other's
+increments. ``Assignments.save()`` leaves these columns alone for the same
+reason. Every one of those statements also sets ``updated_at``: the
+counters are part of the assignment payload, and the conditional views
+(``app.conditional``) fingerprint assignments by ``updated_at``.
+
+Submissions created and deleted through the ORM are counted by the signal
+handlers in ``resources.signals``; gradings go through ``grading_changed``
+or, for ``resources.grading.bulk_grade``, ``graded``.
+Anything else that changes submissions (``QuerySet.update()``, raw SQL, the
+admin's ``is_graded`` checkbox) may leave the counters off until
+``manage.py recount_submissions`` runs.
+"""
+
+from django.db.models import Case, Count, Exists, F, IntegerField, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AssignmentSubmissions, Assignments
+
+
+def _other_submissions(submission):
+    """The student's other submissions to the same assignment."""
+    return AssignmentSubmissions.objects.filter(
+        assignment_id=submission.assignment_id, student_id=submission.student_id,
+    ).exclude(pk=submission.pk)
+
+
+def _unless_exists(queryset):
+    """1 when ``queryset`` is empty, else 0, evaluated by the UPDATE itself."""
+    return Case(When(Exists(queryset), then=Value(0)), default=Value(1), output_field=IntegerField())
+
+
+def submission_added(submission):
+    date = submission.submission_date
+    Assignments.objects.filter(pk=submission.assignment_id).update(
+        submission_count=F('submission_count') + 1,
+        submitter_count=F('submitter_count') + _unless_exists(_other_submissions(submission)),
+        graded_count=F('graded_count') + int(submission.is_graded),
+        last_submission_at=Case(
+            When(last_submission_at__gte=date, then=F('last_submission_at')),
+            default=Value(date),
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def submission_removed(submission):
+    remaining = AssignmentSubmissions.objects.filter(assignment=OuterRef('pk')).exclude(pk=submission.pk)
+    # Recounted, not decremented: a delete that cascades to several
+    # submissions of one student sends every post_delete after all of them
+    # are gone, so each would find no other submission by that student.
+    submitters = remaining.order_by().values('assignment').annotate(value=Count('student', distinct=True))
+    Assignments.objects.filter(pk=submission.assignment_id).update(
+        submission_count=F('submission_count') - 1,
+        submitter_count=Coalesce(Subquery(submitters.values('value')), 0),
+        graded_count=F('graded_count') - int(submission.is_graded),
+        last_submission_at=Subquery(remaining.order_by('-submission_date').values('submission_date')[:1]),
+        updated_at=timezone.now(),
+    )
+
+
+def grading_changed(submission, was_graded):
+    """
+    Count a change of ``is_graded``. ``was_graded`` must be read with the
+    row locked (``select_for_update``) in the transaction saving the change,
+    so two concurrent gradings of one submission count it once.
+    """
+    graded({submission.assignment_id: int(submission.is_graded) - int(was_graded)})
+
+
+def graded(changes):
+    """Add ``changes`` ({assignment id: change in graded submissions}) to ``graded_count``."""
+    now = timezone.now()
+    for assignment_id, delta in changes.items():
+        if delta:
+            Assignments.objects.filter(pk=assignment_id).update(
+                graded_count=F('graded_count') + delta, updated_at=now)
+
+
+def _aggregate(expression):
+    return Subquery(
+        AssignmentSubmissions.objects
+        .filter(assignment=OuterRef('pk'))
+        .order_by()
+        .values('assignment')
+        .annotate(value=expression)
+        .values('value')
+    )
+
+
+def expected_counters():
+    """Expressions computing every counter from the submissions table."""
+    return {
+        'submission_count': Coalesce(_aggregate(Count('pk')), 0),
+        'submitter_count': Coalesce(_aggregate(Count('student', distinct=True)), 0),
+        'graded_count': Coalesce(_aggregate(Count('pk', filter=Q(is_graded=True))), 0),
+        'last_submission_at': _aggregate(Max('submission_date')),
+    }
+
+
+def drifted(assignments):
+    """The pks of ``assignments`` whose counters don't match their submissions."""
+    expected = {f'expected_{name}': expression for name, expression in expected_counters().items()}
+    rows = assignments.annotate(**expected).values_list('pk', *Assignments.COUNTER_FIELDS, *expected)
+    width = len(Assignments.COUNTER_FIELDS)
+    return [row[0] for row in rows if row[1:1 + width] != row[1 + width:]]
+
+
+def recount(assignments):
+    """Recompute the counters of ``assignments`` with one UPDATE; returns the number of rows written."""
+    return assignments.update(**expected_counters(), updated_at=timezone.now())
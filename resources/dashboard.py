@@ -0,0 +1,103 @@
+"""
+Dashboard payloads.
+
+Each builder returns everything a role's landing page shows (the user,
+upcoming assignments, recent submissions with their grading status, new
+resources and counts) from a fixed number of ``.values()`` queries, however
+many rows there are: one per list and one aggregate per table. The
+lecturer's submission figures come from the counters on ``Assignments``
+(``resources.counters``).
+"""
+
+from datetime import timedelta
+
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from custom.api.serializers import UserSerializer
+
+from .models import AssignmentSubmissions, Assignments, resources
+
+DASHBOARD_ITEMS = 5
+
+# Resources uploaded within this window count as new.
+NEW_RESOURCE_AGE = timedelta(days=7)
+
+ASSIGNMENT_FIELDS = ('id', 'title', 'course_id', 'due_date', 'max_score')
+SUBMISSION_FIELDS = ('id', 'assignment', 'submission_date', 'attempt_number', 'is_graded', 'score')
+RESOURCE_FIELDS = ('id', 'resource_type', 'file_name', 'course_id', 'assignment', 'uploaded_at')
+
+
+def new_resources(now, limit):
+    active = resources.objects.filter(is_active=True)
+    items = list(active.order_by('-uploaded_at', '-id').values(*RESOURCE_FIELDS)[:limit])
+    count = active.filter(uploaded_at__gte=now - NEW_RESOURCE_AGE).count()
+    return items, count
+
+
+def student_dashboard(user, limit=DASHBOARD_ITEMS):
+    now = timezone.now()
+    submissions = AssignmentSubmissions.objects.filter(student__user=user)
+    upcoming = Assignments.objects.filter(is_active=True, due_date__gte=now)
+    resource_items, new_resource_count = new_resources(now, limit)
+    counts = submissions.aggregate(
+        submissions=Count('pk'),
+        graded=Count('pk', filter=Q(is_graded=True)),
+    )
+    return {
+        'user': UserSerializer(user).data,
+        'upcoming_assignments': list(
+            upcoming
+            .annotate(submitted=Exists(submissions.filter(assignment=OuterRef('pk'))))
+            .order_by('due_date', 'id')
+            .values(*ASSIGNMENT_FIELDS, 'submitted')[:limit]
+        ),
+        'recent_submissions': list(
+            submissions
+            .annotate(assignment_title=F('assignment__title'))
+            .order_by('-submission_date', '-id')
+            .values(*SUBMISSION_FIELDS, 'assignment_title')[:limit]
+        ),
+        'new_resources': resource_items,
+        'counts': {
+            **counts,
+            'pending': counts['submissions'] - counts['graded'],
+            'upcoming_assignments': upcoming.count(),
+            'new_resources': new_resource_count,
+        },
+    }
+
+
+def lecturer_dashboard(user, limit=DASHBOARD_ITEMS):
+    now = timezone.now()
+    assignments = Assignments.objects.filter(created_by=user)
+    submissions = AssignmentSubmissions.objects.filter(assignment__created_by=user)
+    resource_items, new_resource_count = new_resources(now, limit)
+    counts = assignments.aggregate(
+        assignments=Count('pk'),
+        upcoming_assignments=Count('pk', filter=Q(is_active=True, due_date__gte=now)),
+        submissions=Coalesce(Sum('submission_count'), 0),
+        graded=Coalesce(Sum('graded_count'), 0),
+    )
+    return {
+        'user': UserSerializer(user).data,
+        'upcoming_assignments': list(
+            assignments
+            .filter(is_active=True, due_date__gte=now)
+            .order_by('due_date', 'id')
+            .values(*ASSIGNMENT_FIELDS, *Assignments.COUNTER_FIELDS)[:limit]
+        ),
+        'recent_submissions': list(
+            submissions
+            .annotate(assignment_title=F('assignment__title'), student_username=F('student__user__username'))
+            .order_by('-submission_date', '-id')
+            .values(*SUBMISSION_FIELDS, 'student', 'assignment_title', 'student_username')[:limit]
+        ),
+        'new_resources': resource_items,
+        'counts': {
+            **counts,
+            'ungraded': counts['submissions'] - counts['graded'],
+            'new_resources': new_resource_count,
+        },
+    }
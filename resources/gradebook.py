@@ -0,0 +1,148 @@
+"""
+Course gradebook: the students x assignments score matrix.
+
+The columns are the assignments of a course (or of one course group),
+ordered by due date. Every cell is the score of the student's latest
+attempt (highest ``attempt_number``) at that assignment. The cells come
+from one query: a ROW_NUMBER() window over each (student, assignment)
+partition keeps the latest attempt, ordered by student so the rows of one
+student arrive together and each matrix row can be written as soon as it
+is complete. There is no enrolment table, so the rows are the students
+with at least one submission.
+
+Records are produced in the shape the streaming renderers expect: lists of
+cells for CSV (after a header row) and dicts for NDJSON (after one line
+describing the assignments).
+"""
+
+from itertools import groupby
+
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from app.streaming import abatched, batched
+
+from .models import AssignmentSubmissions, Assignments
+
+CELL_FIELDS = (
+    'student_id',
+    'student__user__username',
+    'student__user__full_name',
+    'assignment_id',
+    'score',
+)
+
+
+class Gradebook:
+    def __init__(self, assignments):
+        self.assignments = list(
+            assignments.order_by('due_date', 'id').values('id', 'title', 'max_score', 'due_date')
+        )
+        self.columns = {assignment['id']: index for index, assignment in enumerate(self.assignments)}
+        self.max_total = sum(assignment['max_score'] for assignment in self.assignments)
+
+    @classmethod
+    def for_course(cls, course, created_by=None):
+        return cls(cls._owned(Assignments.objects.filter(course_id=course), created_by))
+
+    @classmethod
+    def for_group(cls, group, created_by=None):
+        return cls(cls._owned(Assignments.objects.filter(group_id=group), created_by))
+
+    @staticmethod
+    def _owned(assignments, created_by):
+        return assignments if created_by is None else assignments.filter(created_by=created_by)
+
+    def cells(self):
+        """Latest attempt per (student, assignment), ordered by student."""
+        return (
+            AssignmentSubmissions.objects
+            .filter(assignment_id__in=list(self.columns))
+            .annotate(latest=Window(
+                RowNumber(),
+                partition_by=[F('student_id'), F('assignment_id')],
+                order_by=[F('attempt_number').desc(), F('id').desc()],
+            ))
+            .filter(latest=1)
+            .order_by('student__user__username', 'student_id')
+            # values() rather than values_list(): only the former can be read with aiterator().
+            .values(*CELL_FIELDS)
+        )
+
+    def row(self, cells):
+        """The matrix row for one student's cells."""
+        cells = list(cells)
+        first = cells[0]
+        scores = [None] * len(self.assignments)
+        for cell in cells:
+            scores[self.columns[cell['assignment_id']]] = cell['score']
+        total = sum(score for score in scores if score is not None)
+        percentage = round(100 * total / self.max_total, 2) if self.max_total else None
+        return (
+            first['student_id'],
+            first['student__user__username'],
+            first['student__user__full_name'],
+            scores,
+            total,
+            percentage,
+        )
+
+    def rows(self, cells):
+        for _, student_cells in groupby(cells, key=lambda cell: cell['student_id']):
+            yield self.row(student_cells)
+
+    async def arows(self, cells):
+        current = []
+        async for cell in cells:
+            if current and cell['student_id'] != current[0]['student_id']:
+                yield self.row(current)
+                current = []
+            current.append(cell)
+        if current:
+            yield self.row(current)
+
+    # Records for the streaming renderers.
+
+    def batches(self, format, size=500):
+        yield [self.header(format)]
+        for rows in batched(self.rows(self.cells().iterator(chunk_size=size)), size):
+            yield [self.record(row, format) for row in rows]
+
+    async def abatches(self, format, size=500):
+        yield [self.header(format)]
+        async for rows in abatched(self.arows(self.cells().aiterator(chunk_size=size)), size):
+            yield [self.record(row, format) for row in rows]
+
+    def header(self, format):
+        if format == 'csv':
+            return [
+                'student_id', 'username', 'full_name',
+                *(f"{assignment['title']} (/{assignment['max_score']})" for assignment in self.assignments),
+                'total', f'percentage (of {self.max_total})',
+            ]
+        return {
+            'assignments': [
+                {
+                    'id': assignment['id'],
+                    'title': assignment['title'],
+                    'max_score': assignment['max_score'],
+                    'due_date': assignment['due_date'].isoformat(),
+                }
+                for assignment in self.assignments
+            ],
+            'max_total': self.max_total,
+        }
+
+    def record(self, row, format):
+        student_id, username, full_name, scores, total, percentage = row
+        if format == 'csv':
+            return [student_id, username, full_name, *('' if score is None else score for score in scores),
+                    total, '' if percentage is None else percentage]
+        return {
+            'student': student_id,
+            'username': username,
+            'full_name': full_name,
+            'scores': {str(assignment['id']): score for assignment, score in zip(self.assignments, scores)},
+            'total': total,
+            'percentage': percentage,
+        }
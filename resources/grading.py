@@ -0,0 +1,74 @@
+"""
+Bulk grading: score and feedback for many submissions in one transaction.
+
+The submissions are read (and locked) with one query, every row is checked
+against its assignment's ``max_score`` and, when all of them pass, written
+with one ``bulk_update``. ``bulk_update`` sends no signals, so this also
+maintains ``updated_at``, the graded counters and the analytics cache.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import analytics, counters
+from .models import AssignmentSubmissions
+
+BULK_GRADE_FIELDS = ['score', 'feedback', 'is_graded', 'updated_at']
+
+
+def _check(item, submission, seen):
+    if item['id'] in seen:
+        return {'id': ['Submission listed more than once.']}
+    if submission is None:
+        return {'id': ['Submission not found.']}
+    score = item.get('score')
+    if score is not None and score > submission.max_score:
+        return {'score': [f'Score must be between 0 and {submission.max_score}.']}
+    return None
+
+
+def bulk_grade(items, lecturer):
+    """
+    Grade the submissions described by ``items`` (dicts with ``id`` and
+    ``score`` and/or ``feedback``), limited to the lecturer's assignments.
+
+    Returns ``(applied, results)``: one result per item, in order. Nothing is
+    written unless every item is valid.
+    """
+    with transaction.atomic():
+        submissions = AssignmentSubmissions.objects.select_for_update().filter(
+            pk__in=[item['id'] for item in items], assignment__created_by=lecturer,
+        ).annotate(
+            max_score=F('assignment__max_score'), course=F('assignment__course_id'),
+        ).only('id', 'assignment', 'score', 'feedback', 'is_graded')
+        by_id = {submission.pk: submission for submission in submissions}
+
+        results, seen = [], set()
+        for item in items:
+            errors = _check(item, by_id.get(item['id']), seen)
+            seen.add(item['id'])
+            results.append({'id': item['id'], 'status': 'error', 'errors': errors} if errors
+                           else {'id': item['id'], 'status': 'ok'})
+        if any(result['status'] == 'error' for result in results):
+            return False, results
+
+        now = timezone.now()
+        newly_graded = Counter()
+        for item, result in zip(items, results):
+            submission = by_id[item['id']]
+            if not submission.is_graded:
+                newly_graded[submission.assignment_id] += 1
+            submission.score = item.get('score', submission.score)
+            submission.feedback = item.get('feedback', submission.feedback)
+            submission.is_graded = True
+            submission.updated_at = now
+            result.update(status='graded', score=submission.score, feedback=submission.feedback)
+        AssignmentSubmissions.objects.bulk_update(by_id.values(), BULK_GRADE_FIELDS, batch_size=500)
+        counters.graded(newly_graded)
+
+    for assignment_id, course in {(s.assignment_id, s.course) for s in by_id.values()}:
+        analytics.invalidate_assignment(assignment_id, course)
+    return True, results
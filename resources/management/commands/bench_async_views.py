@@ -0,0 +1,197 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from app.bench import format_table
+from resources.counters import recount
+from custom.models import User
+from resources.models import AssignmentSubmissions, Assignments, Courses, Departments, resources
+from student.models import Student
+
+
+def sync_patterns(patterns):
+    """``patterns`` with every ``app.asyncviews.async_get`` view replaced by its sync view."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield URLResolver(
+                pattern.pattern, list(sync_patterns(pattern.url_patterns)),
+                pattern.default_kwargs, pattern.app_name, pattern.namespace,
+            )
+        else:
+            callback = getattr(pattern.callback, 'sync_view', pattern.callback)
+            yield URLPattern(pattern.pattern, callback, pattern.default_args, pattern.name)
+
+
+# The sync URLconf: ROOT_URLCONF points here while the sync views are timed.
+urlpatterns = []
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec and latency of the async GET views against the "
+        "sync DRF views they wrap, with concurrent requests sent straight to "
+        "the ASGI application as a logged-in student. Rows and the session "
+        "are created for the run and deleted afterwards; downloads use the "
+        "X-Accel-Redirect backend, so no file is read."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per endpoint and mode.')
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight at once.')
+        parser.add_argument('--rows', type=int, default=200, help='Resources and submissions to create.')
+
+    def handle(self, *args, **options):
+        global urlpatterns
+        urlpatterns = list(sync_patterns(get_resolver().url_patterns))
+        course, user = self.create_rows(options['rows'])
+        session = self.create_session(user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'.encode()
+        resource = resources.objects.filter(course_id=course).exclude(file_checksum=None).first()
+        submission = AssignmentSubmissions.objects.filter(student__user=user).exclude(file_checksum=None).first()
+        paths = [
+            '/api/student/check_auth',
+            '/api/student/get_user',
+            reverse('user-role'),
+            reverse('student-resource-list'),
+            reverse('student-submission-list-create'),
+            reverse('student-resource-download', args=[resource.pk]),
+            reverse('student-submission-download', args=[submission.pk]),
+        ]
+        results = []
+        try:
+            with override_settings(FILE_DELIVERY_BACKEND='app.delivery.XAccelRedirectBackend'):
+                for path in paths:
+                    with override_settings(ROOT_URLCONF=__name__):
+                        sync = self.run(path, cookie, options)
+                    run = self.run(path, cookie, options)
+                    if run['body'] != sync['body']:
+                        raise CommandError(f"The async and sync views answer {path} differently.")
+                    for mode, timings in (('sync', sync), ('async', run)):
+                        results.append([
+                            path, mode, f"{timings['rps']:.0f}", f"{timings['p50']:.1f}", f"{timings['p99']:.1f}",
+                        ])
+        finally:
+            session.delete()
+            course.delete()
+            User.objects.filter(pk=user.pk).delete()
+            course.department_id.delete()
+        self.stdout.write(format_table(['endpoint', 'views', 'req/s', 'p50 (ms)', 'p99 (ms)'], results))
+
+    def run(self, path, cookie, options):
+        timings = asyncio.run(self.load(get_asgi_application(), path, cookie, options))
+        if timings['status'] != {200}:
+            raise CommandError(f"{path} answered with status {sorted(timings['status'])}.")
+        return timings
+
+    async def load(self, application, path, cookie, options):
+        total = options['requests']
+        latencies, statuses, bodies = [], set(), []
+        queue = iter(range(total))
+
+        async def worker():
+            for _ in queue:
+                start = time.perf_counter()
+                status, body = await asgi_get(application, path, cookie)
+                latencies.append(time.perf_counter() - start)
+                statuses.add(status)
+                if not bodies:
+                    bodies.append(body)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(options['concurrency'])))
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        return {
+            'status': statuses,
+            'body': bodies[0],
+            'rps': total / elapsed,
+            'p50': statistics.median(latencies) * 1000,
+            'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        }
+
+    def create_rows(self, count):
+        now = timezone.now()
+        user = User.objects.create(username='bench-student', email='bench-student@example.com', role='student')
+        student = Student.objects.create(user=user)
+        department = Departments.objects.create(name='Benchmark')
+        course = Courses.objects.create(course_code='BENCH', course_name='Benchmark', department_id=department)
+        assignment = Assignments.objects.create(course_id=course, title='Benchmark', due_date=now)
+        # bulk_create sends no signals, so the file names never reach blob storage.
+        resources.objects.bulk_create(
+            resources(
+                course_id=course, assignment=assignment, resource_type='document',
+                resource_file=f'bench/notes-{index}.pdf', file_name=f'notes-{index}.pdf',
+                file_checksum=f'{index:064x}', description='Lecture notes',
+            )
+            for index in range(count)
+        )
+        AssignmentSubmissions.objects.bulk_create(
+            AssignmentSubmissions(
+                assignment=assignment, student=student, attempt_number=index + 1,
+                submission_file=f'bench/answer-{index}.zip', file_name=f'answer-{index}.zip',
+                file_checksum=f'{index:064x}',
+            )
+            for index in range(count)
+        )
+        recount(Assignments.objects.filter(pk=assignment.pk))
+        return course, user
+
+    def create_session(self, user):
+        session = import_string(settings.SESSION_ENGINE + '.SessionStore')()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return session
+
+
+async def asgi_get(application, path, cookie):
+    """Send one GET to ``application`` the way an ASGI server would; returns the status and body."""
+    url = urlsplit(path)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': url.path,
+        'raw_path': url.path.encode(),
+        'query_string': url.query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'accept', b'application/json'), (b'cookie', cookie)],
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+    sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Django listens for a disconnect until the response is sent.
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    status, body = None, []
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            body.append(message.get('body', b''))
+
+    await application(scope, receive, send)
+    return status, b''.join(body)
@@ -0,0 +1,131 @@
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app.bench import format_table
+from custom.models import User
+from resources.models import AssignmentSubmissions, Assignments, Courses, Departments
+from student.models import Student
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate the minute before a deadline: every student thread submits "
+        "at once through the submission endpoint, first with SQLite's default "
+        "settings and then with the tuned profile (app/sqlite.py). Reports "
+        "submissions/sec, latency and how many failed with 'database is "
+        "locked', and checks the assignment's counters. Runs against the "
+        "configured SQLite database; its rows are deleted afterwards and "
+        "uploads go to a temporary directory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=40, help='Students submitting concurrently.')
+        parser.add_argument('--attempts', type=int, default=3, help='Submissions per student.')
+        parser.add_argument('--size', type=int, default=64, help='Size of each uploaded file in KiB.')
+
+    def handle(self, *args, students, attempts, size, **options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor != 'sqlite':
+            raise CommandError("The default database isn't SQLite.")
+        journal_mode = self.journal_mode()
+        media_root = tempfile.mkdtemp()
+        assignment, users = self.create_rows(students)
+        results = []
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                for label, tuned in (('defaults', False), ('tuned', True)):
+                    with override_settings(SQLITE_TUNING=tuned):
+                        connections.close_all()
+                        self.journal_mode('WAL' if tuned else 'DELETE')
+                        run = self.burst(assignment, users, attempts, size * 1024)
+                    counted = Assignments.objects.get(pk=assignment.pk).submission_count
+                    stored = AssignmentSubmissions.objects.filter(assignment=assignment).count()
+                    results.append([
+                        label, run['sent'], run['created'], run['locked'], run['failed'],
+                        f"{run['created'] / run['elapsed']:.1f}", f"{run['p50']:.0f}", f"{run['p99']:.0f}",
+                        'yes' if counted == stored == run['created'] else f'no ({counted}/{stored})',
+                    ])
+                    AssignmentSubmissions.objects.filter(assignment=assignment).delete()
+        finally:
+            assignment.course_id.delete()
+            assignment.course_id.department_id.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+            self.journal_mode(journal_mode)
+            shutil.rmtree(media_root, ignore_errors=True)
+        self.stdout.write(format_table(
+            ['settings', 'sent', 'created', 'locked', 'failed', 'created/s', 'p50 (ms)', 'p99 (ms)', 'counters ok'],
+            results,
+        ))
+
+    def journal_mode(self, mode=None):
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(f'PRAGMA journal_mode={mode}' if mode else 'PRAGMA journal_mode')
+            return cursor.fetchone()[0]
+
+    def burst(self, assignment, users, attempts, size):
+        url = reverse('student-submission-list-create')
+        clients = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+        start_line = threading.Barrier(len(clients) + 1)
+        latencies, outcomes = [], []
+
+        def student(client):
+            try:
+                start_line.wait()
+                for attempt in range(attempts):
+                    upload = SimpleUploadedFile(f'answer-{attempt}.bin', os.urandom(size))
+                    start = time.perf_counter()
+                    try:
+                        response = client.post(url, {'assignment': assignment.pk, 'submission_file': upload})
+                    except OperationalError as exc:
+                        outcomes.append('locked' if 'locked' in str(exc) else 'failed')
+                        continue
+                    latencies.append(time.perf_counter() - start)
+                    outcomes.append('created' if response.status_code == 201 else 'failed')
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=student, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        start_line.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        return {
+            'sent': len(outcomes),
+            'created': outcomes.count('created'),
+            'locked': outcomes.count('locked'),
+            'failed': outcomes.count('failed'),
+            'elapsed': elapsed,
+            'p50': statistics.median(latencies) * 1000 if latencies else 0,
+            'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else 0,
+        }
+
+    def create_rows(self, count):
+        department = Departments.objects.create(name='Deadline benchmark')
+        course = Courses.objects.create(course_code='BURST', course_name='Deadline benchmark', department_id=department)
+        assignment = Assignments.objects.create(course_id=course, title='Deadline', due_date=timezone.now())
+        users = User.objects.bulk_create(
+            User(username=f'burst-{index}', email=f'burst-{index}@example.com', role='student')
+            for index in range(count)
+        )
+        Student.objects.bulk_create(Student(user=user) for user in users)
+        return assignment, users
@@ -0,0 +1,101 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from app.bench import best_of, format_table
+from app.compiled import compile_serializer
+from custom.models import User
+from lecture.api.serializers import AssignmentSerializer
+from resources.api.serializers import ResourceSerializer
+from resources.models import AssignmentSubmissions, Assignments, Courses, Departments, resources
+from student.api.serializers import AssignmentSubmissionSerializer
+from student.models import Student
+
+# (label, model, serializer)
+SERIALIZERS = [
+    ('resources', resources, ResourceSerializer),
+    ('assignments', Assignments, AssignmentSerializer),
+    ('submissions', AssignmentSubmissions, AssignmentSubmissionSerializer),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time rendering list payloads with the DRF serializers against their "
+        "compiled .values() form, and check both produce the same JSON bytes. "
+        "Rows are created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[10_000, 100_000],
+            help='Row counts to benchmark (default: 10000 100000).',
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case; the best is reported.')
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/')
+        renderer = JSONRenderer()
+        results = []
+        for count in options['rows']:
+            with transaction.atomic():
+                self.create_rows(count)
+                for label, model, serializer_class in SERIALIZERS:
+                    queryset = model.objects.order_by('pk')
+                    compiled = compile_serializer(serializer_class)
+
+                    def drf():
+                        serializer = serializer_class(list(queryset), many=True, context={'request': request})
+                        return renderer.render(serializer.data)
+
+                    def fast():
+                        return renderer.render(compiled.render(queryset.values(*compiled.columns), request))
+
+                    drf_time, expected = best_of(drf, options['repeat'])
+                    fast_time, actual = best_of(fast, options['repeat'])
+                    if actual != expected:
+                        raise CommandError(f"Compiled output for {label} differs from {serializer_class.__name__}.")
+                    results.append([
+                        count, label, f'{drf_time:.3f}', f'{fast_time:.3f}', f'{drf_time / fast_time:.1f}x',
+                    ])
+                transaction.set_rollback(True)
+
+        self.stdout.write(format_table(['rows', 'serializer', 'drf (s)', 'compiled (s)', 'speedup'], results))
+
+    def create_rows(self, count):
+        now = timezone.now()
+        lecturer = User.objects.create(username='bench-lecturer', email='bench-lecturer@example.com', role='lecture')
+        student = Student.objects.create(
+            user=User.objects.create(username='bench-student', email='bench-student@example.com', role='student'))
+        department = Departments.objects.create(name='Benchmark')
+        course = Courses.objects.create(course_code='BENCH', course_name='Benchmark', department_id=department)
+        Assignments.objects.bulk_create(
+            Assignments(
+                course_id=course, title=f'Assignment {index}', description='Read chapter one.',
+                due_date=now, created_by=lecturer,
+            )
+            for index in range(count)
+        )
+        assignment = Assignments.objects.filter(course_id=course).first()
+        # Every other row has a file, so both URL building and NULLs are timed.
+        resources.objects.bulk_create(
+            resources(
+                course_id=course, assignment=assignment, resource_type='document', uploaded_by=lecturer,
+                resource_file=f'blobs/00/00/{index:064x}.pdf' if index % 2 else None,
+                file_name=f'notes-{index}.pdf', file_size=index, description='Lecture notes',
+            )
+            for index in range(count)
+        )
+        AssignmentSubmissions.objects.bulk_create(
+            AssignmentSubmissions(
+                assignment=assignment, student=student, attempt_number=index + 1, score=index % 100,
+                submission_file=f'blobs/00/00/{index:064x}.zip' if index % 2 else None,
+                file_name=f'answer-{index}.zip',
+            )
+            for index in range(count)
+        )
@@ -0,0 +1,108 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.viewsets import ViewSetMixin
+
+from custom.api.views import UserListView
+from custom.models import User
+from lecture.api.views import AssignmentListCreateView, AssignmentSubmissionListView
+from resources.api.views import ResourceListCreateView
+from student.api.views import StudentAssignmentSubmissionListCreateView, StudentResourceListView
+
+# (label, view class, role of the requesting user)
+LIST_QUERIES = [
+    ('resources', ResourceListCreateView, 'lecture'),
+    ('student resources', StudentResourceListView, 'student'),
+    ('student submissions', StudentAssignmentSubmissionListCreateView, 'student'),
+    ('lecturer assignments', AssignmentListCreateView, 'lecture'),
+    ('lecturer submissions', AssignmentSubmissionListView, 'lecture'),
+    ('users', UserListView, 'lecture'),
+]
+
+SQLITE_PLAN_LINE = re.compile(r'^\d+ \d+ \d+ (.*)$')
+
+
+def sqlite_problems(plan, filtered):
+    """Full table scans in an SQLite plan. A bare SCAN is accepted for an unfiltered rowid-ordered list."""
+    problems = []
+    for line in plan.splitlines():
+        match = SQLITE_PLAN_LINE.match(line.strip())
+        detail = match.group(1) if match else line.strip()
+        if detail.startswith('SCAN ') and 'USING' not in detail and filtered:
+            problems.append(detail)
+    return problems
+
+
+def postgresql_problems(plan, filtered):
+    return [line.strip() for line in plan.splitlines() if 'Seq Scan' in line]
+
+
+PLAN_CHECKS = {
+    'sqlite': sqlite_problems,
+    'postgresql': postgresql_problems,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the list endpoint queries (first page and a cursor page, as "
+        "built by each view's filters and paginator) and the login lookup, "
+        "and fail if any of them needs a full table scan."
+    )
+
+    def handle(self, *args, **options):
+        check = PLAN_CHECKS.get(connection.vendor)
+        if check is None:
+            raise CommandError(f"Query plan checks are not implemented for {connection.vendor}.")
+
+        failures = 0
+        for label, queryset in self.queries():
+            plan = self.explain(queryset)
+            problems = check(plan, bool(queryset.query.where))
+            failures += bool(problems)
+            status = self.style.ERROR('FULL SCAN') if problems else self.style.SUCCESS('index')
+            self.stdout.write(f"{label}: {status}")
+            if problems or options['verbosity'] > 1:
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+        if failures:
+            raise CommandError(f"{failures} queries do not use an index.")
+
+    def explain(self, queryset):
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Small tables are cheaper to scan; ask whether an index *can* be used.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+
+    def queries(self):
+        yield 'login (email)', User.objects.by_email('someone@example.com')
+
+        factory = APIRequestFactory()
+        for label, view_class, role in LIST_QUERIES:
+            user = User(pk=1, username='query-plan-check', role=role)
+            view, queryset = self.page_queryset(factory, view_class, user, {})
+            yield f'{label} (first page)', queryset
+
+            rows = list(queryset[:1])
+            if rows:
+                paginator = view.paginator
+                cursor = paginator.encode_position(paginator.position_of(rows[0]), reverse=False)
+                _, queryset = self.page_queryset(factory, view_class, user, {paginator.cursor_query_param: cursor})
+                yield f'{label} (cursor page)', queryset
+
+    def page_queryset(self, factory, view_class, user, params):
+        request = factory.get('/', params)
+        force_authenticate(request, user=user)
+        initkwargs = {'action_map': {'get': 'list'}} if issubclass(view_class, ViewSetMixin) else {}
+        view = view_class(**initkwargs)
+        view.setup(request)
+        view.request = view.initialize_request(request)
+        view.format_kwarg = None
+        paginator = view.paginator
+        paginator.page_size = paginator.get_page_size(view.request)
+        queryset = paginator.get_page_queryset(view.filter_queryset(view.get_queryset()), view.request, view)
+        return view, queryset
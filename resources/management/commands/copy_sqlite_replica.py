@@ -0,0 +1,30 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from app.replicas import REPLICA_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database over the replica's file. Stands in "
+        "for replication when DATABASE_URL and DATABASE_REPLICA_URL name two "
+        "SQLite files: rows written since the last copy exist only on the "
+        "primary, as on a lagging replica."
+    )
+
+    def handle(self, *args, **options):
+        if REPLICA_DB_ALIAS not in connections:
+            raise CommandError("No replica database is configured (set DATABASE_REPLICA_URL).")
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections[REPLICA_DB_ALIAS]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError("Both databases must be SQLite; other replicas are kept up to date by the server.")
+        primary.ensure_connection()
+        replica.close()
+        target = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+        self.stdout.write(f"Copied {primary.settings_dict['NAME']} to {replica.settings_dict['NAME']}")
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.streaming import CSVStreamRenderer, NDJSONRenderer, stream_batches
+from resources.gradebook import Gradebook
+from resources.models import CourseGroup, Courses
+
+RENDERERS = {
+    'csv': CSVStreamRenderer,
+    'ndjson': NDJSONRenderer,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the students x assignments score matrix of a course or course "
+        "group (latest attempt per cell) as CSV or NDJSON."
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--course', help='Course code.')
+        target.add_argument('--group', type=int, help='Course group id.')
+        parser.add_argument('--format', choices=sorted(RENDERERS), default='csv')
+        parser.add_argument('--output', help='File to write (default: standard output).')
+
+    def handle(self, *args, **options):
+        if options['group'] is not None:
+            try:
+                gradebook = Gradebook.for_group(CourseGroup.objects.get(pk=options['group']))
+            except CourseGroup.DoesNotExist:
+                raise CommandError(f"Course group {options['group']} does not exist.")
+        else:
+            try:
+                gradebook = Gradebook.for_course(Courses.objects.get(pk=options['course']))
+            except Courses.DoesNotExist:
+                raise CommandError(f"Course {options['course']} does not exist.")
+
+        renderer = RENDERERS[options['format']]()
+        chunks = stream_batches(renderer, gradebook.batches(options['format']))
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode('utf-8'), ending='')
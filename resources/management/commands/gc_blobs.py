@@ -0,0 +1,91 @@
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from resources.models import StoredBlob
+from resources.signals import BLOB_FILE_FIELDS
+from resources.storage import BLOB_PREFIX, content_addressed_storage, is_blob_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount references to content-addressed blobs and delete blobs that "
+        "are no longer referenced by any resource or submission."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without touching the database or storage.',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=3600,
+            help='Only delete orphaned files older than this many seconds (uploads in flight are younger).',
+        )
+
+    def handle(self, *args, dry_run=False, min_age=3600, **options):
+        references = Counter()
+        for model, field_name in BLOB_FILE_FIELDS.items():
+            names = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            references.update(name for name in names.values_list(field_name, flat=True) if is_blob_name(name))
+
+        known = {blob.name: blob for blob in StoredBlob.objects.all()}
+        changed, missing, unreferenced = [], [], []
+        for name, count in references.items():
+            blob = known.get(name)
+            if blob is None:
+                missing.append(name)
+            elif blob.ref_count != count:
+                blob.ref_count = count
+                changed.append(blob)
+        unreferenced = [name for name in known if name not in references]
+        cutoff = timezone.now() - timedelta(seconds=min_age)
+        orphans = [
+            name for name in self._stored_blobs()
+            if name not in references and name not in known
+            and content_addressed_storage.get_modified_time(name) < cutoff
+        ]
+
+        self.stdout.write(
+            f"{len(changed)} ref counts corrected, {len(missing)} blob rows missing, "
+            f"{len(unreferenced)} unreferenced blobs, {len(orphans)} orphaned files"
+        )
+        if dry_run:
+            return
+
+        with transaction.atomic():
+            StoredBlob.objects.bulk_update(changed, ['ref_count'], batch_size=500)
+            StoredBlob.objects.bulk_create(
+                [
+                    StoredBlob(
+                        name=name,
+                        sha256=os.path.splitext(os.path.basename(name))[0],
+                        size=content_addressed_storage.size(name),
+                        ref_count=references[name],
+                    )
+                    for name in missing
+                    if content_addressed_storage.exists(name)
+                ],
+                batch_size=500,
+            )
+            StoredBlob.objects.filter(name__in=unreferenced).delete()
+        for name in unreferenced + orphans:
+            content_addressed_storage.delete(name)
+
+    def _stored_blobs(self, path=BLOB_PREFIX):
+        try:
+            directories, files = content_addressed_storage.listdir(path)
+        except FileNotFoundError:
+            return
+        for filename in files:
+            if not filename.endswith('.part'):
+                yield f'{path}/{filename}'
+        for directory in directories:
+            yield from self._stored_blobs(f'{path}/{directory}')
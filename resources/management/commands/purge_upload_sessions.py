@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from resources.models import UploadSession
+from resources.uploads import discard
+
+
+class Command(BaseCommand):
+    help = "Delete unfinished resumable uploads (and their chunks) older than --hours."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=48)
+
+    def handle(self, *args, hours=48, **options):
+        cutoff = timezone.now() - timedelta(hours=hours)
+        stale = UploadSession.objects.filter(completed_at__isnull=True, created_at__lt=cutoff)
+        count = 0
+        for session in stale.iterator():
+            discard(session)
+            session.delete()
+            count += 1
+        self.stdout.write(f"Purged {count} upload sessions")
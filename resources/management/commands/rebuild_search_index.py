@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from resources.models import SearchDocument
+from resources.search import SEARCH_MODELS, index_queryset
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text search documents of every resource, "
+        "assignment and submission."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Only index rows that have no search document yet (cheap enough to run on every deploy).',
+        )
+
+    def handle(self, *args, missing=False, **options):
+        for model, (kind, _, _) in SEARCH_MODELS.items():
+            queryset = model.objects.all()
+            documents = SearchDocument.objects.filter(kind=kind)
+            if missing:
+                queryset = queryset.exclude(pk__in=documents.values('object_id'))
+            with transaction.atomic():
+                if not missing:
+                    documents.exclude(object_id__in=model.objects.values('pk')).delete()
+                count = queryset.count()
+                index_queryset(queryset)
+            self.stdout.write(f"{kind}: {count} documents indexed")
+
+        if not missing and connection.vendor == 'sqlite':
+            # Merge the FTS5 b-trees written by incremental updates.
+            with connection.cursor() as cursor:
+                table = f'{SearchDocument._meta.db_table}_fts'
+                cursor.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from resources.counters import drifted, recount
+from resources.models import Assignments
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the submission counters of every assignment (submissions, "
+        "distinct submitters, graded, latest submission) from the submissions table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many assignments have counters that are off.',
+        )
+
+    def handle(self, *args, dry_run=False, **options):
+        with transaction.atomic():
+            stale = drifted(Assignments.objects.all())
+            if not dry_run:
+                recount(Assignments.objects.filter(pk__in=stale))
+        self.stdout.write(f"{len(stale)} assignments had wrong counters" + ("" if dry_run else " and were recounted"))
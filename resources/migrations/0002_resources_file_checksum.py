@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="resources",
+            name="file_checksum",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
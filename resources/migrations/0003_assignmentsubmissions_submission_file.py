@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0002_resources_file_checksum"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="assignmentsubmissions",
+            name="submission_file",
+            field=models.FileField(blank=True, null=True, upload_to="submissions/"),
+        ),
+    ]
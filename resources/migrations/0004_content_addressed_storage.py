@@ -0,0 +1,49 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:36
+
+import resources.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0003_assignmentsubmissions_submission_file"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StoredBlob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("sha256", models.CharField(max_length=64)),
+                ("size", models.PositiveBigIntegerField(default=0)),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name_plural": "Stored Blobs",
+                "ordering": ["created_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="assignmentsubmissions",
+            name="file_name",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="resources",
+            name="file_name",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name="assignmentsubmissions",
+            name="submission_file",
+            field=models.FileField(blank=True, null=True, storage=resources.storage.get_content_addressed_storage, upload_to="submissions/"),
+        ),
+        migrations.AlterField(
+            model_name="resources",
+            name="resource_file",
+            field=models.FileField(blank=True, null=True, storage=resources.storage.get_content_addressed_storage, upload_to="resources/"),
+        ),
+    ]
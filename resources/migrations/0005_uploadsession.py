@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:38
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0004_content_addressed_storage"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UploadSession",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("filename", models.CharField(max_length=255)),
+                ("total_size", models.PositiveBigIntegerField()),
+                ("chunk_size", models.PositiveIntegerField()),
+                ("sha256", models.CharField(blank=True, max_length=64, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                ("resource", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="+", to="resources.resources")),
+                ("uploaded_by", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="upload_sessions", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "verbose_name_plural": "Upload Sessions",
+                "ordering": ["created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0006_upload_metadata"),
+        ("student", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="assignments",
+            index=models.Index(
+                fields=["created_by", "due_date", "id"], name="assignment_owner_due_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="assignmentsubmissions",
+            index=models.Index(
+                fields=["assignment", "student", "attempt_number"],
+                name="submission_attempt_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="assignmentsubmissions",
+            index=models.Index(
+                fields=["student", "submission_date", "id"],
+                name="submission_student_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="resources",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["uploaded_at", "id"],
+                name="resource_active_uploaded_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="assignmentsubmissions",
+            constraint=models.CheckConstraint(
+                condition=models.Q(("attempt_number__gte", 1)),
+                name="submission_attempt_number_gte_1",
+            ),
+        ),
+    ]
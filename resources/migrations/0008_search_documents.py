@@ -0,0 +1,131 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:48
+
+from django.db import migrations, models
+
+SQLITE_FORWARD = [
+    # External-content FTS5 index over resources_searchdocument; title ranks
+    # ten times higher than body.
+    """
+    CREATE VIRTUAL TABLE resources_searchdocument_fts USING fts5(
+        title, body,
+        content='resources_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO resources_searchdocument_fts(resources_searchdocument_fts, rank)
+    VALUES ('rank', 'bm25(10.0, 1.0)')
+    """,
+    """
+    CREATE TRIGGER resources_searchdocument_ai AFTER INSERT ON resources_searchdocument BEGIN
+        INSERT INTO resources_searchdocument_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER resources_searchdocument_ad AFTER DELETE ON resources_searchdocument BEGIN
+        INSERT INTO resources_searchdocument_fts(resources_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER resources_searchdocument_au AFTER UPDATE ON resources_searchdocument BEGIN
+        INSERT INTO resources_searchdocument_fts(resources_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO resources_searchdocument_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS resources_searchdocument_au",
+    "DROP TRIGGER IF EXISTS resources_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS resources_searchdocument_ai",
+    "DROP TABLE IF EXISTS resources_searchdocument_fts",
+]
+
+POSTGRESQL_FORWARD = [
+    """
+    ALTER TABLE resources_searchdocument ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A')
+        || setweight(to_tsvector('simple'::regconfig, coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX resources_searchdocument_vector_idx
+    ON resources_searchdocument USING gin (search_vector)
+    """,
+]
+
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX IF EXISTS resources_searchdocument_vector_idx",
+    "ALTER TABLE resources_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+STATEMENTS = {
+    "sqlite": (SQLITE_FORWARD, SQLITE_BACKWARD),
+    "postgresql": (POSTGRESQL_FORWARD, POSTGRESQL_BACKWARD),
+}
+
+
+def create_search_index(apps, schema_editor):
+    forward, _ = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for statement in forward:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    _, backward = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for statement in backward:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0007_query_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("resource", "Resource"),
+                            ("assignment", "Assignment"),
+                            ("submission", "Submission"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField()),
+                ("title", models.TextField(blank=True, default="")),
+                ("body", models.TextField(blank=True, default="")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "Search Documents",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("kind", "object_id"),
+                        name="searchdocument_kind_object_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0008_search_documents"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="assignmentsubmissions",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="resources",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 21:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0009_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="assignments",
+            index=models.Index(fields=["due_date", "id"], name="assignment_due_idx"),
+        ),
+    ]
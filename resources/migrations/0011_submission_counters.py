@@ -0,0 +1,54 @@
+# Generated by Django 5.2.1 on 2026-10-18 21:16
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_submissions(apps, schema_editor):
+    Assignments = apps.get_model('resources', 'Assignments')
+    AssignmentSubmissions = apps.get_model('resources', 'AssignmentSubmissions')
+
+    def aggregate(expression):
+        return Subquery(
+            AssignmentSubmissions.objects.filter(assignment=OuterRef('pk'))
+            .order_by().values('assignment').annotate(value=expression).values('value')
+        )
+
+    Assignments.objects.update(
+        submission_count=Coalesce(aggregate(Count('pk')), 0),
+        submitter_count=Coalesce(aggregate(Count('student', distinct=True)), 0),
+        graded_count=Coalesce(aggregate(Count('pk', filter=Q(is_graded=True))), 0),
+        last_submission_at=aggregate(Max('submission_date')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0010_assignment_due_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="assignments",
+            name="graded_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="assignments",
+            name="last_submission_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="assignments",
+            name="submission_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="assignments",
+            name="submitter_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_submissions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-18 22:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0011_submission_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchIndex",
+            fields=[
+                (
+                    "document",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="+",
+                        related_query_name="index",
+                        serialize=False,
+                        to="resources.searchdocument",
+                    ),
+                ),
+                ("match", models.TextField(db_column="resources_searchdocument_fts")),
+                ("rank", models.FloatField()),
+            ],
+            options={
+                "db_table": "resources_searchdocument_fts",
+                "managed": False,
+            },
+        ),
+    ]
@@ -1,8 +1,21 @@
+import hashlib
+import uuid
+
 from django.db import models
+from django.utils import timezone
+from app.dirty import DirtyFieldsMixin
 from student.models import Student
+from .storage import get_content_addressed_storage
 
 # Create your models here.
 
+def file_sha256(field_file):
+    digest = hashlib.sha256()
+    with field_file.storage.open(field_file.name, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 class Departments(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100, unique=True)
@@ -48,7 +61,7 @@ class CourseGroup(models.Model):
         verbose_name_plural = "Course Groups"
         ordering = ['group_name']
 
-class Assignments(models.Model):
+class Assignments(DirtyFieldsMixin, models.Model):
     id = models.AutoField(primary_key=True)
     group_id = models.ForeignKey(CourseGroup, max_length=50, blank=True, null=True, on_delete=models.CASCADE)
     course_id= models.ForeignKey(Courses, on_delete=models.CASCADE, related_name='assignments')
@@ -62,48 +75,239 @@ class Assignments(models.Model):
     updated_by = models.ForeignKey('custom.User', on_delete=models.CASCADE, related_name='assignments_updated', blank=True, null=True)
     is_active = models.BooleanField(default=True)
     max_score = models.PositiveIntegerField(default=100)
+    # Maintained by resources.counters; never written by save().
+    submission_count = models.PositiveIntegerField(default=0, editable=False)
+    submitter_count = models.PositiveIntegerField(default=0, editable=False)
+    graded_count = models.PositiveIntegerField(default=0, editable=False)
+    last_submission_at = models.DateTimeField(blank=True, null=True, editable=False)
+
+    COUNTER_FIELDS = ('submission_count', 'submitter_count', 'graded_count', 'last_submission_at')
 
     def __str__(self):
-        return f"{self.title} - {self.course.course_name}"
+        return f"{self.title} - {self.course_id.course_name}"
+
+    def get_update_fields(self):
+        # An instance read before a concurrent submission holds stale counts;
+        # saving it must not write them back.
+        update_fields = super().get_update_fields()
+        if update_fields is None and self.pk is not None:
+            update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+        return None if update_fields is None else [name for name in update_fields if name not in self.COUNTER_FIELDS]
 
     class Meta:
         verbose_name_plural = "Assignments"
         ordering = ['due_date']
+        indexes = [
+            # A lecturer's assignment list: created_by = ? ORDER BY due_date, id
+            models.Index(fields=['created_by', 'due_date', 'id'], name='assignment_owner_due_idx'),
+            # Upcoming assignments on the student dashboard: due_date >= now ORDER BY due_date, id
+            models.Index(fields=['due_date', 'id'], name='assignment_due_idx'),
+        ]
 
-class AssignmentSubmissions(models.Model):
+class AssignmentSubmissions(DirtyFieldsMixin, models.Model):
     id = models.AutoField(primary_key=True)
     assignment = models.ForeignKey(Assignments, on_delete=models.CASCADE, related_name='submissions')
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='submissions')
     submission_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     score = models.PositiveIntegerField(default=0)
     feedback = models.TextField(blank=True, null=True)
     is_graded = models.BooleanField(default=False)
     attempt_number = models.PositiveIntegerField(default=1)
+    submission_file = models.FileField(upload_to='submissions/', storage=get_content_addressed_storage, blank=True, null=True)
+    file_name = models.CharField(max_length=255, blank=True, null=True)
+    file_size = models.PositiveBigIntegerField(blank=True, null=True)
+    content_type = models.CharField(max_length=100, blank=True, null=True)
     file_checksum = models.CharField(max_length=64, blank=True, null=True)
 
     def __str__(self):
         return f"{self.assignment.title} - {self.student.user.username}"
 
+    def ensure_file_checksum(self):
+        """Return the SHA-256 of submission_file, computing and storing it once if missing."""
+        if self.file_checksum or not self.submission_file:
+            return self.file_checksum
+        self.file_checksum = file_sha256(self.submission_file)
+        AssignmentSubmissions.objects.filter(pk=self.pk).update(
+            file_checksum=self.file_checksum, updated_at=timezone.now())
+        return self.file_checksum
+
     class Meta:
         verbose_name_plural = "Assignment Submissions"
         ordering = ['submission_date']
+        indexes = [
+            # Attempts of one student on one assignment, and the lecturer's
+            # submission list joined through assignment.
+            models.Index(fields=['assignment', 'student', 'attempt_number'], name='submission_attempt_idx'),
+            # A student's submission list: student = ? ORDER BY submission_date, id
+            models.Index(fields=['student', 'submission_date', 'id'], name='submission_student_date_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(attempt_number__gte=1), name='submission_attempt_number_gte_1'),
+        ]
 
-class resources(models.Model):
+class resources(DirtyFieldsMixin, models.Model):
     id = models.AutoField(primary_key=True)
     group_id = models.ForeignKey(CourseGroup, max_length=50, blank=True, null=True, on_delete=models.CASCADE)
     course_id = models.ForeignKey(Courses, on_delete=models.CASCADE, related_name='resources')
     assignment = models.ForeignKey(Assignments, on_delete=models.CASCADE, related_name='resources')
     resource_type = models.CharField(max_length=50)  # e.g., 'document', 'video', 'link'
     resource_url = models.URLField(max_length=200, blank=True, null=True)
-    resource_file = models.FileField(upload_to='resources/', blank=True, null=True)
+    resource_file = models.FileField(upload_to='resources/', storage=get_content_addressed_storage, blank=True, null=True)
+    file_name = models.CharField(max_length=255, blank=True, null=True)
+    file_size = models.PositiveBigIntegerField(blank=True, null=True)
+    content_type = models.CharField(max_length=100, blank=True, null=True)
     uploaded_by = models.ForeignKey('custom.User', on_delete=models.CASCADE, related_name='resources_uploaded', blank=True, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    file_checksum = models.CharField(max_length=64, blank=True, null=True)
 
     def __str__(self):
         return f"{self.resource_type} - {self.course_id.course_name} - {self.assignment.title}"
+
+    def ensure_file_checksum(self):
+        """Return the SHA-256 of resource_file, computing and storing it once if missing."""
+        if self.file_checksum or not self.resource_file:
+            return self.file_checksum
+        self.file_checksum = file_sha256(self.resource_file)
+        resources.objects.filter(pk=self.pk).update(
+            file_checksum=self.file_checksum, updated_at=timezone.now())
+        return self.file_checksum
+
     class Meta:
         verbose_name_plural = "Resources"
         ordering = ['uploaded_at']
+        indexes = [
+            # Resource lists only ever show active rows: is_active ORDER BY uploaded_at, id
+            models.Index(
+                fields=['uploaded_at', 'id'],
+                condition=models.Q(is_active=True),
+                name='resource_active_uploaded_idx',
+            ),
+        ]
+
 
+class StoredBlob(models.Model):
+    """
+    A file in content-addressed storage, shared by every resource and
+    submission row whose file has the same SHA-256. The blob is deleted from
+    storage when ref_count drops to zero (see resources.signals).
+    """
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+    class Meta:
+        verbose_name_plural = "Stored Blobs"
+        ordering = ['created_at']
+
+
+class UploadSession(models.Model):
+    """
+    Server-side state of a resumable chunked upload. Received chunks live on
+    disk under CHUNKED_UPLOAD_DIR (see resources.uploads) until finalize
+    assembles them into a resources row.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploaded_by = models.ForeignKey('custom.User', on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True, null=True)
+    resource = models.ForeignKey(resources, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.total_size} bytes)"
+
+    @property
+    def total_chunks(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+
+    def expected_chunk_length(self, index):
+        if index == self.total_chunks - 1:
+            return self.total_size - index * self.chunk_size
+        return self.chunk_size
+
+    class Meta:
+        verbose_name_plural = "Upload Sessions"
+        ordering = ['created_at']
+
+
+class DocumentRelation(models.ForeignObject):
+    """
+    Joins a SearchDocument to the row it describes through ``object_id``, so
+    a search can join the two (resources.search). Like a GenericRelation it
+    is private: no column, no migration, and no reverse accessor; filter
+    the reverse side on ``search_document__kind`` too.
+    """
+
+    def __init__(self, to):
+        super().__init__(
+            to, models.DO_NOTHING, from_fields=['object_id'], to_fields=['id'],
+            related_name='+', related_query_name='search_document',
+        )
+
+    def contribute_to_class(self, cls, name, **kwargs):
+        kwargs['private_only'] = True
+        super().contribute_to_class(cls, name, **kwargs)
+
+
+class SearchDocument(models.Model):
+    """
+    The searchable text of one resource, assignment or submission, kept in
+    sync by resources.signals. Migration 0008 indexes it with an FTS5 table
+    and triggers on SQLite, or a generated tsvector column with a GIN index
+    on PostgreSQL (see resources.search). Altering this table on SQLite
+    rebuilds it and drops those triggers; recreate them in the same migration.
+    """
+    KIND_CHOICES = (
+        ('resource', 'Resource'),
+        ('assignment', 'Assignment'),
+        ('submission', 'Submission'),
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    title = models.TextField(blank=True, default='')
+    body = models.TextField(blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    resource = DocumentRelation(resources)
+    assignment = DocumentRelation(Assignments)
+    submission = DocumentRelation(AssignmentSubmissions)
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
+
+    class Meta:
+        verbose_name_plural = "Search Documents"
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='searchdocument_kind_object_uniq'),
+        ]
+
+
+class SearchIndex(models.Model):
+    """
+    The FTS5 table indexing SearchDocument on SQLite, created and kept in
+    sync by migration 0008. Read-only, and missing on other databases.
+    """
+    document = models.OneToOneField(
+        SearchDocument, models.DO_NOTHING, primary_key=True, db_column='rowid',
+        related_name='+', related_query_name='index',
+    )
+    # FTS5's hidden column named after the table, the left side of MATCH.
+    text = models.TextField(db_column='resources_searchdocument_fts')
+    # bm25 of the row against the MATCH query, lower being better.
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'resources_searchdocument_fts'
@@ -0,0 +1,184 @@
+"""
+Full-text search over resources, assignments and submissions.
+
+Every searchable row has a ``SearchDocument`` holding its searchable text
+(``title`` is weighted above ``body``). The documents are kept current by
+``resources.signals`` and indexed by the database:
+
+* SQLite: an FTS5 external-content table ``resources_searchdocument_fts``
+  (the unmanaged ``SearchIndex`` model) kept in sync by triggers, ranked
+  with bm25.
+* PostgreSQL: a generated ``search_vector`` tsvector column with a GIN
+  index, ranked with ts_rank.
+
+Both are created in migration 0008. Other databases fall back to
+``icontains`` over the documents, unranked.
+
+``search(queryset, text)`` narrows ``queryset`` to the rows that match and
+annotates each with ``search_rank``, lower being better. Queries are turned
+into prefix matches of every word, so results appear while the user is
+still typing.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Lookup, OuterRef, Q, Subquery, Value
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import AssignmentSubmissions, Assignments, SearchDocument, SearchIndex, resources
+
+MAX_TERMS = 10
+
+WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def _join(*parts):
+    return ' '.join(str(part) for part in parts if part)
+
+
+def resource_document(resource):
+    return (
+        _join(resource.assignment.title, resource.file_name),
+        _join(
+            resource.resource_type,
+            resource.course_id.course_name,
+            resource.course_id.course_code,
+            resource.description,
+        ),
+    )
+
+
+def assignment_document(assignment):
+    return (
+        assignment.title,
+        _join(assignment.course_id.course_name, assignment.course_id.course_code, assignment.description),
+    )
+
+
+def submission_document(submission):
+    user = submission.student.user
+    return (
+        submission.assignment.title,
+        _join(user.username, user.full_name, submission.file_name),
+    )
+
+
+# model: (SearchDocument.kind, select_related needed by the builder, builder)
+SEARCH_MODELS = {
+    resources: ('resource', ('assignment', 'course_id'), resource_document),
+    Assignments: ('assignment', ('course_id',), assignment_document),
+    AssignmentSubmissions: ('submission', ('assignment', 'student__user'), submission_document),
+}
+
+
+def index_queryset(queryset, batch_size=500):
+    """Create or refresh the search documents for every row of ``queryset``."""
+    kind, related, build = SEARCH_MODELS[queryset.model]
+    now = timezone.now()
+    documents = []
+    for instance in queryset.select_related(*related).order_by().iterator(chunk_size=batch_size):
+        title, body = build(instance)
+        documents.append(SearchDocument(kind=kind, object_id=instance.pk, title=title, body=body, updated_at=now))
+        if len(documents) >= batch_size:
+            _upsert(documents)
+            documents = []
+    if documents:
+        _upsert(documents)
+
+
+def _upsert(documents):
+    SearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['kind', 'object_id'],
+        update_fields=['title', 'body', 'updated_at'],
+    )
+
+
+def index_instance(instance):
+    index_queryset(type(instance).objects.filter(pk=instance.pk))
+
+
+def remove_instance(instance):
+    kind = SEARCH_MODELS[type(instance)][0]
+    SearchDocument.objects.filter(kind=kind, object_id=instance.pk).delete()
+
+
+def search_terms(text):
+    return [word.lower() for word in WORD.findall(text or '')][:MAX_TERMS]
+
+
+class Match(Lookup):
+    """``SearchIndex.text`` against an FTS5 query; SQLite only."""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+SearchIndex._meta.get_field('text').register_lookup(Match)
+
+
+class SQLiteSearchBackend:
+    def query(self, terms):
+        # Quoted terms can't be read as FTS5 operators; * makes each a prefix match.
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def search(self, queryset, kind, query):
+        # Joined rather than looked up per row: bm25 reads the statistics of
+        # every match each time the index is queried.
+        return queryset.filter(
+            search_document__kind=kind, search_document__index__text__match=query,
+        ).annotate(search_rank=F('search_document__index__rank'))
+
+
+class PostgreSQLSearchBackend:
+    def query(self, terms):
+        return ' & '.join(f'{term}:*' for term in terms)
+
+    def search(self, queryset, kind, query):
+        documents = SearchDocument.objects.filter(kind=kind)
+        matches = documents.filter(
+            RawSQL("search_vector @@ to_tsquery('simple', %s)", [query], output_field=BooleanField()),
+        )
+        # Negated so that, as on SQLite, lower is better.
+        rank = documents.filter(object_id=OuterRef('pk')).annotate(
+            rank=RawSQL("-ts_rank(search_vector, to_tsquery('simple', %s))", [query], output_field=FloatField()),
+        )
+        return queryset.filter(pk__in=matches.values('object_id')).annotate(
+            search_rank=Subquery(rank.values('rank')),
+        )
+
+
+SEARCH_BACKENDS = {
+    'sqlite': SQLiteSearchBackend(),
+    'postgresql': PostgreSQLSearchBackend(),
+}
+
+
+def search(queryset, text):
+    """
+    ``queryset`` narrowed to the rows whose document matches ``text`` and
+    annotated with ``search_rank`` (lower is better), or None when ``text``
+    has no searchable words.
+
+    The full-text index is searched once per query, so ordering by
+    ``search_rank`` paginates through every match.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return None
+    kind = SEARCH_MODELS[queryset.model][0]
+    backend = SEARCH_BACKENDS.get(connections[queryset.db].vendor)
+
+    if backend is None:
+        condition = Q()
+        for term in terms:
+            condition &= Q(title__icontains=term) | Q(body__icontains=term)
+        matches = SearchDocument.objects.filter(condition, kind=kind).values('object_id')
+        return queryset.filter(pk__in=matches).annotate(search_rank=Value(0.0, output_field=FloatField()))
+    return backend.search(queryset, kind, backend.query(terms))
@@ -0,0 +1,211 @@
+import os
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import DEFERRED, F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from app.caching import bump_generation
+from custom.models import User
+from . import analytics, counters, search
+from .models import AssignmentSubmissions, Assignments, CourseGroup, Courses, StoredBlob, resources
+from .storage import blob_name, content_addressed_storage, content_sha256, is_blob_name
+from .uploadhandlers import SNIFF_LENGTH, sniff_content_type
+
+# Models whose file lives in content-addressed storage, and the field holding it.
+BLOB_FILE_FIELDS = {
+    resources: 'resource_file',
+    AssignmentSubmissions: 'submission_file',
+}
+
+
+def acquire_blob(name, sha256, size):
+    """Add one reference to the blob stored under ``name``."""
+    if StoredBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            StoredBlob.objects.create(name=name, sha256=sha256, size=size, ref_count=1)
+    except IntegrityError:
+        # Another upload of the same content created the row first.
+        StoredBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+
+def release_blob(name):
+    """Drop one reference to ``name``; delete the blob when none remain."""
+    blobs = StoredBlob.objects.filter(name=name)
+    while blobs.exists():
+        if blobs.filter(ref_count__gt=1).update(ref_count=F('ref_count') - 1):
+            return
+        if blobs.filter(ref_count__lte=1).delete()[0]:
+            transaction.on_commit(lambda: collect_blob(name))
+            return
+
+
+def collect_blob(name):
+    """Delete ``name`` from storage unless it has been referenced again."""
+    try:
+        with transaction.atomic():
+            # Claim the name with a placeholder row until the file is gone. It
+            # conflicts with any acquire_blob() in flight, committed or not,
+            # and an upload acquiring the blob meanwhile waits for this
+            # transaction, then finds the file missing and writes it again.
+            claim = StoredBlob.objects.create(name=name, sha256='', ref_count=0)
+            content_addressed_storage.delete(name)
+            claim.delete()
+    except IntegrityError:
+        pass
+
+
+def _sniff(upload, filename):
+    upload.seek(0)
+    head = upload.read(SNIFF_LENGTH)
+    upload.seek(0)
+    return sniff_content_type(head, filename)
+
+
+@receiver(pre_save, sender=resources)
+@receiver(pre_save, sender=AssignmentSubmissions)
+def track_blob_file(sender, instance, **kwargs):
+    field_name = BLOB_FILE_FIELDS[sender]
+    field_file = getattr(instance, field_name)
+
+    instance._previous_blob_name = None
+    instance._acquired_blob_name = None
+    if not instance._state.adding:
+        previous = instance.get_loaded_value(field_name)
+        if previous is DEFERRED:
+            previous = sender.objects.filter(pk=instance.pk).values_list(field_name, flat=True).first()
+        instance._previous_blob_name = previous
+
+    if field_file and not field_file._committed:
+        # A new upload. StreamingChecksumUploadHandler has usually computed
+        # the digest and content type already; otherwise do it once here and
+        # let the storage reuse the digest.
+        upload = field_file.file
+        upload.sha256 = content_sha256(upload)
+        instance.file_checksum = upload.sha256
+        instance.file_name = os.path.basename(field_file.name)
+        instance.file_size = upload.size
+        instance.content_type = getattr(upload, 'sniffed_content_type', None) or _sniff(upload, field_file.name)
+        # Reference the blob before the storage looks for an existing copy, so
+        # the copy can't be collected between that check and this save.
+        name = blob_name(upload.sha256, field_file.field.generate_filename(instance, field_file.name))
+        acquire_blob(name, upload.sha256, upload.size)
+        instance._acquired_blob_name = name
+    elif not field_file:
+        instance.file_checksum = None
+        instance.file_name = None
+        instance.file_size = None
+        instance.content_type = None
+
+
+@receiver(post_save, sender=resources)
+@receiver(post_save, sender=AssignmentSubmissions)
+def update_blob_references(sender, instance, **kwargs):
+    field_file = getattr(instance, BLOB_FILE_FIELDS[sender])
+    changes = Counter()
+    for name, delta in (
+        (field_file.name, 1),
+        (getattr(instance, '_previous_blob_name', None), -1),
+        # Already referenced by track_blob_file().
+        (getattr(instance, '_acquired_blob_name', None), -1),
+    ):
+        if is_blob_name(name):
+            changes[name] += delta
+    for name, delta in changes.items():
+        if delta > 0:
+            acquire_blob(name, instance.file_checksum, field_file.size)
+        for _ in range(-delta):
+            release_blob(name)
+
+
+@receiver(post_delete, sender=resources)
+@receiver(post_delete, sender=AssignmentSubmissions)
+def release_blob_on_delete(sender, instance, **kwargs):
+    name = getattr(instance, BLOB_FILE_FIELDS[sender]).name
+    if is_blob_name(name):
+        release_blob(name)
+
+
+@receiver(post_save, sender=AssignmentSubmissions)
+def count_new_submission(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        counters.submission_added(instance)
+        analytics.invalidate(instance)
+
+
+@receiver(post_delete, sender=AssignmentSubmissions)
+def uncount_submission(sender, instance, **kwargs):
+    counters.submission_removed(instance)
+    analytics.invalidate(instance)
+
+
+@receiver(post_save, sender=Assignments)
+def invalidate_assignment_analytics(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Lateness is measured against due_date and percentages against max_score.
+    if raw or not _touches(update_fields, {'due_date', 'max_score'}):
+        return
+    analytics.invalidate_assignment(instance.pk, instance.course_id_id)
+
+
+# Fields of each model that feed its search document (see resources.search).
+SEARCH_FIELDS = {
+    resources: {'assignment', 'course_id', 'resource_type', 'description', 'resource_file', 'file_name'},
+    Assignments: {'title', 'course_id', 'description'},
+    AssignmentSubmissions: {'assignment', 'student', 'submission_file', 'file_name'},
+}
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or bool(set(update_fields) & fields)
+
+
+@receiver(post_save, sender=resources)
+@receiver(post_save, sender=Assignments)
+@receiver(post_save, sender=AssignmentSubmissions)
+def index_search_document(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _touches(update_fields, SEARCH_FIELDS[sender]):
+        return
+    search.index_instance(instance)
+    if sender is Assignments and _touches(update_fields, {'title'}):
+        # The assignment title is part of its resources' and submissions' documents.
+        search.index_queryset(resources.objects.filter(assignment=instance))
+        search.index_queryset(AssignmentSubmissions.objects.filter(assignment=instance))
+
+
+@receiver(post_delete, sender=resources)
+@receiver(post_delete, sender=Assignments)
+@receiver(post_delete, sender=AssignmentSubmissions)
+def remove_search_document(sender, instance, **kwargs):
+    search.remove_instance(instance)
+
+
+@receiver(post_save, sender=Courses)
+def reindex_course(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if created or raw or not _touches(update_fields, {'course_name', 'course_code'}):
+        return
+    search.index_queryset(resources.objects.filter(course_id=instance))
+    search.index_queryset(Assignments.objects.filter(course_id=instance))
+
+
+@receiver(post_save, sender=User)
+def reindex_student_submissions(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    # Logins save last_login through update_fields and skip this.
+    if created or raw or not _touches(update_fields, {'username', 'full_name'}):
+        return
+    search.index_queryset(AssignmentSubmissions.objects.filter(student__user=instance))
+
+
+@receiver(post_save, sender=resources)
+@receiver(post_save, sender=Assignments)
+@receiver(post_save, sender=Courses)
+@receiver(post_save, sender=CourseGroup)
+@receiver(post_delete, sender=resources)
+@receiver(post_delete, sender=Assignments)
+@receiver(post_delete, sender=Courses)
+@receiver(post_delete, sender=CourseGroup)
+def invalidate_resource_listings(sender, **kwargs):
+    """Cached resource lists (CachedListMixin, generation "resources") are stale."""
+    bump_generation('resources')
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOB_PREFIX = 'blobs'
+
+
+def content_sha256(content):
+    """
+    Return the SHA-256 of a File, reusing a digest already computed while the
+    upload streamed in (``content.sha256``) when there is one.
+    """
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return hasher.hexdigest()
+
+
+def blob_name(digest, filename=''):
+    extension = os.path.splitext(filename)[1].lower()
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def is_blob_name(name):
+    return bool(name) and name.startswith(f'{BLOB_PREFIX}/')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every file under ``blobs/<aa>/<bb>/<sha256><ext>``.
+
+    Identical uploads map to the same name, so the second and later copies
+    are never written. Reference counting and garbage collection of blobs is
+    handled by ``resources.signals`` through the ``StoredBlob`` table.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is derived from the content in _save(); never rename.
+        return name
+
+    def _save(self, name, content):
+        name = blob_name(content_sha256(content), name)
+        if self.exists(name):
+            return name
+        # Write under a unique temporary name and rename into place, so a
+        # concurrent upload of the same content never sees a partial blob.
+        partial = super()._save(f'{name}.{uuid.uuid4().hex}.part', content)
+        os.replace(self.path(partial), self.path(name))
+        return name
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def get_content_addressed_storage():
+    return content_addressed_storage
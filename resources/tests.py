@@ -1,15 +1,44 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from rest_framework.test import APITestCase, APIClient
-from rest_framework import status
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase, APITransactionTestCase, APIClient
+from rest_framework import serializers, status
+from app.caching import response_cache
+from app.replicas import REPLICA_DB_ALIAS, REPLICA_PIN_COOKIE
+from app.sqlite import write_transaction
+from app.compiled import compile_serializer
+from app.eager import serializer_related_lookups
+from app.downloads import RangeNotSatisfiable, parse_range_header
 from custom.models import User
-from .models import resources
+from lecture.api.serializers import FeedbackSerializer
+from lecture.api.views import AssignmentSubmissionFeedbackView, AssignmentSubmissionListView
+from student.api.views import StudentResourceListView
+from student.models import Student
+from .uploadhandlers import sniff_content_type
+from .counters import drifted, recount
+from .gradebook import Gradebook
+from .models import AssignmentSubmissions, Assignments, CourseGroup, Courses, Departments, SearchDocument, StoredBlob, resources
+from .search import index_queryset, search
 
 # Create your tests here.
 
 class ResourceAPITestCase(APITestCase):
     def setUp(self):
-        self.lecturer = User.objects.create_user(username='lecturer1', password='pass', role='lecture')
+        self.lecturer = User.objects.create_user('lecturer1@example.com', 'pass', username='lecturer1', role='lecture')
         self.client = APIClient()
         self.client.force_authenticate(user=self.lecturer)
 
@@ -27,3 +56,1493 @@ class ResourceAPITestCase(APITestCase):
         url = reverse('resource-list-create')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class RangeHeaderParsingTestCase(TestCase):
+    def test_single_and_suffix_ranges(self):
+        self.assertEqual(parse_range_header('bytes=0-9', 100), [(0, 9)])
+        self.assertEqual(parse_range_header('bytes=90-', 100), [(90, 99)])
+        self.assertEqual(parse_range_header('bytes=-10', 100), [(90, 99)])
+
+    def test_overlapping_ranges_are_merged(self):
+        self.assertEqual(parse_range_header('bytes=50-60,0-9,5-20', 100), [(0, 20), (50, 60)])
+
+    def test_malformed_header_is_ignored(self):
+        self.assertIsNone(parse_range_header('items=0-9', 100))
+        self.assertIsNone(parse_range_header('bytes=9-0', 100))
+
+    def test_unsatisfiable_range(self):
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range_header('bytes=200-300', 100)
+
+
+class FileFixtureTestCase(APITestCase):
+    content = bytes(range(256)) * 8
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            CHUNKED_UPLOAD_DIR=os.path.join(self.media_root, 'chunked_uploads'),
+        )
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.user = User.objects.create(username='student1', email='student1@example.com', role='student')
+        department = Departments.objects.create(name='Computing')
+        course = Courses.objects.create(course_code='CS101', course_name='Intro', department_id=department)
+        assignment = Assignments.objects.create(course_id=course, title='Lab 1', due_date=timezone.now())
+        self.resource = resources.objects.create(
+            course_id=course,
+            assignment=assignment,
+            resource_type='video',
+            resource_file=SimpleUploadedFile('lecture.mp4', self.content),
+        )
+        self.client.force_authenticate(user=self.user)
+
+
+class ResourceDownloadTestCase(FileFixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('resource-download', args=[self.resource.pk])
+
+    def test_full_download_sets_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], '"%s"' % hashlib.sha256(self.content).hexdigest())
+        self.resource.refresh_from_db()
+        self.assertEqual(self.resource.file_checksum, hashlib.sha256(self.content).hexdigest())
+
+    def test_single_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/%d' % len(self.content))
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+
+    def test_multi_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3,100-103')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertTrue(response['Content-Type'].startswith('multipart/byteranges; boundary='))
+        body = b''.join(response.streaming_content)
+        self.assertEqual(len(body), int(response['Content-Length']))
+        self.assertIn(b'Content-Range: bytes 0-3/2048\r\n\r\n' + self.content[0:4], body)
+        self.assertIn(b'Content-Range: bytes 100-103/2048\r\n\r\n' + self.content[100:104], body)
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5000-6000')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], 'bytes */2048')
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_stale_if_range_serves_full_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_student_download_view_shares_engine(self):
+        url = reverse('student-resource-download', args=[self.resource.pk])
+        response = self.client.get(url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), self.content[-4:])
+
+    async def test_asgi_download_streams_asynchronously(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(self.url, headers={'Range': 'bytes=0-99'})
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(body, self.content[:100])
+
+
+class FileDeliveryBackendTestCase(FileFixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lecturer = User.objects.create(username='lecturer1', email='lecturer1@example.com', role='lecture')
+        self.resource.assignment.created_by = self.lecturer
+        self.resource.assignment.save()
+        student = Student.objects.create(user=self.user)
+        self.submission = AssignmentSubmissions.objects.create(
+            assignment=self.resource.assignment,
+            student=student,
+            submission_file=SimpleUploadedFile('answer.pdf', b'%PDF-1.4 answer'),
+        )
+
+    @override_settings(FILE_DELIVERY_BACKEND='app.delivery.XAccelRedirectBackend',
+                       FILE_DELIVERY_ACCEL_PREFIX='/protected-media/')
+    def test_x_accel_redirect_offloads_resource(self):
+        response = self.client.get(reverse('resource-download', args=[self.resource.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.resource.resource_file.name)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertEqual(response.content, b'')
+
+    @override_settings(FILE_DELIVERY_BACKEND='app.delivery.XSendfileBackend')
+    def test_x_sendfile_offloads_submission(self):
+        url = reverse('student-submission-download', args=[self.submission.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Sendfile'], self.submission.submission_file.path)
+
+    @override_settings(FILE_DELIVERY_BACKEND='app.delivery.XAccelRedirectBackend')
+    def test_offload_still_answers_conditional_requests(self):
+        url = reverse('resource-download', args=[self.resource.pk])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertNotIn('X-Accel-Redirect', response)
+
+    @override_settings(FILE_DELIVERY_BACKEND='app.delivery.XAccelRedirectBackend')
+    def test_offload_keeps_is_active_check(self):
+        resources.objects.filter(pk=self.resource.pk).update(is_active=False)
+        response = self.client.get(reverse('resource-download', args=[self.resource.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(FILE_DELIVERY_BACKEND='app.delivery.XAccelRedirectBackend')
+    def test_offload_never_hashes_files(self):
+        resources.objects.filter(pk=self.resource.pk).update(file_checksum=None)
+        url = reverse('resource-download', args=[self.resource.pk])
+        with mock.patch('resources.models.file_sha256') as file_sha256:
+            response = self.client.get(url)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                             status.HTTP_304_NOT_MODIFIED)
+        file_sha256.assert_not_called()
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertIn('X-Accel-Redirect', response)
+
+        out = io.StringIO()
+        call_command('backfill_file_checksums', stdout=out)
+        self.assertEqual(out.getvalue().strip(), '1 checksums stored, 0 files missing from storage')
+        self.resource.refresh_from_db()
+        self.assertEqual(self.resource.file_checksum, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(self.client.get(url)['ETag'], f'"{self.resource.file_checksum}"')
+
+    def test_lecturer_downloads_submission_directly(self):
+        self.client.force_authenticate(user=self.lecturer)
+        response = self.client.get(reverse('lecturer-submission-download', args=[self.submission.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 answer')
+
+
+class ContentAddressedStorageTestCase(FileFixtureTestCase):
+    def create_resource(self, content):
+        return resources.objects.create(
+            course_id=self.resource.course_id,
+            assignment=self.resource.assignment,
+            resource_type='video',
+            resource_file=SimpleUploadedFile('copy.mp4', content),
+        )
+
+    def test_identical_uploads_share_one_blob(self):
+        copy = self.create_resource(self.content)
+        self.assertEqual(copy.resource_file.name, self.resource.resource_file.name)
+        self.assertEqual(copy.file_checksum, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(copy.file_name, 'copy.mp4')
+        blob = StoredBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(blob.size, len(self.content))
+
+    def test_blob_is_collected_with_last_reference(self):
+        copy = self.create_resource(self.content)
+        name = copy.resource_file.name
+        storage = copy.resource_file.storage
+        copy.delete()
+        self.assertEqual(StoredBlob.objects.get(name=name).ref_count, 1)
+        self.assertTrue(storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.resource.delete()
+        self.assertFalse(StoredBlob.objects.filter(name=name).exists())
+        self.assertFalse(storage.exists(name))
+
+    def test_upload_reusing_a_blob_being_collected_keeps_it(self):
+        name = self.resource.resource_file.name
+        storage = self.resource.resource_file.storage
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.resource.delete()
+        exists = storage.exists
+
+        def exists_then_collect(path):
+            # The last reference's deletion commits right after the new
+            # upload found the blob on disk.
+            found = exists(path)
+            for callback in callbacks:
+                callback()
+            return found
+
+        with mock.patch.object(storage, 'exists', side_effect=exists_then_collect):
+            copy = self.create_resource(self.content)
+        self.assertEqual(copy.resource_file.name, name)
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(StoredBlob.objects.get(name=name).ref_count, 1)
+
+    def test_replacing_file_releases_previous_blob(self):
+        old_name = self.resource.resource_file.name
+        self.resource.resource_file = SimpleUploadedFile('new.mp4', b'new recording')
+        self.resource.save()
+        self.assertFalse(StoredBlob.objects.filter(name=old_name).exists())
+        self.assertEqual(StoredBlob.objects.get().name, self.resource.resource_file.name)
+
+    def test_gc_blobs_repairs_reference_counts(self):
+        StoredBlob.objects.update(ref_count=7)
+        call_command('gc_blobs', stdout=io.StringIO())
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+
+class ChunkedUploadTestCase(FileFixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lecturer = User.objects.create(username='lecturer1', email='lecturer1@example.com', role='lecture')
+        self.client.force_authenticate(user=self.lecturer)
+
+    def initiate(self, **extra):
+        data = {'filename': 'recording.mp4', 'total_size': len(self.content), 'chunk_size': 1000}
+        data.update(extra)
+        response = self.client.post(reverse('upload-session-create'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def put_chunk(self, upload_id, index, data):
+        url = reverse('upload-chunk', args=[upload_id, index])
+        return self.client.put(url, data, content_type='application/octet-stream')
+
+    def test_out_of_order_chunks_resume_and_finalize(self):
+        upload_id = self.initiate(sha256=hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(self.put_chunk(upload_id, 2, self.content[2000:]).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.put_chunk(upload_id, 0, self.content[:1000]).data['offset'], 1000)
+
+        detail = self.client.get(reverse('upload-session-detail', args=[upload_id]))
+        self.assertEqual(detail.data['received_chunks'], [0, 2])
+        self.assertEqual(detail['Upload-Offset'], '1000')
+
+        self.put_chunk(upload_id, 1, self.content[1000:2000])
+        response = self.client.post(reverse('upload-session-complete', args=[upload_id]), {
+            'course_id': self.resource.course_id.pk,
+            'assignment': self.resource.assignment.pk,
+            'resource_type': 'video',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        resource = resources.objects.get(pk=response.data['id'])
+        self.assertEqual(resource.file_name, 'recording.mp4')
+        self.assertEqual(resource.uploaded_by, self.lecturer)
+        with resource.resource_file.open('rb') as handle:
+            self.assertEqual(handle.read(), self.content)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'chunked_uploads', str(upload_id))))
+
+    def test_completing_again_after_the_resource_is_deleted(self):
+        upload_id = self.initiate()
+        for index in range(3):
+            self.put_chunk(upload_id, index, self.content[index * 1000:(index + 1) * 1000])
+        url = reverse('upload-session-complete', args=[upload_id])
+        data = {'course_id': self.resource.course_id.pk, 'assignment': self.resource.assignment.pk, 'resource_type': 'video'}
+        created = self.client.post(url, data, format='json')
+        self.assertEqual(self.client.post(url, data, format='json').data['id'], created.data['id'])
+
+        resources.objects.get(pk=created.data['id']).delete()
+        # Left behind by a request that died while assembling.
+        session_dir = os.path.join(self.media_root, 'chunked_uploads', str(upload_id))
+        os.makedirs(session_dir)
+        with open(os.path.join(session_dir, 'leftover.assembled'), 'wb') as handle:
+            handle.write(self.content)
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        self.assertFalse(os.path.exists(session_dir))
+        self.assertEqual(resources.objects.count(), 1)
+
+    def test_chunk_with_wrong_length_is_rejected(self):
+        upload_id = self.initiate()
+        response = self.put_chunk(upload_id, 0, self.content[:999])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse('upload-session-detail', args=[upload_id])).data['offset'], 0)
+
+    def test_finalize_verifies_checksum(self):
+        upload_id = self.initiate(sha256='0' * 64)
+        for index in range(3):
+            self.put_chunk(upload_id, index, self.content[index * 1000:(index + 1) * 1000])
+        response = self.client.post(reverse('upload-session-complete', args=[upload_id]), {
+            'course_id': self.resource.course_id.pk,
+            'assignment': self.resource.assignment.pk,
+            'resource_type': 'video',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(resources.objects.count(), 1)
+
+    def test_students_cannot_upload(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse('upload-session-create'), {'filename': 'a', 'total_size': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class StreamingUploadHandlerTestCase(FileFixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lecturer = User.objects.create(username='lecturer1', email='lecturer1@example.com', role='lecture')
+        self.student = Student.objects.create(user=self.user)
+
+    def test_sniff_content_type(self):
+        self.assertEqual(sniff_content_type(b'%PDF-1.7 ...', 'notes.bin'), 'application/pdf')
+        self.assertEqual(
+            sniff_content_type(b'PK\x03\x04rest', 'slides.pptx'),
+            'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+        )
+        self.assertEqual(sniff_content_type(b'plain words', 'README'), 'text/plain')
+        self.assertEqual(sniff_content_type(b'\x00\x01\x02', 'blob'), 'application/octet-stream')
+
+    def test_resource_upload_is_hashed_and_sniffed_while_streaming(self):
+        self.client.force_authenticate(user=self.lecturer)
+        payload = b'%PDF-1.4 lecture notes'
+        response = self.client.post(reverse('resource-list-create'), {
+            'course_id': self.resource.course_id.pk,
+            'assignment': self.resource.assignment.pk,
+            'resource_type': 'document',
+            'resource_file': SimpleUploadedFile('notes.bin', payload),
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['file_checksum'], hashlib.sha256(payload).hexdigest())
+        self.assertEqual(response.data['content_type'], 'application/pdf')
+        self.assertEqual(response.data['file_size'], len(payload))
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=16)
+    def test_large_submission_spools_to_disk(self):
+        payload = b'x' * 4096
+        response = self.client.post(reverse('student-submission-list-create'), {
+            'assignment': self.resource.assignment.pk,
+            'submission_file': SimpleUploadedFile('answer.txt', payload),
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        submission = AssignmentSubmissions.objects.get(pk=response.data['id'])
+        self.assertEqual(submission.file_checksum, hashlib.sha256(payload).hexdigest())
+        self.assertEqual(submission.content_type, 'text/plain')
+
+    @override_settings(UPLOAD_SIZE_LIMITS={'student': 1024})
+    def test_oversize_submission_is_rejected(self):
+        response = self.client.post(reverse('student-submission-list-create'), {
+            'assignment': self.resource.assignment.pk,
+            'submission_file': SimpleUploadedFile('answer.txt', b'x' * 2048),
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertFalse(AssignmentSubmissions.objects.exists())
+
+
+class KeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='student1', email='student1@example.com', role='student')
+        department = Departments.objects.create(name='Computing')
+        course = Courses.objects.create(course_code='CS101', course_name='Intro', department_id=department)
+        assignment = Assignments.objects.create(course_id=course, title='Lab 1', due_date=timezone.now())
+        for index in range(7):
+            resources.objects.create(
+                course_id=course, assignment=assignment, resource_type='document' if index % 2 else 'video'
+            )
+        # Identical timestamps force the id tiebreaker to do its job.
+        resources.objects.update(uploaded_at=timezone.now())
+        self.url = reverse('resource-list-create')
+        self.client.force_authenticate(user=self.user)
+
+    def collect(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_walks_every_row_once(self):
+        ids, pages = self.collect(f'{self.url}?page_size=3')
+        self.assertEqual(ids, sorted(resources.objects.values_list('id', flat=True)))
+        self.assertEqual(pages, 3)
+
+    def test_follows_ordering_filter(self):
+        ids, _ = self.collect(f'{self.url}?page_size=2&ordering=-resource_type')
+        expected = list(resources.objects.order_by('-resource_type', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_preceding_page(self):
+        first = self.client.get(f'{self.url}?page_size=3').data
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(back['results'], first['results'])
+        self.assertEqual(back['next'], first['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f'{self.url}?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class EagerLoadingTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            username='admin1', email='admin1@example.com', role='lecture', is_staff=True, is_superuser=True
+        )
+        self.department = Departments.objects.create(name='Computing')
+        self.client.force_authenticate(user=self.user)
+        self.client.force_login(self.user)
+
+    def add_resources(self, count):
+        for index in range(count):
+            course = Courses.objects.create(
+                course_code=f'C{resources.objects.count():03}', course_name=f'Course {resources.objects.count()}',
+                department_id=self.department,
+            )
+            assignment = Assignments.objects.create(course_id=course, title=f'Lab {index}', due_date=timezone.now())
+            resources.objects.create(course_id=course, assignment=assignment, resource_type='document')
+
+    def count_queries(self, url, rows):
+        self.add_resources(rows)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_serializer_lookups(self):
+        class AssignmentSummary(serializers.ModelSerializer):
+            class Meta:
+                model = Assignments
+                fields = ['id', 'title', 'course_id']
+
+        class ResourceWithRelations(serializers.ModelSerializer):
+            course_name = serializers.CharField(source='course_id.course_name')
+            assignment = AssignmentSummary()
+            department = serializers.CharField(source='course_id.department_id.name')
+
+            class Meta:
+                model = resources
+                fields = ['id', 'course_id', 'course_name', 'assignment', 'department', 'uploaded_by']
+
+        select, prefetch = serializer_related_lookups(ResourceWithRelations)
+        self.assertEqual(select, {'course_id', 'course_id__department_id', 'assignment'})
+        self.assertEqual(prefetch, set())
+
+    def test_list_query_count_is_constant(self):
+        url = reverse('resource-list-create') + '?search=Course&ordering=uploaded_at'
+        self.assertEqual(self.count_queries(url, 2), self.count_queries(url, 5))
+
+    def test_admin_changelist_query_count_is_constant(self):
+        for name in ('resources_resources', 'resources_assignments', 'resources_assignmentsubmissions'):
+            url = reverse(f'admin:{name}_changelist')
+            self.assertEqual(self.count_queries(url, 2), self.count_queries(url, 5), name)
+
+
+class QueryPlanTestCase(TestCase):
+    def setUp(self):
+        lecturer = User.objects.create(username='lecturer1', email='Lecturer1@Example.com', role='lecture')
+        student = Student.objects.create(user=User.objects.create(username='student1', email='s1@example.com', role='student'))
+        department = Departments.objects.create(name='Computing')
+        course = Courses.objects.create(course_code='CS101', course_name='Intro', department_id=department)
+        assignment = Assignments.objects.create(course_id=course, title='Lab 1', due_date=timezone.now(), created_by=lecturer)
+        resources.objects.create(course_id=course, assignment=assignment, resource_type='document')
+        AssignmentSubmissions.objects.create(assignment=assignment, student=student)
+        self.lecturer = lecturer
+
+    def test_email_lookup_is_case_insensitive(self):
+        self.assertEqual(User.objects.get_by_email('lecturer1@example.COM'), self.lecturer)
+
+    def test_list_and_login_queries_use_indexes(self):
+        out = io.StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn('resources (cursor page): index', out.getvalue())
+        self.assertNotIn('FULL SCAN', out.getvalue())
+
+
+class FullTextSearchTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='student1', email='student1@example.com', role='student')
+        department = Departments.objects.create(name='Computing')
+        self.course = Courses.objects.create(course_code='CS101', course_name='Compilers', department_id=department)
+        self.lab = Assignments.objects.create(course_id=self.course, title='Parsing lab', due_date=timezone.now())
+        self.essay = Assignments.objects.create(course_id=self.course, title='Essay', due_date=timezone.now())
+        self.lab_notes = resources.objects.create(course_id=self.course, assignment=self.lab, resource_type='notes')
+        self.essay_notes = resources.objects.create(
+            course_id=self.course, assignment=self.essay, resource_type='notes', description='parsing background reading'
+        )
+        self.url = reverse('resource-list-create')
+        self.client.force_authenticate(user=self.user)
+
+    def results(self, query):
+        response = self.client.get(self.url, {'search': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in response.data['results']]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.results('parsing'), [self.lab_notes.pk, self.essay_notes.pk])
+
+    def test_prefix_and_all_words_must_match(self):
+        self.assertEqual(self.results('pars lab'), [self.lab_notes.pk])
+        self.assertCountEqual(self.results('compil'), [self.lab_notes.pk, self.essay_notes.pk])
+        self.assertEqual(self.results('"unknown*'), [])
+
+    def test_documents_follow_saves_and_deletes(self):
+        self.lab.title = 'Lexing lab'
+        self.lab.save()
+        self.assertEqual(self.results('lexing'), [self.lab_notes.pk])
+        self.assertEqual(self.results('parsing'), [self.essay_notes.pk])
+
+        self.essay_notes.delete()
+        self.assertEqual(self.results('parsing'), [])
+        self.assertFalse(SearchDocument.objects.filter(kind='resource', object_id=self.essay_notes.pk).exists())
+
+    def test_search_is_limited_to_the_queryset(self):
+        inactive = resources.objects.filter(pk=self.essay_notes.pk)
+        self.assertEqual(list(search(inactive, 'parsing').values_list('pk', flat=True)), [self.essay_notes.pk])
+        inactive.update(is_active=False)
+        self.assertEqual(self.results('parsing'), [self.lab_notes.pk])
+
+    def test_search_results_paginate(self):
+        response = self.client.get(self.url, {'search': 'notes', 'page_size': 1})
+        first = response.data['results'][0]['id']
+        second = self.client.get(response.data['next']).data['results'][0]['id']
+        self.assertEqual(sorted([first, second]), sorted([self.lab_notes.pk, self.essay_notes.pk]))
+
+    def test_every_match_is_paginated(self):
+        extra = resources.objects.bulk_create(
+            resources(course_id=self.course, assignment=self.essay, resource_type='notes') for _ in range(1100))
+        index_queryset(resources.objects.filter(pk__in=[resource.pk for resource in extra]))
+        ids, page = [], self.client.get(self.url, {'search': 'notes', 'page_size': 500}).data
+        while True:
+            ids += [row['id'] for row in page['results']]
+            if not page['next']:
+                break
+            page = self.client.get(page['next']).data
+        self.assertEqual(len(ids), 1102)
+        self.assertEqual(len(set(ids)), 1102)
+
+    def test_rebuild_command(self):
+        SearchDocument.objects.all().delete()
+        call_command('rebuild_search_index', '--missing', stdout=io.StringIO())
+        self.assertEqual(SearchDocument.objects.filter(kind='resource').count(), 2)
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(self.results('parsing'), [self.lab_notes.pk, self.essay_notes.pk])
+
+
+class ResponseCacheTestCase(APITestCase):
+    def setUp(self):
+        response_cache().clear()
+        self.student = User.objects.create(username='student1', email='student1@example.com', role='student')
+        self.other = User.objects.create(username='student2', email='student2@example.com', role='student')
+        self.lecturer = User.objects.create(username='lecturer1', email='lecturer1@example.com', role='lecture')
+        department = Departments.objects.create(name='Computing')
+        self.course = Courses.objects.create(course_code='CS101', course_name='Intro', department_id=department)
+        assignment = Assignments.objects.create(course_id=self.course, title='Lab 1', due_date=timezone.now())
+        self.resource = resources.objects.create(course_id=self.course, assignment=assignment, resource_type='notes')
+        self.url = reverse('resource-list-create')
+
+    def get(self, user, url=None):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(url or self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_hit_after_miss_is_shared_within_a_role(self):
+        first = self.get(self.student)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.get(self.other)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(self.get(self.lecturer)['X-Cache'], 'MISS')
+
+    def test_query_parameters_are_part_of_the_key(self):
+        self.get(self.student)
+        self.assertEqual(self.get(self.student, f'{self.url}?ordering=-uploaded_at')['X-Cache'], 'MISS')
+
+    def test_model_changes_invalidate(self):
+        self.get(self.student)
+        self.resource.description = 'Updated'
+        self.resource.save()
+        response = self.get(self.student)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['description'], 'Updated')
+
+        self.course.course_name = 'Introduction'
+        self.course.save()
+        self.assertEqual(self.get(self.student)['X-Cache'], 'MISS')
+
+    def test_file_backend(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        caches = {
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'responses': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location},
+        }
+        with override_settings(CACHES=caches):
+            self.assertEqual(self.get(self.student)['X-Cache'], 'MISS')
+            self.assertEqual(self.get(self.student)['X-Cache'], 'HIT')
+            self.resource.save()
+            self.assertEqual(self.get(self.student)['X-Cache'], 'MISS')
+
+    def test_stats_endpoint(self):
+        self.get(self.student)
+        self.get(self.student)
+        url = reverse('response-cache-stats')
+        self.client.force_authenticate(user=self.student)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        admin = User.objects.create(username='admin1', email='admin1@example.com', role='lecture', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        stats = self.client.get(url).data
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+
+class ConditionalRequestTestCase(APITestCase):
+    def setUp(self):
+        response_cache().clear()
+        self.user = User.objects.create(username='student1', email='student1@example.com', role='student')
+        self.student = Student.objects.create(user=self.user)
+        self.lecturer = User.objects.create(username='lecturer1', email='lecturer1@example.com', role='lecture')
+        department = Departments.objects.create(name='Computing')
+        self.course = Courses.objects.create(course_code='CS101', course_name='Intro', department_id=department)
+        self.assignment = Assignments.objects.create(
+            course_id=self.course, title='Lab 1', due_date=timezone.now(), created_by=self.lecturer)
+        self.submission = AssignmentSubmissions.objects.create(assignment=self.assignment, student=self.student)
+        self.url = reverse('student-submission-list-create')
+        self.client.force_authenticate(user=self.user)
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_list_is_not_modified(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertTrue(first['ETag'].startswith('W/"'))
+        with self.assertNumQueries(1):
+            second = self.revalidate(self.url, first)
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.content, b'')
+
+    def test_list_changes_change_the_etag(self):
+        first = self.client.get(self.url)
+        self.submission.file_name = 'report.pdf'
+        self.submission.save()
+        self.assertEqual(self.revalidate(self.url, first).status_code, status.HTTP_200_OK)
+
+        first = self.client.get(self.url)
+        other = AssignmentSubmissions.objects.create(assignment=self.assignment, student=self.student, attempt_number=2)
+        second = self.revalidate(self.url, first)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+
+        other.delete()
+        self.assertEqual(self.revalidate(self.url, second).status_code, status.HTTP_200_OK)
+
+    def test_etag_depends_on_query_and_caller(self):
+        first = self.client.get(self.url)
+        self.assertEqual(self.revalidate(f'{self.url}?ordering=-submission_date', first).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.revalidate(f'{self.url}?format=api', first).status_code, status.HTTP_200_OK)
+
+        url = reverse('lecturer-submission-list')
+        self.client.force_authenticate(user=self.lecturer)
+        lecturer = self.client.get(url)
+        self.assertEqual(lecturer.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(lecturer['ETag'], first['ETag'])
+        self.assertEqual(self.revalidate(url, lecturer).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_sends_etag_and_last_modified(self):
+        url = reverse('student-submission-detail', args=[self.submission.pk])
+        first = self.client.get(url)
+        self.assertIn('Last-Modified', first)
+        self.assertEqual(self.revalidate(url, first).status_code, status.HTTP_304_NOT_MODIFIED)
+        since = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(since.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.submission.file_name = 'report.pdf'
+        self.submission.save()
+        self.assertEqual(self.revalidate(url, first).status_code, status.HTTP_200_OK)
+
+    def test_cached_list_revalidates_without_queries(self):
+        resources.objects.create(course_id=self.course, assignment=self.assignment, resource_type='notes')
+        url = reverse('resource-list-create')
+        first = self.client.get(url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.revalidate(url, first)
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second['X-Cache'], 'HIT')
+
+
+class CompiledSerializerTestCase(APITestCase):
+    def setUp(self):
+        self.lecturer = User.objects.create(username='lecturer1', email='lecturer1@example.com', role='lecture')
+        self.user = User.objects.create(username='student1', email='student1@example.com', role='student')
+        student = Student.objects.create(user=self.user)
+        department = Departments.objects.create(name='Computing')
+        course = Courses.objects.create(course_code='CS101', course_name='Intro', department_id=department)
+        for index in range(3):
+            assignment = Assignments.objects.create(
+                course_id=course, title=f'Lab {index}', due_date=timezone.now(), created_by=self.lecturer,
+                description=None if index else 'First lab')
+            resource = resources.objects.create(
+                course_id=course, assignment=assignment, resource_type='notes', uploaded_by=self.lecturer,
+                file_name=f'notes {index}.pdf')
+            submission = AssignmentSubmissions.objects.create(assignment=assignment, student=student)
+            # File names only; update() skips the blob bookkeeping signals.
+            if index:
+                resources.objects.filter(pk=resource.pk).update(resource_file=f'blobs/00/00/{index:064x}.pdf')
+            AssignmentSubmissions.objects.filter(pk=submission.pk).update(
+                submission_file=f'blobs/00/00/{index:064x}.zip')
+
+    def test_output_matches_serializers(self):
+        from lecture.api import serializers as lecture_serializers
+        from student.api import serializers as student_serializers
+        from .api.serializers import ResourceSerializer
+
+        request = APIRequestFactory().get('/', HTTP_HOST='archive.example.com')
+        renderer = JSONRenderer()
+        cases = [
+            (resources, ResourceSerializer),
+            (resources, student_serializers.ResourceSerializer),
+            (Assignments, lecture_serializers.AssignmentSerializer),
+            (AssignmentSubmissions, lecture_serializers.AssignmentSubmissionSerializer),
+            (AssignmentSubmissions, student_serializers.AssignmentSubmissionSerializer),
+        ]
+        for zone in ('UTC', 'Africa/Nairobi'):
+            with timezone.override(zone):
+                for model, serializer_class in cases:
+                    queryset = model.objects.order_by('pk')
+                    compiled = compile_serializer(serializer_class)
+                    for context_request in (request, None):
+                        expected = serializer_class(queryset, many=True, context={'request': context_request}).data
+                        actual = compiled.render(queryset.values(*compiled.columns), context_request)
+                        self.assertEqual(renderer.render(actual), renderer.render(expected), serializer_class)
+
+    def test_list_endpoint_uses_values_rows(self):
+        self.client.force_authenticate(user=self.lecturer)
+        url = reverse('lecturer-submission-list')
+        response = self.client.get(url, {'page_size': 2})
+        self.assertEqual([row['id'] for row in response.data['results']], [1, 2])
+        self.assertTrue(response.data['results'][0]['submission_file'].startswith('http://testserver/'))
+        following = self.client.get(response.data['next'])
+        self.assertEqual([row['id'] for row in following.data['results']], [3])
+
+        search = self.client.get(reverse('lecturer-assignment-list-create'), {'search': 'lab 2'})
+        self.assertEqual([row['title'] for row in search.data['results']], ['Lab 2'])
+
+    def test_unsupported_fields(self):
+        class WithMethod(serializers.ModelSerializer):
+            label = serializers.SerializerMethodField()
+
+            class Meta:
+                model = resources
+                fields = ['id', 'label']
+
+        with self.assertRaises(ImproperlyConfigured):
+            compile_serializer(WithMethod)
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command('bench_serializers', rows=[5], repeat=1, stdout=out)
+        self.assertIn('speedup', out.getvalue())
+        self.assertEqual(resources.objects.count(), 3)
+
+
+class StreamingExportTestCase(APITestCase):
+    def setUp(self):
+        self.lecturer = User.objects.create(username='lecturer1', email='lecturer1@example.com', role='lecture')
+        student = Student.objects.create(
+            user=User.objects.create(username='student1', email='student1@example.com', role='student'))
+        department = Departments.objects.create(name='Computing')
+        course = Courses.objects.create(course_code='CS101', course_name='Intro', department_id=department)
+        assignment = Assignments.objects.create(
+            course_id=course, title='Lab 1', due_date=timezone.now(), created_by=self.lecturer)
+        for attempt in range(1, 6):
+            AssignmentSubmissions.objects.create(assignment=assignment, student=student, attempt_number=attempt)
+        self.url = reverse('lecturer-submission-list')
+        self.client.force_authenticate(user=self.lecturer)
+
+    def test_ndjson_streams_every_row_in_chunks(self):
+        expected = self.client.get(self.url, {'page_size': 100}).data['results']
+        with mock.patch.object(AssignmentSubmissionListView, 'stream_chunk_size', 2):
+            response = self.client.get(self.url, {'format': 'ndjson'})
+            self.assertTrue(response.streaming)
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            chunks = list(response.streaming_content)
+        # start, three batches of at most two rows, end
+        self.assertEqual(len(chunks), 5)
+        lines = b''.join(chunks).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line) for line in lines], json.loads(json.dumps(expected)))
+
+    def test_json_array_stream(self):
+        response = self.client.get(reverse('user-list'), {'format': 'json-stream'})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        users = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([user['username'] for user in users], ['lecturer1', 'student1'])
+
+        empty = self.client.get(self.url, {'format': 'json-stream', 'search': 'nothing'})
+        self.assertEqual(b''.join(empty.streaming_content), b'[]')
+
+    def test_errors_are_not_streamed(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.url, {'format': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(response.content.endswith(b'}\n'))
+
+    async def test_asgi_streams_asynchronously(self):
+        await self.async_client.aforce_login(self.lecturer)
+        response = await self.async_client.get(self.url, {'format': 'ndjson'})
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.splitlines()), 5)
+
+
+class GradebookTestCase(APITestCase):
+    def setUp(self):
+        self.lecturer = User.objects.create(username='lecturer1', email='lecturer1@example.com', role='lecture')
+        other = User.objects.create(username='lecturer2', email='lecturer2@example.com', role='lecture')
+        department = Departments.objects.create(name='Computing')
+        self.course = Courses.objects.create(course_code='CS101', course_name='Intro', department_id=department)
+        now = timezone.now()
+        self.lab = Assignments.objects.create(
+            course_id=self.course, title='Lab', due_date=now, created_by=self.lecturer, max_score=50)
+        self.exam = Assignments.objects.create(
+            course_id=self.course, title='Exam', due_date=now + timezone.timedelta(days=1),
+            created_by=self.lecturer, max_score=150)
+        foreign = Assignments.objects.create(course_id=self.course, title='Other', due_date=now, created_by=other)
+        self.students = []
+        for name in ('bob', 'alice'):
+            student = Student.objects.create(
+                user=User.objects.create(username=name, email=f'{name}@example.com', role='student', full_name=name.title()))
+            self.students.append(student)
+        bob, alice = self.students
+        for attempt, score in ((1, 10), (3, 40), (2, 30)):
+            AssignmentSubmissions.objects.create(assignment=self.lab, student=bob, attempt_number=attempt, score=score)
+        AssignmentSubmissions.objects.create(assignment=self.exam, student=bob, score=100)
+        AssignmentSubmissions.objects.create(assignment=self.lab, student=alice, score=45)
+        AssignmentSubmissions.objects.create(assignment=foreign, student=alice, score=99)
+        self.client.force_authenticate(user=self.lecturer)
+
+    def test_cells_are_latest_attempts_from_one_query(self):
+        gradebook = Gradebook.for_course(self.course, created_by=self.lecturer)
+        with self.assertNumQueries(1):
+            rows = list(gradebook.rows(gradebook.cells()))
+        self.assertEqual(rows, [
+            (self.students[1].pk, 'alice', 'Alice', [45, None], 45, 22.5),
+            (self.students[0].pk, 'bob', 'Bob', [40, 100], 140, 70.0),
+        ])
+
+    def test_csv_endpoint(self):
+        response = self.client.get(reverse('lecturer-course-gradebook', args=['CS101']))
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('gradebook-CS101.csv', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(lines[0], 'student_id,username,full_name,Lab (/50),Exam (/150),total,percentage (of 200)')
+        self.assertEqual(lines[1:], [f'{self.students[1].pk},alice,Alice,45,,45,22.5',
+                                     f'{self.students[0].pk},bob,Bob,40,100,140,70.0'])
+
+    def test_ndjson_endpoint_for_group(self):
+        group = CourseGroup.objects.create(course=self.course, group_name='A')
+        Assignments.objects.filter(pk=self.exam.pk).update(group_id=group)
+        response = self.client.get(reverse('lecturer-group-gradebook', args=[group.pk]), {'format': 'ndjson'})
+        header, *records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([assignment['title'] for assignment in header['assignments']], ['Exam'])
+        self.assertEqual(records, [{
+            'student': self.students[0].pk, 'username': 'bob', 'full_name': 'Bob',
+            'scores': {str(self.exam.pk): 100}, 'total': 100, 'percentage': 66.67,
+        }])
+
+    def test_students_cannot_export(self):
+        self.client.force_authenticate(user=self.students[0].user)
+        response = self.client.get(reverse('lecturer-course-gradebook', args=['CS101']))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_asgi_stream(self):
+        await self.async_client.aforce_login(self.lecturer)
+        response = await self.async_client.get(reverse('lecturer-course-gradebook', args=['CS101']))
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.decode('utf-8').splitlines()), 3)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('export_gradebook', course='CS101', stdout=out)
+        # The command is not limited to one lecturer's assignments.
+        self.assertTrue(out.getvalue().startswith('student_id,username,full_name,Lab (/50),Other (/100),Exam (/150)'))
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+
+class GradeAnalyticsTestCase(APITestCase):
+    def setUp(self):
+        response_cache().clear()
+        self.lecturer = User.objects.create(username='lecturer1', email='lecturer1@example.com', role='lecture')
+        department = Departments.objects.create(name='Computing')
+        self.course = Courses.objects.create(course_code='CS101', course_name='Intro', department_id=department)
+        now = timezone.now()
+        self.lab = Assignments.objects.create(
+            course_id=self.course, title='Lab', due_date=now + timezone.timedelta(days=1),
+            created_by=self.lecturer, max_score=100)
+        self.quiz = Assignments.objects.create(
+            course_id=self.course, title='Quiz', due_date=now - timezone.timedelta(days=1),
+            created_by=self.lecturer, max_score=20)
+        self.students = [
+            Student.objects.create(user=User.objects.create(username=name, email=f'{name}@example.com', role='student'))
+            for name in ('ann', 'ben', 'cat', 'dan')
+        ]
+        ann, ben, cat, dan = self.students
+        self.submit(self.lab, ann, 30, attempt=1)
+        self.submit(self.lab, ann, 60, attempt=2)
+        self.submit(self.lab, ben, 80)
+        self.submit(self.lab, cat, 100)
+        self.pending = self.submit(self.lab, dan, 0, graded=False)
+        # The quiz was due yesterday, so both of these are late.
+        self.submit(self.quiz, ann, 20)
+        self.submit(self.quiz, ben, 10)
+        self.client.force_authenticate(user=self.lecturer)
+
+    def submit(self, assignment, student, score, attempt=1, graded=True):
+        return AssignmentSubmissions.objects.create(
+            assignment=assignment, student=student, score=score, attempt_number=attempt, is_graded=graded)
+
+    def test_assignment_analytics(self):
+        data = self.client.get(reverse('lecturer-assignment-analytics', args=[self.lab.pk])).data
+        self.assertEqual((data['submissions'], data['students_submitted'], data['students_graded']), (5, 4, 3))
+        scores = data['scores']
+        self.assertEqual((scores['mean'], scores['stddev'], scores['min'], scores['max']), (80.0, 16.3299, 60.0, 100.0))
+        self.assertEqual(scores['percentiles']['50'], 80.0)
+        self.assertEqual(scores['histogram']['counts'], [0, 0, 0, 0, 0, 0, 1, 0, 1, 1])
+        self.assertEqual(data['late_rate'], 0.0)
+        self.assertEqual(data['attempts'], {'mean': 1.25, 'max': 2, 'distribution': {'1': 3, '2': 1}})
+        by_name = {row['username']: row for row in data['students']}
+        self.assertEqual(by_name['ann']['score'], 60)
+        self.assertEqual(by_name['ann']['attempts'], 2)
+        self.assertEqual(by_name['ann']['z_score'], -1.225)
+        self.assertEqual(by_name['ben']['z_score'], 0.0)
+        self.assertIsNone(by_name['dan']['score'])
+        self.assertIsNone(by_name['dan']['z_score'])
+
+    def test_course_analytics(self):
+        data = self.client.get(reverse('lecturer-course-analytics', args=['CS101'])).data
+        self.assertEqual([row['title'] for row in data['assignments']], ['Quiz', 'Lab'])
+        quiz = data['assignments'][0]
+        self.assertEqual((quiz['late_submissions'], quiz['late_rate']), (2, 1.0))
+        self.assertEqual(data['late_submissions'], 2)
+        percentages = {row['username']: row['percentage'] for row in data['students']}
+        # ann: (60 + 20) / 120, ben: (80 + 10) / 120, cat: 100 / 100
+        self.assertEqual(percentages, {'ann': 66.67, 'ben': 75.0, 'cat': 100.0})
+        attempted = {row['username']: row['assignments_attempted'] for row in data['students']}
+        self.assertEqual(attempted, {'ann': 2, 'ben': 2, 'cat': 1})
+
+    def test_cached_until_next_grade(self):
+        url = reverse('lecturer-assignment-analytics', args=[self.lab.pk])
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        feedback = reverse('lecturer-submission-feedback', args=[self.pending.pk])
+        self.assertEqual(self.client.patch(feedback, {'score': 40}).status_code, status.HTTP_200_OK)
+        data = self.client.get(url).data
+        self.assertEqual((data['submissions'], data['students_graded']), (5, 4))
+
+    def test_new_attempt_refreshes_the_figures(self):
+        url = reverse('lecturer-assignment-analytics', args=[self.lab.pk])
+        course_url = reverse('lecturer-course-analytics', args=['CS101'])
+        self.client.get(url)
+        self.client.get(course_url)
+
+        attempt = self.submit(self.lab, self.students[1], 90, attempt=2)
+        data = self.client.get(url).data
+        self.assertEqual(data['submissions'], 6)
+        ben = {row['username']: row for row in data['students']}['ben']
+        self.assertEqual((ben['score'], ben['attempts']), (90, 2))
+        percentages = {row['username']: row['percentage'] for row in self.client.get(course_url).data['students']}
+        self.assertEqual(percentages['ben'], 83.33)
+
+        attempt.delete()
+        data = self.client.get(url).data
+        self.assertEqual(data['submissions'], 5)
+        self.assertEqual({row['username']: row for row in data['students']}['ben']['attempts'], 1)
+
+    def test_deadline_change_refreshes_the_figures(self):
+        url = reverse('lecturer-assignment-analytics', args=[self.lab.pk])
+        self.assertEqual(self.client.get(url).data['late_rate'], 0.0)
+        self.lab.due_date = timezone.now() - timezone.timedelta(days=2)
+        self.lab.save()
+        self.assertEqual(self.client.get(url).data['late_rate'], 1.0)
+
+    def test_only_own_assignments(self):
+        other = User.objects.create(username='lecturer2', email='lecturer2@example.com', role='lecture')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse('lecturer-assignment-analytics', args=[self.lab.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse('lecturer-course-analytics', args=['CS101'])).data['students'], [])
+
+
+class DashboardTestCase(APITestCase):
+    def setUp(self):
+        self.lecturer = User.objects.create(username='lecturer1', email='lecturer1@example.com', role='lecture')
+        other = User.objects.create(username='lecturer2', email='lecturer2@example.com', role='lecture')
+        department = Departments.objects.create(name='Computing')
+        self.course = Courses.objects.create(course_code='CS101', course_name='Intro', department_id=department)
+        now = timezone.now()
+        self.soon = self.assignment('Soon', now + timezone.timedelta(days=1))
+        self.later = self.assignment('Later', now + timezone.timedelta(days=7))
+        self.past = self.assignment('Past', now - timezone.timedelta(days=1))
+        self.others = self.assignment('Other lecturer', now + timezone.timedelta(days=2), created_by=other)
+        self.student = Student.objects.create(
+            user=User.objects.create(username='ann', email='ann@example.com', role='student'))
+        classmate = Student.objects.create(
+            user=User.objects.create(username='ben', email='ben@example.com', role='student'))
+        self.submit(self.past, self.student, graded=True)
+        self.submit(self.soon, self.student)
+        self.submit(self.soon, classmate)
+        self.submit(self.others, classmate)
+        for index in range(3):
+            resources.objects.create(
+                course_id=self.course, assignment=self.soon, resource_type='link',
+                resource_url=f'https://example.com/{index}', description=f'Resource {index}')
+        resources.objects.filter(description='Resource 0').update(
+            uploaded_at=now - timezone.timedelta(days=30))
+
+    def assignment(self, title, due_date, created_by=None):
+        return Assignments.objects.create(
+            course_id=self.course, title=title, due_date=due_date,
+            created_by=created_by or self.lecturer, max_score=100)
+
+    def submit(self, assignment, student, graded=False):
+        return AssignmentSubmissions.objects.create(
+            assignment=assignment, student=student, score=50 if graded else 0, is_graded=graded)
+
+    def test_student_dashboard(self):
+        self.client.force_authenticate(user=self.student.user)
+        with self.assertNumQueries(6):
+            data = self.client.get(reverse('student-dashboard')).data
+        self.assertEqual(data['user']['username'], 'ann')
+        upcoming = [(row['title'], row['submitted']) for row in data['upcoming_assignments']]
+        self.assertEqual(upcoming, [('Soon', True), ('Other lecturer', False), ('Later', False)])
+        self.assertEqual(
+            [(row['assignment_title'], row['is_graded']) for row in data['recent_submissions']],
+            [('Soon', False), ('Past', True)])
+        self.assertEqual(len(data['new_resources']), 3)
+        self.assertEqual(data['counts'], {
+            'submissions': 2, 'graded': 1, 'pending': 1, 'upcoming_assignments': 3, 'new_resources': 2})
+
+    def test_lecturer_dashboard(self):
+        self.client.force_authenticate(user=self.lecturer)
+        with self.assertNumQueries(5):
+            data = self.client.get(reverse('lecturer-dashboard')).data
+        upcoming = [(row['title'], row['submission_count'], row['graded_count']) for row in data['upcoming_assignments']]
+        self.assertEqual(upcoming, [('Soon', 2, 0), ('Later', 0, 0)])
+        self.assertEqual(len(data['recent_submissions']), 3)
+        self.assertNotIn('Other lecturer', [row['assignment_title'] for row in data['recent_submissions']])
+        self.assertEqual(data['counts'], {
+            'assignments': 3, 'upcoming_assignments': 2, 'submissions': 3, 'graded': 1, 'ungraded': 2,
+            'new_resources': 2})
+
+    def test_query_count_is_fixed(self):
+        self.client.force_authenticate(user=self.lecturer)
+        for index in range(10):
+            self.assignment(f'Extra {index}', timezone.now() + timezone.timedelta(days=3))
+            self.submit(self.soon, self.student)
+        with self.assertNumQueries(5):
+            self.client.get(reverse('lecturer-dashboard'))
+
+    def test_lecturer_dashboard_requires_lecturer(self):
+        self.client.force_authenticate(user=self.student.user)
+        self.assertEqual(self.client.get(reverse('lecturer-dashboard')).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SubmissionCounterTestCase(APITestCase):
+    def setUp(self):
+        response_cache().clear()
+        self.lecturer = User.objects.create(username='lecturer1', email='lecturer1@example.com', role='lecture')
+        department = Departments.objects.create(name='Computing')
+        course = Courses.objects.create(course_code='CS101', course_name='Intro', department_id=department)
+        self.assignment = Assignments.objects.create(
+            course_id=course, title='Lab', due_date=timezone.now(), created_by=self.lecturer)
+        self.ann, self.ben = (
+            Student.objects.create(user=User.objects.create(username=name, email=f'{name}@example.com', role='student'))
+            for name in ('ann', 'ben')
+        )
+
+    def submit(self, student, attempt=1):
+        return AssignmentSubmissions.objects.create(assignment=self.assignment, student=student, attempt_number=attempt)
+
+    def counters(self):
+        self.assignment.refresh_from_db()
+        return (self.assignment.submission_count, self.assignment.submitter_count, self.assignment.graded_count)
+
+    def grade(self, submission, score=70):
+        # What AssignmentSubmissionFeedbackView does with a submission read at the start of the request.
+        serializer = FeedbackSerializer(submission, data={'score': score}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        AssignmentSubmissionFeedbackView().perform_update(serializer)
+
+    def test_creates_and_deletes(self):
+        first = self.submit(self.ann)
+        second = self.submit(self.ann, attempt=2)
+        other = self.submit(self.ben)
+        self.assertEqual(self.counters(), (3, 2, 0))
+        self.assertEqual(self.assignment.last_submission_at, other.submission_date)
+
+        other.delete()
+        self.assertEqual(self.counters(), (2, 1, 0))
+        self.assertEqual(self.assignment.last_submission_at, second.submission_date)
+        second.delete()
+        first.delete()
+        self.assertEqual(self.counters(), (0, 0, 0))
+        self.assertIsNone(self.assignment.last_submission_at)
+
+    def test_cascading_delete(self):
+        self.submit(self.ann)
+        self.submit(self.ann, attempt=2)
+        self.submit(self.ben)
+        self.ann.user.delete()
+        self.assertEqual(self.counters(), (1, 1, 0))
+
+    def test_feedback_grades_once(self):
+        submission = self.submit(self.ann)
+        self.client.force_authenticate(user=self.lecturer)
+        url = reverse('lecturer-submission-feedback', args=[submission.pk])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.patch(url, {'score': 40}).status_code, status.HTTP_200_OK)
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "resources_assignmentsubmissions"')]
+        self.assertEqual(len(updates), 1)
+        self.client.patch(url, {'feedback': 'Better'})
+        self.assertEqual(self.counters(), (1, 1, 1))
+
+    def test_concurrent_gradings_count_once(self):
+        submission = self.submit(self.ann)
+        # Both requests read the submission before either saves it.
+        first, second = AssignmentSubmissions.objects.get(pk=submission.pk), AssignmentSubmissions.objects.get(pk=submission.pk)
+        self.grade(first)
+        self.grade(second, score=80)
+        self.assertEqual(self.counters(), (1, 1, 1))
+
+    def test_stale_assignment_save_keeps_counters(self):
+        stale = Assignments.objects.get(pk=self.assignment.pk)
+        self.submit(self.ann)
+        self.submit(self.ben)
+        stale.title = 'Lab 1'
+        stale.save()
+        self.assertEqual(self.counters(), (2, 2, 0))
+        self.assertEqual(self.assignment.title, 'Lab 1')
+
+    def test_recount_repairs_drift(self):
+        self.submit(self.ann)
+        self.submit(self.ben)
+        AssignmentSubmissions.objects.update(is_graded=True)
+        Assignments.objects.update(submission_count=7)
+        self.assertEqual(drifted(Assignments.objects.all()), [self.assignment.pk])
+        out = io.StringIO()
+        call_command('recount_submissions', stdout=out)
+        self.assertIn('1 assignments had wrong counters', out.getvalue())
+        self.assertEqual(self.counters(), (2, 2, 2))
+        self.assertEqual(drifted(Assignments.objects.all()), [])
+
+    def test_counter_changes_move_assignment_etags(self):
+        self.client.force_authenticate(user=self.lecturer)
+        urls = [reverse('lecturer-assignment-list-create'), reverse('lecturer-assignment-detail', args=[self.assignment.pk])]
+
+        def revalidate(change):
+            etags = [self.client.get(url)['ETag'] for url in urls]
+            for url, etag in zip(urls, etags):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+            change()
+            for url, etag in zip(urls, etags):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+        revalidate(lambda: self.submit(self.ann))
+        first = AssignmentSubmissions.objects.get()
+        revalidate(lambda: self.grade(first))
+        second = self.submit(self.ben)
+        revalidate(lambda: self.client.post(reverse('lecturer-bulk-feedback'), [{'id': second.pk, 'score': 50}], format='json'))
+        revalidate(second.delete)
+        Assignments.objects.update(graded_count=0)
+        revalidate(lambda: recount(Assignments.objects.all()))
+        self.assertEqual(self.counters(), (1, 1, 1))
+
+
+class BulkGradingTestCase(APITestCase):
+    def setUp(self):
+        response_cache().clear()
+        self.lecturer = User.objects.create(username='lecturer1', email='lecturer1@example.com', role='lecture')
+        department = Departments.objects.create(name='Computing')
+        course = Courses.objects.create(course_code='CS101', course_name='Intro', department_id=department)
+        self.quiz = Assignments.objects.create(
+            course_id=course, title='Quiz', due_date=timezone.now(), created_by=self.lecturer, max_score=20)
+        self.students = [
+            Student.objects.create(user=User.objects.create(username=f'student{index}', email=f's{index}@example.com',
+                                                            role='student'))
+            for index in range(30)
+        ]
+        self.submissions = [
+            AssignmentSubmissions.objects.create(assignment=self.quiz, student=student) for student in self.students
+        ]
+        self.url = reverse('lecturer-bulk-feedback')
+        self.client.force_authenticate(user=self.lecturer)
+
+    def test_grades_all_rows_in_fixed_queries(self):
+        grades = [{'id': submission.pk, 'score': index % 21, 'feedback': f'Note {index}'}
+                  for index, submission in enumerate(self.submissions)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, grades, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['graded'], 30)
+        self.assertEqual(response.data['results'][5], {'id': self.submissions[5].pk, 'status': 'graded',
+                                                       'score': 5, 'feedback': 'Note 5'})
+        writes = [query for query in queries if query['sql'].startswith('UPDATE')]
+        # One bulk_update of the submissions and one graded_count update.
+        self.assertEqual(len(writes), 2)
+        self.assertEqual(AssignmentSubmissions.objects.filter(is_graded=True).count(), 30)
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.graded_count, 30)
+
+    def test_any_invalid_row_rejects_the_batch(self):
+        other = User.objects.create(username='lecturer2', email='lecturer2@example.com', role='lecture')
+        foreign = Assignments.objects.create(
+            course_id=self.quiz.course_id, title='Other', due_date=timezone.now(), created_by=other)
+        foreign_submission = AssignmentSubmissions.objects.create(assignment=foreign, student=self.students[0])
+        grades = [
+            {'id': self.submissions[0].pk, 'score': 20},
+            {'id': self.submissions[1].pk, 'score': 21},
+            {'id': foreign_submission.pk, 'score': 5},
+            {'id': self.submissions[0].pk, 'feedback': 'Again'},
+        ]
+        response = self.client.post(self.url, grades, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([result['status'] for result in response.data['results']], ['ok', 'error', 'error', 'error'])
+        self.assertEqual(response.data['results'][1]['errors'], {'score': ['Score must be between 0 and 20.']})
+        self.assertFalse(AssignmentSubmissions.objects.filter(is_graded=True).exists())
+
+    def test_malformed_rows(self):
+        response = self.client.post(self.url, [{'id': self.submissions[0].pk, 'score': 5}, {'id': 'x'}, 3],
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([result['status'] for result in response.data['results']], ['ok', 'error', 'error'])
+        response = self.client.post(self.url, {'id': self.submissions[0].pk, 'score': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_single_feedback_uses_max_score(self):
+        url = reverse('lecturer-submission-feedback', args=[self.submissions[0].pk])
+        self.assertEqual(self.client.patch(url, {'score': 25}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.patch(url, {'score': 20}).status_code, status.HTTP_200_OK)
+
+
+class DirtyFieldsTestCase(TestCase):
+    def updates(self, queries):
+        return [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+
+    def test_foreign_keys_and_counters(self):
+        department = Departments.objects.create(name='Computing')
+        first = Courses.objects.create(course_code='CS101', course_name='Intro', department_id=department)
+        second = Courses.objects.create(course_code='CS102', course_name='Next', department_id=department)
+        Assignments.objects.create(course_id=first, title='Lab', due_date=timezone.now())
+        assignment = Assignments.objects.get(title='Lab')
+        assignment.course_id = second
+        assignment.submission_count = 99
+        with CaptureQueriesContext(connection) as queries:
+            assignment.save()
+        [update] = self.updates(queries)
+        self.assertIn('"course_id_id"', update)
+        self.assertNotIn('"submission_count"', update)
+        self.assertNotIn('"title"', update)
+
+
+class AsyncViewTestCase(FileFixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        student = Student.objects.create(user=self.user)
+        self.submission = AssignmentSubmissions.objects.create(
+            assignment=self.resource.assignment,
+            student=student,
+            submission_file=SimpleUploadedFile('answer.pdf', b'%PDF-1.4 answer'),
+        )
+        resources.objects.create(
+            course_id=self.resource.course_id, assignment=self.resource.assignment,
+            resource_type='link', resource_url='https://example.com/notes')
+        self.urls = [
+            '/api/student/get_user',
+            '/api/lecture/get_user',
+            reverse('user-role'),
+            reverse('student-resource-list'),
+            reverse('student-resource-list') + '?page_size=1&ordering=-uploaded_at',
+            reverse('resource-list-create'),
+            reverse('student-submission-list-create'),
+            reverse('student-resource-download', args=[self.resource.pk]),
+            reverse('resource-download', args=[self.resource.pk]),
+            reverse('student-submission-download', args=[self.submission.pk]),
+        ]
+
+    def get(self, url, session):
+        client = APIClient()
+        if session:
+            client.force_login(self.user)
+        else:
+            # Not a session login, so the async views hand over to DRF.
+            client.force_authenticate(user=self.user)
+        response_cache().clear()
+        response = client.get(url)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_async_views_answer_like_sync_views(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                expected, expected_body = self.get(url, session=False)
+                with mock.patch('rest_framework.views.APIView.dispatch', side_effect=AssertionError('sync view used')):
+                    response, body = self.get(url, session=True)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(body, expected_body)
+                for header in ('Content-Type', 'ETag', 'Content-Disposition'):
+                    self.assertEqual(response.get(header), expected.get(header))
+
+    def test_async_list_pages_with_cursor(self):
+        self.client.force_authenticate(user=None)
+        self.client.force_login(self.user)
+        url = reverse('student-resource-list')
+        first = self.client.get(url, {'page_size': 1}).json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(first['results']) + len(second['results']), 2)
+        self.assertNotEqual(first['results'][0]['id'], second['results'][0]['id'])
+        self.assertIsNone(second['next'])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_other_requests_go_to_sync_view(self):
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get('/api/student/check_auth').json(), {'isAuthenticated': False})
+        response = self.client.get('/api/student/get_user')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.json(), {'detail': 'Authentication credentials were not provided.'})
+        self.client.force_login(self.user)
+        url = reverse('student-resource-list')
+        with mock.patch.object(StudentResourceListView, 'list', autospec=True,
+                               side_effect=StudentResourceListView.list) as sync_list:
+            for params in ({'search': 'notes'}, {'format': 'api'}):
+                self.assertEqual(self.client.get(url, params).status_code, 200)
+        self.assertEqual(sync_list.call_count, 2)
+        # Without a stored checksum the file is served with a weak ETag and never hashed.
+        resources.objects.filter(pk=self.resource.pk).update(file_checksum=None)
+        response = self.client.get(reverse('student-resource-download', args=[self.resource.pk]))
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.resource.refresh_from_db()
+        self.assertIsNone(self.resource.file_checksum)
+        self.assertEqual(self.client.get(reverse('resource-download', args=[0])).status_code, 404)
+
+    async def test_async_client(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('student-submission-list-create'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.submission.pk])
+        response = await self.async_client.get('/api/custom/role/')
+        self.assertEqual(response.json(), {'role': 'student'})
+        response = await self.async_client.get('/api/lecture/check_auth')
+        self.assertEqual(response.json(), {'isAuthenticated': True})
+        self.assertIn('csrftoken', response.cookies)
+
+
+@override_settings(AUTH_CACHE_TTL=60)
+class ReplicaRoutingTestCase(APITransactionTestCase):
+    """
+    A second SQLite file stands in for the replica; copy_sqlite_replica
+    replicates to it, which SQLite can't do while a transaction is open.
+    """
+    # Resolved in setUpClass(), after the replica alias is added.
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.mkdtemp()
+        connections.settings[REPLICA_DB_ALIAS] = {
+            **connections[DEFAULT_DB_ALIAS].settings_dict,
+            'NAME': os.path.join(cls.replica_dir, 'replica.sqlite3'),
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA_DB_ALIAS].close()
+        del connections[REPLICA_DB_ALIAS]
+        del connections.settings[REPLICA_DB_ALIAS]
+        shutil.rmtree(cls.replica_dir, ignore_errors=True)
+
+    def setUp(self):
+        department = Departments.objects.create(name='Computing')
+        self.course = Courses.objects.create(course_code='CS101', course_name='Intro', department_id=department)
+        assignment = Assignments.objects.create(course_id=self.course, title='Lab 1', due_date=timezone.now())
+        resources.objects.create(
+            course_id=self.course, assignment=assignment, resource_type='document', description='old notes')
+        call_command('copy_sqlite_replica', stdout=io.StringIO())
+        # Written after the copy: only on the primary, as if the replica lagged.
+        self.recent = resources.objects.create(
+            course_id=self.course, assignment=assignment, resource_type='document', description='new notes')
+        self.user = User.objects.create(username='ann', email='ann@example.com', role='student', full_name='Ann')
+        self.client.force_login(self.user)
+
+    def listed(self, response):
+        return sorted(row['description'] for row in response.json()['results'])
+
+    def test_safe_lists_read_from_replica_until_the_client_writes(self):
+        url = reverse('student-resource-list')
+        response = self.client.get(url)
+        self.assertEqual(self.listed(response), ['old notes'])
+        self.assertNotIn(REPLICA_PIN_COOKIE, response.cookies)
+        # Views not marked read_from_replica, and users, read from the primary.
+        self.assertEqual(self.client.get(reverse('resource-detail', args=[self.recent.pk])).status_code, 200)
+
+        response = self.client.patch('/api/student/update', {'full_name': 'Ann Lee'}, format='json')
+        self.assertEqual(response.cookies[REPLICA_PIN_COOKIE]['max-age'], 10)
+        # The replica's page wasn't cached: the resources generation had just been bumped.
+        self.assertEqual(self.listed(self.client.get(url)), ['new notes', 'old notes'])
+
+        del self.client.cookies[REPLICA_PIN_COOKIE]
+        self.assertEqual(self.listed(self.client.get(url, {'search': 'notes'})), ['old notes'])
+
+    def test_writes_go_to_primary_and_pin_the_client(self):
+        lecturer = User.objects.create(username='lee', email='lee@example.com', role='lecture')
+        self.client.force_login(lecturer)
+        url = reverse('lecturer-assignment-list-create')
+        response = self.client.post(url, {
+            'course_id': self.course.pk, 'title': 'Lab 2', 'due_date': timezone.now().isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([row['title'] for row in self.client.get(url).json()['results']], ['Lab 2'])
+        del self.client.cookies[REPLICA_PIN_COOKIE]
+        self.assertEqual(self.client.get(url).json()['results'], [])
+
+    async def test_async_views_read_from_replica(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('student-resource-list'))
+        self.assertEqual(self.listed(response), ['old notes'])
+
+
+class SqliteTuningTestCase(APITransactionTestCase):
+    def test_connections_are_tuned(self):
+        with connection.cursor() as cursor:
+            values = {}
+            for name in ('synchronous', 'busy_timeout', 'cache_size', 'temp_store'):
+                cursor.execute(f'PRAGMA {name}')
+                values[name] = cursor.fetchone()[0]
+        # 1 is NORMAL and 2 is MEMORY.
+        self.assertEqual(values, {'synchronous': 1, 'busy_timeout': 20000, 'cache_size': -65536, 'temp_store': 2})
+
+    def test_submissions_take_the_write_lock_up_front(self):
+        department = Departments.objects.create(name='Computing')
+        course = Courses.objects.create(course_code='CS101', course_name='Intro', department_id=department)
+        assignment = Assignments.objects.create(course_id=course, title='Lab 1', due_date=timezone.now())
+        user = User.objects.create(username='ann', email='ann@example.com', role='student')
+        Student.objects.create(user=user)
+        self.client.force_login(user)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root), CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('student-submission-list-create'), {
+                'assignment': assignment.pk,
+                'submission_file': SimpleUploadedFile('answer.txt', b'42'),
+            })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('BEGIN IMMEDIATE', [query['sql'] for query in queries])
+        assignment.refresh_from_db()
+        self.assertEqual(assignment.submission_count, 1)
+
+        # Inside a transaction it is an ordinary savepoint.
+        with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+            with write_transaction():
+                pass
+        self.assertNotIn('BEGIN IMMEDIATE', [query['sql'] for query in queries])
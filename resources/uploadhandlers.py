@@ -0,0 +1,149 @@
+"""
+Single-pass upload handling for resource and submission files.
+
+``StreamingChecksumUploadHandler`` replaces Django's default handler chain
+on the upload endpoints. As each chunk of the request body arrives it
+updates a SHA-256, counts bytes against the uploader's role limit and
+sniffs the MIME type from the first bytes, then writes the chunk to memory
+(small files) or a temporary file (large ones). The finished UploadedFile
+carries ``sha256`` and ``sniffed_content_type``, so nothing downstream has
+to read the file again.
+"""
+
+import hashlib
+import mimetypes
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# Allowance for multipart boundaries and ordinary form fields when judging
+# an upload by its Content-Length before any of the body has been read.
+MULTIPART_OVERHEAD = 64 * 1024
+
+SNIFF_LENGTH = 512
+
+# (offset, signature, content type) checked in order against the first bytes.
+MAGIC_NUMBERS = [
+    (0, b'%PDF-', 'application/pdf'),
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (0, b'PK\x03\x04', 'application/zip'),
+    (0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/x-ole-storage'),
+    (0, b'Rar!\x1a\x07', 'application/vnd.rar'),
+    (0, b'\x1f\x8b', 'application/gzip'),
+    (0, b'ID3', 'audio/mpeg'),
+    (0, b'OggS', 'audio/ogg'),
+    (0, b'\x1a\x45\xdf\xa3', 'video/webm'),
+    (4, b'ftypqt', 'video/quicktime'),
+    (4, b'ftyp', 'video/mp4'),
+    (8, b'WAVE', 'audio/wav'),
+    (8, b'AVI ', 'video/x-msvideo'),
+]
+
+# Container formats whose real type is only known from the file extension
+# (e.g. .docx/.xlsx/.pptx are zip files, .doc/.xls/.ppt are OLE files).
+CONTAINER_TYPES = {'application/zip', 'application/x-ole-storage'}
+
+
+class FileTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Uploaded file is too large.'
+    default_code = 'file_too_large'
+
+
+def upload_size_limit(user):
+    """Maximum upload size in bytes for ``user``'s role, or None for no limit."""
+    limits = getattr(settings, 'UPLOAD_SIZE_LIMITS', {})
+    role = (getattr(user, 'role', None) or '').lower()
+    return limits.get(role, limits.get('default'))
+
+
+def sniff_content_type(head, filename=''):
+    """Guess a MIME type from the first bytes of a file and its name."""
+    guessed = mimetypes.guess_type(filename)[0]
+    for offset, signature, content_type in MAGIC_NUMBERS:
+        if head[offset:offset + len(signature)] == signature:
+            if content_type in CONTAINER_TYPES and guessed:
+                return guessed
+            return content_type
+    if head and b'\x00' not in head:
+        try:
+            head.decode('utf-8')
+        except UnicodeDecodeError as exc:
+            # A multi-byte character cut off at the end of the sample is fine.
+            if exc.start < len(head) - 3:
+                return guessed or 'application/octet-stream'
+        return guessed if guessed and guessed.startswith('text/') else 'text/plain'
+    return guessed or 'application/octet-stream'
+
+
+class StreamingChecksumUploadHandler(FileUploadHandler):
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = None
+        self.in_memory = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.max_size = upload_size_limit(getattr(self.request, 'user', None))
+        self.in_memory = content_length <= settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        if self.max_size is not None and content_length > self.max_size + MULTIPART_OVERHEAD:
+            raise FileTooLarge(f'Uploads are limited to {self.max_size} bytes.')
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+        self.head = b''
+        self.received = 0
+        if self.in_memory:
+            self.file = BytesIO()
+        else:
+            self.file = TemporaryUploadedFile(
+                self.file_name, self.content_type, 0, self.charset, self.content_type_extra
+            )
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.max_size is not None and self.received > self.max_size:
+            self.file.close()
+            raise FileTooLarge(f'Uploads are limited to {self.max_size} bytes.')
+        if len(self.head) < SNIFF_LENGTH:
+            self.head += raw_data[:SNIFF_LENGTH - len(self.head)]
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        if self.in_memory:
+            upload = InMemoryUploadedFile(
+                file=self.file,
+                field_name=self.field_name,
+                name=self.file_name,
+                content_type=self.content_type,
+                size=file_size,
+                charset=self.charset,
+                content_type_extra=self.content_type_extra,
+            )
+        else:
+            upload = self.file
+            upload.size = file_size
+        upload.sha256 = self.digest.hexdigest()
+        upload.sniffed_content_type = sniff_content_type(self.head, self.file_name)
+        return upload
+
+    def upload_interrupted(self):
+        if getattr(self, 'file', None) is not None:
+            self.file.close()
+
+
+class StreamingUploadMixin:
+    """Use StreamingChecksumUploadHandler for files uploaded to this view."""
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [StreamingChecksumUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
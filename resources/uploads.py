@@ -0,0 +1,141 @@
+"""
+Chunk store for resumable uploads.
+
+Each upload session gets a directory under ``settings.CHUNKED_UPLOAD_DIR``;
+every chunk is written to ``<index>.part`` through a temporary file and an
+atomic rename, so a chunk is either fully present or absent and chunks may
+arrive in any order or be retried. Request bodies are copied in small
+blocks, so memory use does not depend on the chunk or file size.
+"""
+
+import hashlib
+import mimetypes
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+
+COPY_BLOCK_SIZE = 64 * 1024
+
+
+class ChunkError(Exception):
+    pass
+
+
+def session_dir(session):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, str(session.pk))
+
+
+def chunk_path(session, index):
+    return os.path.join(session_dir(session), f'{index}.part')
+
+
+def received_chunks(session):
+    """Return the sorted indexes of the chunks stored for ``session``."""
+    try:
+        names = os.listdir(session_dir(session))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[:-5]) for name in names if name.endswith('.part'))
+
+
+def received_offset(session):
+    """Number of bytes received contiguously from the start of the file."""
+    offset = 0
+    for expected, index in enumerate(received_chunks(session)):
+        if index != expected:
+            break
+        offset += session.expected_chunk_length(index)
+    return offset
+
+
+def write_chunk(session, index, stream, checksum=None):
+    """
+    Copy chunk ``index`` from ``stream`` (anything with ``read(n)``) to disk.
+    The chunk must be exactly the expected length and, when ``checksum`` is
+    given, match that SHA-256.
+    """
+    if not 0 <= index < session.total_chunks:
+        raise ChunkError(f'Chunk index must be between 0 and {session.total_chunks - 1}.')
+    expected = session.expected_chunk_length(index)
+    directory = session_dir(session)
+    os.makedirs(directory, exist_ok=True)
+
+    digest = hashlib.sha256()
+    received = 0
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as handle:
+        try:
+            while received <= expected:
+                block = stream.read(min(COPY_BLOCK_SIZE, expected + 1 - received))
+                if not block:
+                    break
+                received += len(block)
+                digest.update(block)
+                handle.write(block)
+            if received != expected:
+                raise ChunkError(f'Chunk {index} must be {expected} bytes, received {received}.')
+            if checksum and checksum.lower() != digest.hexdigest():
+                raise ChunkError(f'Chunk {index} does not match its checksum.')
+        except BaseException:
+            handle.close()
+            os.unlink(handle.name)
+            raise
+    os.replace(handle.name, chunk_path(session, index))
+
+
+class AssembledUpload(UploadedFile):
+    """
+    An assembled file on disk. Exposes ``temporary_file_path`` so storage
+    moves it into place instead of copying, and carries the digest computed
+    during assembly in ``sha256``.
+    """
+
+    def __init__(self, path, name, size, sha256):
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        super().__init__(open(path, 'rb'), name=name, content_type=content_type, size=size)
+        self.path = path
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.path
+
+    def close(self):
+        try:
+            return self.file.close()
+        finally:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+
+def assemble(session):
+    """
+    Concatenate all chunks into one file, verifying total size and (when the
+    session has one) the expected SHA-256. Returns an ``AssembledUpload``.
+    """
+    missing = sorted(set(range(session.total_chunks)) - set(received_chunks(session)))
+    if missing:
+        raise ChunkError(f'Missing chunks: {missing}.')
+
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=session_dir(session), suffix='.assembled', delete=False) as target:
+        for index in range(session.total_chunks):
+            with open(chunk_path(session, index), 'rb') as chunk:
+                for block in iter(lambda: chunk.read(COPY_BLOCK_SIZE), b''):
+                    digest.update(block)
+                    size += len(block)
+                    target.write(block)
+
+    if size != session.total_size:
+        os.unlink(target.name)
+        raise ChunkError(f'Assembled size {size} does not match the declared {session.total_size} bytes.')
+    if session.sha256 and session.sha256.lower() != digest.hexdigest():
+        os.unlink(target.name)
+        raise ChunkError('Assembled file does not match the declared SHA-256.')
+    return AssembledUpload(target.name, session.filename, size, digest.hexdigest())
+
+
+def discard(session):
+    shutil.rmtree(session_dir(session), ignore_errors=True)
@@ -1,6 +1,10 @@
 from django.contrib import admin
+from app.eager import EagerLoadingAdmin
 from .models import Student
 
 # Register your models here.
 
-admin.site.register(Student)
\ No newline at end of file
+@admin.register(Student)
+class StudentAdmin(EagerLoadingAdmin):
+    list_display = ('user', 'user__full_name', 'user__reg_number')
+    search_fields = ('user__username', 'user__reg_number')
@@ -69,7 +69,7 @@ class AssignmentSubmissionSerializer(serializers.ModelSerializer):
     class Meta:
         model = AssignmentSubmissions
         fields = '__all__'
-        read_only_fields = ('id', 'submission_date', 'score', 'feedback', 'is_graded', 'attempt_number', 'file_checksum')
+        read_only_fields = ('id', 'student', 'submission_date', 'score', 'feedback', 'is_graded', 'attempt_number', 'file_name', 'file_size', 'content_type', 'file_checksum')
 
     def validate(self, data):
         # Optional: Add file validation logic here if file field is present
@@ -80,4 +80,4 @@ class ResourceSerializer(serializers.ModelSerializer):
     class Meta:
         model = resources
         fields = '__all__'
-        read_only_fields = ('id', 'uploaded_at', 'uploaded_by')
+        read_only_fields = ('id', 'uploaded_at', 'uploaded_by', 'file_name', 'file_size', 'content_type', 'file_checksum')
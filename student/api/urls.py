@@ -3,32 +3,36 @@ from .views import (
     registerView,
     get_csrf,
     loginView,
-    WhoAmIView,
+    who_am_i_view,
     StudentOnlyView,
-    check_auth,
+    StudentDashboardView,
+    check_auth_view,
     logoutView,
     getSession,
     update_account,
     delete_account,
-    StudentAssignmentSubmissionListCreateView,
+    submission_list_view,
     StudentAssignmentSubmissionDetailView,
-    StudentResourceListView,
-    ResourceDownloadView,
+    resource_list_view,
+    resource_download_view,
+    submission_download_view,
 )
 
 urlpatterns = [
     path("sessionId", getSession.as_view()),
     path("csrf_cookie", get_csrf),
-    path("check_auth", check_auth),
+    path("check_auth", check_auth_view),
     path("register", registerView),
     path("login", loginView),
-    path("get_user", WhoAmIView.as_view()),
+    path("get_user", who_am_i_view),
     path("student_dashboard", StudentOnlyView.as_view()),
+    path('dashboard/', StudentDashboardView.as_view(), name='student-dashboard'),
     path("logout", logoutView),
     path("update", update_account),
     path("delete", delete_account),
-    path('submissions/', StudentAssignmentSubmissionListCreateView.as_view(), name='student-submission-list-create'),
+    path('submissions/', submission_list_view, name='student-submission-list-create'),
     path('submissions/<int:pk>/', StudentAssignmentSubmissionDetailView.as_view(), name='student-submission-detail'),
-    path('resources/', StudentResourceListView.as_view(), name='student-resource-list'),
-    path('resources/download/<int:pk>/', ResourceDownloadView.as_view(), name='student-resource-download'),
+    path('submissions/<int:pk>/download/', submission_download_view, name='student-submission-download'),
+    path('resources/', resource_list_view, name='student-resource-list'),
+    path('resources/download/<int:pk>/', resource_download_view, name='student-resource-download'),
 ]
@@ -2,7 +2,7 @@ import json
 from django.http import JsonResponse, FileResponse, Http404
 from django.middleware.csrf import get_token
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_protect
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import logout
 from django.views.decorators.http import require_POST
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
@@ -17,9 +17,20 @@ from rest_framework import (
 )
 
 from custom.api.serializers import UserSerializer
+from custom.api.views import acheck_auth, awho_am_i, email_login_view
 from custom.models import User
 from .serializers import StudentSerializer, UpdateSerializer, AssignmentSubmissionSerializer, ResourceSerializer
+from resources.dashboard import student_dashboard
 from resources.models import AssignmentSubmissions, resources
+from resources.uploadhandlers import StreamingUploadMixin
+from app.asyncviews import DOWNLOAD_FIELDS, aget_user, async_get, async_list_view, deliver_or_none
+from app.delivery import deliver_file
+from app.caching import CachedListMixin
+from app.compiled import CompiledListMixin
+from app.conditional import ConditionalListMixin, ConditionalRetrieveMixin
+from app.eager import EagerLoadingMixin
+from app.sqlite import write_transaction
+from resources.api.filters import FullTextSearchFilter
 import os
 from django.conf import settings
 
@@ -58,27 +69,9 @@ def check_auth(request):
     return JsonResponse({"isAuthenticated": True})
 
 
-@rest_decorators.api_view(["POST"])
-@rest_decorators.permission_classes([rest_permissions.AllowAny])
-def loginView(request):
-    email = request.data.get("email")
-    password = request.data.get("password")
-
-    if not email or not password:
-        return JsonResponse({"Info": "Email and Password are needed"}, status=400)
-
-    try:
-        user_obj = User.objects.get(email__iexact=email)  # Case-insensitive
-    except User.DoesNotExist:
-        return JsonResponse({"Info": "User with given credentials does not exist"}, status=400)
-
-    user = authenticate(request, username=user_obj.username, password=password)
+check_auth_view = async_get(check_auth)(acheck_auth)
 
-    if user is None:
-        return JsonResponse({"Info": "Incorrect password"}, status=400)
-
-    login(request, user)
-    return JsonResponse({"user": UserSerializer(user).data, "Info": "User logged in successfully"})
+loginView = email_login_view(UserSerializer)
 
 
 @rest_decorators.api_view(["POST"])
@@ -108,6 +101,9 @@ class WhoAmIView(APIView):
         return JsonResponse(data, safe=False)
 
 
+who_am_i_view = async_get(WhoAmIView.as_view())(awho_am_i)
+
+
 class StudentOnlyView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -124,6 +120,18 @@ class StudentOnlyView(APIView):
             )
 
 
+class StudentDashboardView(APIView):
+    """
+    Everything the student dashboard shows in one response: the user,
+    upcoming assignments, recent submissions with grading status, new
+    resources and counts.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        return Response(student_dashboard(request.user))
+
+
 def get_user_data(request):
     user = request.user
     data = {
@@ -174,22 +182,29 @@ def delete_account(request):
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class StudentAssignmentSubmissionListCreateView(generics.ListCreateAPIView):
+class StudentAssignmentSubmissionListCreateView(CompiledListMixin, ConditionalListMixin, EagerLoadingMixin, StreamingUploadMixin, generics.ListCreateAPIView):
     serializer_class = AssignmentSubmissionSerializer
     permission_classes = [rest_permissions.IsAuthenticated]
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    read_from_replica = True
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
     ordering_fields = ['submission_date']
-    search_fields = ['assignment__title']
 
     def get_queryset(self):
         return AssignmentSubmissions.objects.filter(student__user=self.request.user)
 
     def perform_create(self, serializer):
         student = self.request.user.student
-        serializer.save(student=student)
+        # The assignment's submission counters are updated in the same
+        # transaction, which queues for SQLite's write lock up front: near a
+        # deadline many students submit at once.
+        with write_transaction():
+            serializer.save(student=student)
+
 
+submission_list_view = async_list_view(StudentAssignmentSubmissionListCreateView)
 
-class StudentAssignmentSubmissionDetailView(generics.RetrieveAPIView):
+
+class StudentAssignmentSubmissionDetailView(ConditionalRetrieveMixin, EagerLoadingMixin, generics.RetrieveAPIView):
     serializer_class = AssignmentSubmissionSerializer
     permission_classes = [rest_permissions.IsAuthenticated]
 
@@ -197,32 +212,81 @@ class StudentAssignmentSubmissionDetailView(generics.RetrieveAPIView):
         return AssignmentSubmissions.objects.filter(student__user=self.request.user)
 
 
-class StudentResourceListView(generics.ListAPIView):
+class StudentResourceListView(CachedListMixin, CompiledListMixin, ConditionalListMixin, EagerLoadingMixin, generics.ListAPIView):
     serializer_class = ResourceSerializer
     permission_classes = [rest_permissions.IsAuthenticated]
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    read_from_replica = True
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
     ordering_fields = ['uploaded_at']
-    search_fields = ['resource_type', 'course_id__course_name', 'assignment__title']
+    cache_generations = ('resources',)
 
     def get_queryset(self):
         # Optionally filter by group, course, etc. for the student
         return resources.objects.filter(is_active=True)
 
 
+resource_list_view = async_list_view(StudentResourceListView)
+
+
 class ResourceDownloadView(generics.GenericAPIView):
     serializer_class = ResourceSerializer
     permission_classes = [rest_permissions.IsAuthenticated]
+    read_from_replica = True
 
     def get(self, request, pk):
         try:
             resource = resources.objects.get(pk=pk, is_active=True)
             if not resource.resource_file:
                 raise Http404
-            file_path = resource.resource_file.path
-            file_handle = open(file_path, 'rb')
-            response = FileResponse(file_handle, as_attachment=True, filename=os.path.basename(file_path))
-            return response
+            return deliver_file(
+                request,
+                resource.resource_file,
+                checksum=resource.file_checksum,
+                filename=resource.file_name,
+            )
         except resources.DoesNotExist:
             raise Http404
         except Exception:
-            raise Http404
\ No newline at end of file
+            raise Http404
+
+
+@async_get(ResourceDownloadView.as_view())
+async def resource_download_view(request, pk):
+    if not (await aget_user(request)).is_authenticated:
+        return None
+    resource = await resources.objects.only(*DOWNLOAD_FIELDS, 'resource_file').filter(pk=pk, is_active=True).afirst()
+    return deliver_or_none(request, resource, 'resource_file')
+
+
+class StudentSubmissionDownloadView(generics.GenericAPIView):
+    serializer_class = AssignmentSubmissionSerializer
+    permission_classes = [rest_permissions.IsAuthenticated]
+    read_from_replica = True
+
+    def get(self, request, pk):
+        try:
+            submission = AssignmentSubmissions.objects.get(pk=pk, student__user=request.user)
+            if not submission.submission_file:
+                raise Http404
+            return deliver_file(
+                request,
+                submission.submission_file,
+                checksum=submission.file_checksum,
+                filename=submission.file_name,
+            )
+        except AssignmentSubmissions.DoesNotExist:
+            raise Http404
+        except Exception:
+            raise Http404
+
+
+@async_get(StudentSubmissionDownloadView.as_view())
+async def submission_download_view(request, pk):
+    user = await aget_user(request)
+    if not user.is_authenticated:
+        return None
+    submission = await (
+        AssignmentSubmissions.objects.only(*DOWNLOAD_FIELDS, 'submission_file')
+        .filter(pk=pk, student__user=user).afirst()
+    )
+    return deliver_or_none(request, submission, 'submission_file')